@@ -11,9 +11,15 @@ from collections import Iterator
 from vod.mapreducescript import Runner
 
 from youtime.common.dao import VideoDAO
+from youtime.common.datasets import is_dataset
+from youtime.mapred.ig import DatasetDaoIterator
+from youtime.mapred.ig import is_parquet_dir
+from youtime.mapred.ig import NpyDaoIterator
+from youtime.mapred.ig import ParquetDaoIterator
 from youtime.mapred.ig import PyTablesDaoIterator
 
 import abc
+import os
 
 class YoutimeH5Runner(Runner):
     '''
@@ -26,11 +32,68 @@ class YoutimeH5Runner(Runner):
     def __init__(self, name, description):
         super(YoutimeH5Runner, self).__init__(name, description)
         self.igen = None
+        self.parser = None
 
     def add_custom_aguments(self, parser):
+        self.parser = parser
         parser.add_argument('in_file',  type=str, 
-                            help='In file (H5 PyTables)')
+                            help='In file (H5 PyTables, manifest of '
+                                 'shards or dataset of crawls) or folder '
+                                 'exported to .npy or Parquet files')
         parser.add_argument('table', type=str, 
                             help='Table name')
         parser.add_argument('outf',  type=str, 
-                            help='Output folder file')
\ No newline at end of file
+                            help='Output folder file')
+        parser.add_argument('--where', type=str, default=None,
+                            help='Only process videos matching this '
+                                 'condition on scalar columns, e.g. '
+                                 '"(DAYS > 100) & (TOTAL_VIEW > 0)"')
+        parser.add_argument('--shard', type=int, default=None,
+                            help='Only process this shard of the manifest. '
+                                 'Used to run one worker per shard')
+        parser.add_argument('--prefetch', type=int, default=None,
+                            help='Number of processes reading the files of '
+                                 'a dataset ahead')
+    
+    def dao_iterator(self, arg_vals, columns=None, where=None):
+        '''
+        Returns the iterator over the videos of the file and table given as
+        arguments. Scripts should give the VideoDAO fields read by their 
+        mappers and reducers as `columns`, only these will be converted.
+        
+        Videos are filtered by PyTables (in-kernel) using both the `--where` 
+        argument and the `where` condition of the script, if any.
+        
+        If the input is a folder exported by `youtime.export_npy` or 
+        `youtime.export_parquet`, videos are read from the memory mapped 
+        `.npy` files or from the Parquet files instead. If it is a dataset 
+        (see `youtime.common.datasets`), the videos of every crawl are read
+        and the CRAWL field of each one has the tag of its crawl. `--shard`
+        can only be used with manifests of shards and datasets of them.
+        '''
+        conditions = [cond for cond in (arg_vals.where, where) if cond]
+        
+        where = None
+        if conditions:
+            where = ' & '.join('(%s)' % cond for cond in conditions)
+        
+        if is_dataset(arg_vals.in_file):
+            return DatasetDaoIterator(arg_vals.in_file, arg_vals.table, 
+                                      columns, where=where, 
+                                      workers=arg_vals.prefetch,
+                                      shard=arg_vals.shard)
+        
+        if os.path.isdir(arg_vals.in_file) and arg_vals.shard is not None:
+            self.parser.error('--shard cannot be used with folders of '
+                              '.npy or Parquet files')
+        
+        if is_parquet_dir(arg_vals.in_file):
+            return ParquetDaoIterator(arg_vals.in_file, arg_vals.table, 
+                                      columns, where=where)
+        
+        if os.path.isdir(arg_vals.in_file):
+            return NpyDaoIterator(arg_vals.in_file, arg_vals.table, columns,
+                                  where=where)
+        
+        return PyTablesDaoIterator(arg_vals.in_file, arg_vals.table, columns, 
+                                   where=where, shard=arg_vals.shard)
\ No newline at end of file
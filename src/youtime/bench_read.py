@@ -0,0 +1,81 @@
+# -*- coding: utf-8
+'''
+Measures the read throughput of the iterators over H5 files written with
+different layouts and storage options. The input file is rewritten once for
+each setting (in the output folder) and then read with:
+
+    * dao-all: PyTablesDaoIterator accessing every field
+    * dao-col: PyTablesDaoIterator projecting only TOTAL_VIEW and
+      VIEW_DATA_INTERP
+    * block: PyTablesBlockIterator projecting the same columns
+
+For each setting and reader the file size, time and rows per second are
+printed.
+'''
+from __future__ import division, print_function
+
+from youtime.common.dao import FIELDS
+from youtime.common.dao import VideoDAO
+from youtime.convert_dao import convert
+from youtime.mapred.ig import PyTablesBlockIterator
+from youtime.mapred.ig import PyTablesDaoIterator
+
+import os
+import plac
+import sys
+import time
+
+COLUMNS = [VideoDAO.TOTAL_VIEW, VideoDAO.VIEW_DATA_INTERP]
+
+#(name, layout is ragged, DaoReducer options)
+SETTINGS = [
+    ('padded', False, {}),
+    ('padded-zlib1', False, {'complib':'zlib', 'complevel':1}),
+    ('padded-lzo1', False, {'complib':'lzo', 'complevel':1}),
+    ('padded-blosc5', False, {'complib':'blosc', 'complevel':5}),
+    ('padded-blosc5-chunk256', False, {'complib':'blosc', 'complevel':5,
+                                       'chunkshape':256}),
+    ('ragged', True, {}),
+    ('ragged-blosc5', True, {'complib':'blosc', 'complevel':5}),
+]
+
+def _dao_all(fpath):
+    num_rows = 0
+    for _, dao in PyTablesDaoIterator(fpath):
+        for key in FIELDS:
+            dao[key]
+        num_rows += 1
+    return num_rows
+
+def _dao_col(fpath):
+    num_rows = 0
+    for _, dao in PyTablesDaoIterator(fpath, columns=COLUMNS):
+        dao[VideoDAO.TOTAL_VIEW]
+        dao[VideoDAO.VIEW_DATA_INTERP]
+        num_rows += 1
+    return num_rows
+
+def _block(fpath):
+    num_rows = 0
+    for ids, _ in PyTablesBlockIterator(fpath, columns=COLUMNS):
+        num_rows += len(ids)
+    return num_rows
+
+READERS = [('dao-all', _dao_all), ('dao-col', _dao_col), ('block', _block)]
+
+def main(in_file, out_folder):
+    print('#setting', 'reader', 'mbytes', 'seconds', 'rows/s')
+    for name, ragged, kwargs in SETTINGS:
+        fpath = os.path.join(out_folder, '%s.h5' % name)
+        convert(in_file, fpath, ragged, **kwargs)
+        mbytes = os.path.getsize(fpath) / (1024 ** 2)
+
+        for reader_name, reader in READERS:
+            start = time.time()
+            num_rows = reader(fpath)
+            seconds = time.time() - start
+            print(name, reader_name, '%.2f' % mbytes, '%.3f' % seconds,
+                  '%.0f' % (num_rows / seconds))
+
+if __name__ == '__main__':
+    sys.exit(plac.call(main))
@@ -13,7 +13,6 @@ from vodstats.plot.plot2d import xy_plot, XYPoints
 
 from youtime import YoutimeH5Runner
 from youtime.common.dao import VideoDAO
-from youtime.mapred.ig import PyTablesDaoIterator
 from youtime.mapred.mappers import Noop
 
 import os
@@ -93,7 +92,7 @@ class CDFRunner(YoutimeH5Runner):
         self.mapper_obj = Noop()
         self.reducer_obj = CDFColReducer(arg_vals.outf, arg_vals.cname, 
                                          arg_vals.logx, arg_vals.logy)
-        self.igen = PyTablesDaoIterator(arg_vals.in_file, arg_vals.table)
+        self.igen = self.dao_iterator(arg_vals, [self.reducer_obj.tname])
     
     def finalize(self):
         self.reducer.close()
@@ -4,10 +4,55 @@ Module to create abstractions from PyTables to objects to be processed
 '''
 from __future__ import division, print_function
 
-from collections import Hashable
-
 from tables import *
 
+import hashlib
+import numpy as np
+
+#Tables in which videos are split according to their lifetime
+TABLES = ['days', 'weeks', 'months', 'years']
+
+#Storage layouts. Padded tables store arrays in fixed size columns (see 
+#`VideoDesc`), ragged tables keep only offsets (see `VideoRaggedDesc`) and the
+#values of each array field in an EArray under the SERIES_GROUP group.
+PADDED = 'padded'
+RAGGED = 'ragged'
+SERIES_GROUP = 'series'
+
+#Alphabet of the (base64 like) YouTube video ids
+ID_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz' + \
+        '0123456789-_'
+ID_VALUES = dict((char, value) for value, char in enumerate(ID_ALPHABET))
+
+#Value of the INT_ID_SCHEME attribute of tables with INT_IDs from `to_int_id`
+INT_ID_SCHEME = 'youtube64'
+
+def to_int_id(video_id):
+    '''
+    Returns a deterministic 64 bit (signed) integer for a video id. YouTube
+    ids have 11 base64 chars, the last one encoding only 4 bits, so ids are 
+    decoded into exactly 64 bits. Other ids are hashed with md5.
+    '''
+    if len(video_id) == 11 and all(char in ID_VALUES for char in video_id) \
+            and ID_VALUES[video_id[10]] & 3 == 0:
+        value = 0
+        for char in video_id[:10]:
+            value = (value << 6) | ID_VALUES[char]
+        value = (value << 4) | (ID_VALUES[video_id[10]] >> 2)
+    else:
+        value = int(hashlib.md5(video_id).hexdigest()[:16], 16)
+    
+    if value >= 2 ** 63:
+        value -= 2 ** 64
+    return value
+
+def offset_col(field):
+    '''
+    Returns the name of the column with the offsets of an array field on
+    ragged tables.
+    '''
+    return field + '_OFFSET'
+
 def _nop(field):
     '''
     This method simple returns the field. It is a hack because
@@ -24,11 +69,18 @@ def _pc(field):
     '''
     return field[1 : int(float(field[0])) + 1]
 
-class VideoDAO(Hashable):
+class VideoDAO(object):
     '''
     This class represents a dict like interface for a video to be processed.
     The name of the fields which can be accessed are the constants of the
     class.
+    
+    Daos created by the iterators of `youtime.mapred.ig` are lazy: they
+    reference the whole block of rows they were read from, and converted 
+    arrays are views of that block. They are meant to be used while the
+    iteration is on their block. Code which keeps daos for longer (e.g. 
+    grouping them) must call `materialize`, otherwise every block with a 
+    kept dao stays in memory.
     '''
 
     ID = 'ID'
@@ -99,67 +151,171 @@ class VideoDAO(Hashable):
     DATE_POINTS_INTERP = 'DATE_POINTS_INTERP'
     
     EVENT_TYPES = 'EVENT_TYPES'
+    EVENT_CODES = 'EVENT_CODES'
     EVENT_DATES = 'EVENT_DATES'
     EVENT_VIEWS = 'EVENT_VIEWS'
     
     HONORS = 'HONORS'
+    
+    #Derived fields (see `youtime.common.derived`), only readable after 
+    #running `youtime.derive`
+    CUM_VIEW = 'CUM_VIEW'
+    CUM_COMM = 'CUM_COMM'
+    CUM_FAVS = 'CUM_FAVS'
+    WEEK_VIEW = 'WEEK_VIEW'
+    MONTH_VIEW = 'MONTH_VIEW'
+    GROUP_VIEW = 'GROUP_VIEW'
+    
+    #Tag of the crawl of videos read from datasets (see 
+    #`youtime.common.datasets`)
+    CRAWL = 'CRAWL'
 
-    def __init__(self, raw_data):
-        converters = self.get_converters()
-        self.converted = {}
-        
-        self.converted[self.__class__.INT_ID] = \
-            int(raw_data[self.__class__.INT_ID])
-        self.converted[self.__class__.ID] = \
-            raw_data[self.__class__.ID]
+    #Callables which treat array like fields. These fields have the length as
+    #the first element, so we remove this and trim anything beyond length.
+    CONVERTERS = {
+            ID:_nop,
+            INT_ID:int,
+            
+            DAYS:_nop,
+            FIRST_DATE:_nop,
+            LAST_DATE:_nop,
+            COLLECT_DATE:_nop,
+            UPLOAD_DATE:_nop,
+            HONORS:_nop,
             
-        for key in self.get_converters():
-            conv = converters[key]
-            self.converted[key] = conv(raw_data[key])
+            TOTAL_VIEW:_nop,
+            TOTAL_COMM:_nop,
+            TOTAL_FAVS:_nop,
+
+            VIEW_DATA_ORIG:_pc,
+            COMM_DATA_ORIG:_pc,
+            FAVS_DATA_ORIG:_pc,
+            DATE_POINTS_ORIG:_pc,
+
+            VIEW_DATA_INTERP:_pc,
+            COMM_DATA_INTERP:_pc,
+            FAVS_DATA_INTERP:_pc,
+            DATE_POINTS_INTERP:_pc,
+            
+            EVENT_TYPES:_pc,
+            EVENT_CODES:_pc,
+            EVENT_DATES:_pc,
+            EVENT_VIEWS:_pc,
+            
+            CUM_VIEW:_nop,
+            CUM_COMM:_nop,
+            CUM_FAVS:_nop,
+            WEEK_VIEW:_nop,
+            MONTH_VIEW:_nop,
+            GROUP_VIEW:_nop,
+            
+            CRAWL:_nop
+        }
+    
+    #Millions of daos are created, no instance dict is kept
+    __slots__ = ('raw_data', 'columns', 'converted')
+    
+    def __init__(self, raw_data, columns=None):
+        '''
+        Wraps `raw_data` (a PyTables row or any dict like object). Fields are
+        only converted when first accessed, thus `raw_data` must not change
+        while the dao is used. When `columns` is given, only these fields 
+        (besides the ids) can be accessed.
+        '''
+        self.raw_data = raw_data
+        self.columns = columns
+        self.converted = None
 
     def __getitem__(self, i):
-        return self.converted[i]
+        converted = self.converted
+        if converted is None:
+            converted = self.converted = {}
+        elif i in converted:
+            return converted[i]
+        
+        columns = self.columns
+        if columns is not None and i not in columns and \
+                i != VideoDAO.ID and i != VideoDAO.INT_ID:
+            raise KeyError(i)
+        
+        #Fields without converters (e.g. aggregation levels) are not changed
+        value = converted[i] = self.CONVERTERS.get(i, _nop)(self.raw_data[i])
+        return value
 
     def __hash__(self):
-        return self[self.__class__.INT_ID]
+        return self[VideoDAO.INT_ID]
+    
+    def __getstate__(self):
+        '''
+        Rows cannot be serialized, so every accessible field is converted. 
+        '''
+        keys = self.columns
+        if keys is None:
+            keys = [key for key in self.CONVERTERS 
+                    if key not in DERIVED and key != VideoDAO.CRAWL]
+        
+        state = dict((key, self[key]) for key in keys)
+        state[VideoDAO.ID] = self[VideoDAO.ID]
+        state[VideoDAO.INT_ID] = self[VideoDAO.INT_ID]
+        return state
+    
+    def __setstate__(self, state):
+        self.raw_data = None
+        self.columns = frozenset(state)
+        self.converted = state
+    
+    def materialize(self):
+        '''
+        Copies every accessible field, so that the row (and block) the dao
+        was read from is released. Returns the dao itself.
+        '''
+        state = self.__getstate__()
+        for key, value in state.items():
+            if isinstance(value, np.ndarray):
+                state[key] = value.copy()
+        
+        self.__setstate__(state)
+        return self
 
     def get_converters(self):
         '''
         Returns Callables which treat array like fields. 
-        These fields have the length as the first element,
-        so we remove this and trim anything beyond length. 
         '''
-        #Arrays must be treated
-        return {
-                self.__class__.ID:_nop,
-                self.__class__.INT_ID:_nop,
-                
-                self.__class__.DAYS:_nop,
-                self.__class__.FIRST_DATE:_nop,
-                self.__class__.LAST_DATE:_nop,
-                self.__class__.COLLECT_DATE:_nop,
-                self.__class__.UPLOAD_DATE:_nop,
-                self.__class__.HONORS:_nop,
-                
-                self.__class__.TOTAL_VIEW:_nop,
-                self.__class__.TOTAL_COMM:_nop,
-                self.__class__.TOTAL_FAVS:_nop,
-    
-                self.__class__.VIEW_DATA_ORIG:_pc,
-                self.__class__.COMM_DATA_ORIG:_pc,
-                self.__class__.FAVS_DATA_ORIG:_pc,
-                self.__class__.DATE_POINTS_ORIG:_pc,
-
-                self.__class__.VIEW_DATA_INTERP:_pc,
-                self.__class__.COMM_DATA_INTERP:_pc,
-                self.__class__.FAVS_DATA_INTERP:_pc,
-                self.__class__.DATE_POINTS_INTERP:_pc,
-                
-                self.__class__.EVENT_TYPES:_pc,
-                self.__class__.EVENT_DATES:_pc,
-                self.__class__.EVENT_VIEWS:_pc
-            }
+        return self.CONVERTERS
         
+#Fields which are single values or arrays
+SCALARS = [VideoDAO.INT_ID, VideoDAO.ID, VideoDAO.DAYS, VideoDAO.UPLOAD_DATE, 
+           VideoDAO.COLLECT_DATE, VideoDAO.FIRST_DATE, VideoDAO.LAST_DATE,
+           VideoDAO.TOTAL_VIEW, VideoDAO.TOTAL_COMM, VideoDAO.TOTAL_FAVS, 
+           VideoDAO.HONORS]
+
+SERIES = [VideoDAO.VIEW_DATA_ORIG, VideoDAO.COMM_DATA_ORIG, 
+          VideoDAO.FAVS_DATA_ORIG, VideoDAO.DATE_POINTS_ORIG,
+          VideoDAO.VIEW_DATA_INTERP, VideoDAO.COMM_DATA_INTERP,
+          VideoDAO.FAVS_DATA_INTERP, VideoDAO.DATE_POINTS_INTERP,
+          VideoDAO.EVENT_CODES, VideoDAO.EVENT_DATES, VideoDAO.EVENT_VIEWS]
+
+#Every field which can be read. Event types are stored as codes (see 
+#`youtime.common.events`), but can also be read by name.
+FIELDS = SCALARS + SERIES + [VideoDAO.EVENT_TYPES]
+
+#Fields computed from the stored ones, they are read only when requested
+DERIVED = [VideoDAO.CUM_VIEW, VideoDAO.CUM_COMM, VideoDAO.CUM_FAVS,
+           VideoDAO.WEEK_VIEW, VideoDAO.MONTH_VIEW, VideoDAO.GROUP_VIEW]
+
+class RaggedVideoDAO(VideoDAO):
+    '''
+    VideoDAO for rows read from ragged tables. Array fields are already 
+    trimmed, so no conversion is needed.
+    '''
+    
+    CONVERTERS = dict(VideoDAO.CONVERTERS)
+    for key in SERIES + [VideoDAO.EVENT_TYPES]:
+        CONVERTERS[key] = _nop
+    del key
+    
+    __slots__ = ()
+
 class VideoDesc(IsDescription):
     INT_ID    = Int64Col(pos=1) #@UndefinedVariable
     ID        = StringCol(128, pos=2) #@UndefinedVariable
@@ -184,8 +340,63 @@ class VideoDesc(IsDescription):
     FAVS_DATA_INTERP = Int32Col(shape=(2001,)) #@UndefinedVariable
     DATE_POINTS_INTERP = Int32Col(shape=(2001,)) #@UndefinedVariable
     
-    EVENT_TYPES = StringCol(32, shape=(11,)) #@UndefinedVariable
+    EVENT_CODES = Int16Col(shape=(11,)) #@UndefinedVariable
     EVENT_DATES = Time32Col(shape=(11,)) #@UndefinedVariable
     EVENT_VIEWS = Int32Col(shape=(11,)) #@UndefinedVariable
     
     HONORS = Int32Col() #@UndefinedVariable
+
+
+class VideoRaggedDesc(IsDescription):
+    INT_ID    = Int64Col(pos=1) #@UndefinedVariable
+    ID        = StringCol(128, pos=2) #@UndefinedVariable
+
+    DAYS      = Int32Col() #@UndefinedVariable
+    UPLOAD_DATE = Time32Col() #@UndefinedVariable
+    COLLECT_DATE = Time32Col() #@UndefinedVariable
+    FIRST_DATE  = Time32Col() #@UndefinedVariable
+    LAST_DATE   = Time32Col() #@UndefinedVariable
+    
+    TOTAL_VIEW = Int32Col() #@UndefinedVariable
+    TOTAL_COMM = Int32Col() #@UndefinedVariable
+    TOTAL_FAVS = Int32Col() #@UndefinedVariable
+    
+    HONORS = Int32Col() #@UndefinedVariable
+    
+    #Where the values of each array start on the corresponding EArray
+    VIEW_DATA_ORIG_OFFSET = Int64Col() #@UndefinedVariable
+    COMM_DATA_ORIG_OFFSET = Int64Col() #@UndefinedVariable
+    FAVS_DATA_ORIG_OFFSET = Int64Col() #@UndefinedVariable
+    DATE_POINTS_ORIG_OFFSET = Int64Col() #@UndefinedVariable
+
+    VIEW_DATA_INTERP_OFFSET = Int64Col() #@UndefinedVariable
+    COMM_DATA_INTERP_OFFSET = Int64Col() #@UndefinedVariable
+    FAVS_DATA_INTERP_OFFSET = Int64Col() #@UndefinedVariable
+    DATE_POINTS_INTERP_OFFSET = Int64Col() #@UndefinedVariable
+    
+    EVENT_CODES_OFFSET = Int64Col() #@UndefinedVariable
+    EVENT_DATES_OFFSET = Int64Col() #@UndefinedVariable
+    EVENT_VIEWS_OFFSET = Int64Col() #@UndefinedVariable
+
+#Atoms of the EArrays which store the values of array fields on ragged tables
+SERIES_ATOMS = {
+    VideoDAO.VIEW_DATA_ORIG: Int32Atom(), #@UndefinedVariable
+    VideoDAO.COMM_DATA_ORIG: Int32Atom(), #@UndefinedVariable
+    VideoDAO.FAVS_DATA_ORIG: Int32Atom(), #@UndefinedVariable
+    VideoDAO.DATE_POINTS_ORIG: Int32Atom(), #@UndefinedVariable
+
+    VideoDAO.VIEW_DATA_INTERP: Int32Atom(), #@UndefinedVariable
+    VideoDAO.COMM_DATA_INTERP: Int32Atom(), #@UndefinedVariable
+    VideoDAO.FAVS_DATA_INTERP: Int32Atom(), #@UndefinedVariable
+    VideoDAO.DATE_POINTS_INTERP: Int32Atom(), #@UndefinedVariable
+    
+    VideoDAO.EVENT_CODES: Int16Atom(), #@UndefinedVariable
+    VideoDAO.EVENT_DATES: Time32Atom(), #@UndefinedVariable
+    VideoDAO.EVENT_VIEWS: Int32Atom() #@UndefinedVariable
+}
+
+def get_layout(table):
+    '''
+    Returns the layout (PADDED or RAGGED) of a table.
+    '''
+    return getattr(table.attrs, 'LAYOUT', PADDED)
\ No newline at end of file
@@ -0,0 +1,52 @@
+# -*- coding: utf8
+'''
+A dataset joins the videos of several crawls, each stored on its own H5
+file (or manifest of shards), without copying them to a single file. The
+dataset file lists a crawl per line: its tag (a name without spaces, e.g.
+'eng2010') and its file, relative to the folder of the dataset file.
+'''
+from __future__ import division, print_function
+
+import os
+
+#First line of every dataset file
+DATASET_HEADER = '#youtime-dataset'
+
+def write_dataset(dataset_path, crawls):
+    '''
+    Writes the dataset file listing `crawls`, a list of `(tag, path)`.
+    '''
+    dataset_dir = os.path.dirname(os.path.abspath(dataset_path))
+    with open(dataset_path, 'w') as dataset_file:
+        print(DATASET_HEADER, file=dataset_file)
+        for tag, path in crawls:
+            if not tag or len(tag.split()) != 1:
+                raise Exception('Invalid crawl tag %r' % tag)
+
+            print(tag, os.path.relpath(os.path.abspath(path), dataset_dir),
+                  file=dataset_file)
+
+def is_dataset(fpath):
+    '''
+    Checks if the file is a dataset file.
+    '''
+    if not os.path.isfile(fpath):
+        return False
+
+    with open(fpath) as some_file:
+        return some_file.readline().strip() == DATASET_HEADER
+
+def read_dataset(dataset_path):
+    '''
+    Returns the `(tag, path)` of each crawl of a dataset (in order).
+    '''
+    dataset_dir = os.path.dirname(os.path.abspath(dataset_path))
+    with open(dataset_path) as dataset_file:
+        lines = [line.strip() for line in dataset_file]
+
+    crawls = []
+    for line in lines[1:]:
+        if line:
+            tag, path = line.split(None, 1)
+            crawls.append((tag, os.path.join(dataset_dir, path)))
+    return crawls
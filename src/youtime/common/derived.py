@@ -0,0 +1,249 @@
+# -*- coding: utf8
+'''
+Derived fields: values computed from the stored fields which most analyses
+need (cumulative series, views per group of events and aggregation levels of
+the daily series). They are computed once by `youtime.derive` and kept on
+the DERIVED_GROUP group, aligned with the rows of each table. Array fields
+are stored as in ragged tables, one EArray with the values of every row and
+one (`<FIELD>_OFFSET`) with the offsets where each row starts plus the
+total size. GROUP_VIEW has one row (of len(GROUPS) sums) per video.
+
+Aggregation levels sum consecutive windows of N days of the interpolated
+(daily) series, the field of each level is named by `window_col`, e.g.
+VIEW_DATA_INTERP_14D. Levels of LEVELS days are always computed, WEEK_VIEW
+and MONTH_VIEW are the 7 and 30 days levels of the views.
+'''
+from __future__ import division, print_function
+
+from tables import Float64Atom
+from tables import Int64Atom
+
+from youtime.common import events
+from youtime.common.dao import DERIVED
+from youtime.common.dao import offset_col
+from youtime.common.dao import VideoDAO
+from youtime.common.ragged import RaggedArray
+
+import numpy as np
+import re
+
+#Group where derived fields are stored
+DERIVED_GROUP = 'derived'
+
+#Cumulative field to the field it is computed from
+CUMULATIVE = {
+    VideoDAO.CUM_VIEW: VideoDAO.VIEW_DATA_INTERP,
+    VideoDAO.CUM_COMM: VideoDAO.COMM_DATA_INTERP,
+    VideoDAO.CUM_FAVS: VideoDAO.FAVS_DATA_INTERP
+}
+
+#Daily series with aggregation levels
+INTERP = [VideoDAO.VIEW_DATA_INTERP, VideoDAO.COMM_DATA_INTERP,
+          VideoDAO.FAVS_DATA_INTERP]
+
+#Default aggregation levels (in days)
+LEVELS = [7, 30]
+
+def window_col(field, size):
+    '''
+    Returns the name of the aggregation level of `size` days of a field.
+    '''
+    return '%s_%dD' % (field, size)
+
+#Fields which are names for aggregation levels
+ALIASES = {
+    VideoDAO.WEEK_VIEW: window_col(VideoDAO.VIEW_DATA_INTERP, 7),
+    VideoDAO.MONTH_VIEW: window_col(VideoDAO.VIEW_DATA_INTERP, 30)
+}
+
+_WINDOW_RE = re.compile(r'^(%s)_(\d+)D$' % '|'.join(INTERP))
+
+def is_derived(name):
+    '''
+    Checks if `name` is a derived field (or an aggregation level).
+    '''
+    return name in DERIVED or _WINDOW_RE.match(name) is not None
+
+#Fields needed to compute the derived ones
+SOURCES = [VideoDAO.VIEW_DATA_INTERP, VideoDAO.COMM_DATA_INTERP,
+           VideoDAO.FAVS_DATA_INTERP, VideoDAO.EVENT_CODES,
+           VideoDAO.EVENT_VIEWS]
+
+def cumulative(series):
+    '''
+    Cumulative sums of each row of a `RaggedArray`.
+    '''
+    sums = np.cumsum(series.values, dtype='int64')
+    before = np.concatenate(([0], sums))[series.offsets[:-1]]
+    return RaggedArray(sums - np.repeat(before, series.lengths()),
+                       series.offsets)
+
+def window_sums(series, size):
+    '''
+    Sums of consecutive windows of `size` points of each row of a
+    `RaggedArray`, the last window of a row may be shorter.
+    '''
+    lengths = series.lengths()
+    num_windows = -(-lengths // size)
+
+    offsets = np.zeros(len(series) + 1, dtype='int64')
+    np.cumsum(num_windows, out=offsets[1:])
+    if offsets[-1] == 0:
+        return RaggedArray(np.zeros(0, dtype='int64'), offsets)
+
+    #Start of each window on the values of the series
+    window = np.arange(offsets[-1]) - np.repeat(offsets[:-1], num_windows)
+    starts = np.repeat(series.offsets[:-1], num_windows) + window * size
+    values = np.add.reduceat(series.values.astype('int64'), starts)
+    return RaggedArray(values, offsets)
+
+def group_views(codes, views):
+    '''
+    Sums the views of the events of each row per group of events (see
+    `youtime.common.events.group_sums`). `codes` and `views` are
+    `RaggedArray`s. Returns an array of shape (rows, len(GROUPS)).
+    '''
+    num_rows = len(codes)
+    num_groups = events.UNKNOWN_GROUP + 1
+
+    rows = np.repeat(np.arange(num_rows), codes.lengths())
+    keys = rows * num_groups + events.code_groups(codes.values)
+    sums = np.bincount(keys, views.values, minlength=num_rows * num_groups)
+    return sums.reshape(num_rows, num_groups)[:, :events.UNKNOWN_GROUP]
+
+def compute(columns, levels=LEVELS):
+    '''
+    Computes every derived field, and the aggregation levels of `levels`
+    days, for a block of rows. `columns` maps the SOURCES fields to
+    `RaggedArray`s.
+    '''
+    derived = {}
+    for field, source in CUMULATIVE.items():
+        derived[field] = cumulative(columns[source])
+
+    for field in INTERP:
+        for size in levels:
+            derived[window_col(field, size)] = \
+                window_sums(columns[field], size)
+
+    derived[VideoDAO.GROUP_VIEW] = group_views(columns[VideoDAO.EVENT_CODES],
+                                               columns[VideoDAO.EVENT_VIEWS])
+    return derived
+
+def write_derived(h5file, table, blocks, levels=LEVELS):
+    '''
+    Computes and writes (replacing the previous ones) the derived fields of
+    a table. `blocks` are the consecutive blocks of rows of the table (see
+    `compute`). Besides LEVELS, aggregation levels of `levels` days are
+    computed.
+    '''
+    levels = sorted(set(LEVELS) | set(levels))
+    fields = [field for field in DERIVED if field not in ALIASES] + \
+        [window_col(field, size) for field in INTERP for size in levels]
+
+    where = '/' + DERIVED_GROUP
+    if DERIVED_GROUP in h5file.root and \
+            table.name in h5file.getNode(where):
+        h5file.removeNode(where, table.name, recursive=True)
+
+    group = h5file.createGroup(where, table.name, createparents=True)
+    arrays = {}
+    for field in fields:
+        if field == VideoDAO.GROUP_VIEW:
+            arrays[field] = h5file.createEArray(group, field, Float64Atom(),
+                                                (0, events.UNKNOWN_GROUP))
+        else:
+            arrays[field] = h5file.createEArray(group, field, Int64Atom(),
+                                                (0,))
+            offsets = h5file.createEArray(group, offset_col(field),
+                                          Int64Atom(), (0,))
+            offsets.append(np.zeros(1, dtype='int64'))
+            arrays[offset_col(field)] = offsets
+
+    for columns in blocks:
+        for field, data in compute(columns, levels).items():
+            values = arrays[field]
+            if isinstance(data, RaggedArray):
+                arrays[offset_col(field)].append(data.offsets[1:] +
+                                                 values.nrows)
+                data = data.values
+
+            if len(data) > 0:
+                values.append(data)
+
+    h5file.flush()
+
+def _runs(coords):
+    '''
+    Returns the `(start, stop)` ranges of consecutive coordinates (sorted).
+    '''
+    if len(coords) == 0:
+        return []
+
+    breaks = np.nonzero(np.diff(coords) != 1)[0] + 1
+    starts = coords[np.concatenate(([0], breaks))]
+    stops = coords[np.concatenate((breaks - 1, [len(coords) - 1]))] + 1
+    return zip(starts, stops)
+
+def read_derived(table, names, start=None, stop=None, coords=None):
+    '''
+    Reads the derived fields in `names` of rows `[start, stop)`, or of the
+    ones at `coords` (sorted), of a table. Array fields are returned as
+    `RaggedArray`s. Coordinates are read as runs of consecutive rows.
+    '''
+    h5file = table._v_file
+    where = '/%s/%s' % (DERIVED_GROUP, table.name)
+    if DERIVED_GROUP not in h5file.root or \
+            table.name not in h5file.getNode('/' + DERIVED_GROUP):
+        raise Exception('Derived fields of %s were not computed' %
+                        table.name)
+    group = h5file.getNode(where)
+
+    if coords is not None:
+        runs = _runs(np.asarray(coords))
+    elif start is None:
+        runs = [(0, table.nrows)]
+    else:
+        runs = [(start, stop)]
+
+    columns = {}
+    for name in names:
+        stored = ALIASES.get(name, name)
+        if stored not in group:
+            raise Exception('Field %s of %s was not derived' %
+                            (name, table.name))
+
+        values = h5file.getNode(group, stored)
+        if name == VideoDAO.GROUP_VIEW:
+            if values.nrows != table.nrows:
+                raise Exception('Derived fields of %s are outdated' %
+                                table.name)
+            parts = [values.read(run_start, run_stop)
+                     for run_start, run_stop in runs]
+            if parts:
+                data = np.concatenate(parts)
+            else:
+                data = np.zeros((0, events.UNKNOWN_GROUP))
+        else:
+            offsets = h5file.getNode(group, offset_col(stored))
+            if offsets.nrows != table.nrows + 1:
+                raise Exception('Derived fields of %s are outdated' %
+                                table.name)
+
+            parts = []
+            lengths = [np.zeros(0, dtype='int64')]
+            for run_start, run_stop in runs:
+                run_offsets = offsets.read(run_start, run_stop + 1)
+                parts.append(values.read(run_offsets[0], run_offsets[-1]))
+                lengths.append(np.diff(run_offsets))
+
+            lengths = np.concatenate(lengths)
+            data_offsets = np.zeros(len(lengths) + 1, dtype='int64')
+            np.cumsum(lengths, out=data_offsets[1:])
+            if parts:
+                data = RaggedArray(np.concatenate(parts), data_offsets)
+            else:
+                data = RaggedArray(np.zeros(0, dtype='int64'), data_offsets)
+        columns[name] = data
+
+    return columns
@@ -0,0 +1,140 @@
+# -*- coding: utf8
+'''
+Dictionary encoding of event (referrer) types. Event types are stored as
+small integer codes (the EVENT_CODES field), each H5 file keeps the name of
+every code on the EVENT_TYPES_NODE table. Known types have fixed codes (their
+position on EVENT_NAMES), so grouping can be done with the CODE_GROUPS array
+without looking at the names.
+'''
+from __future__ import division, print_function
+
+from tables import IsDescription
+from tables import Int16Col
+from tables import StringCol
+
+from youtime.common.dao import VideoDAO
+
+import numpy as np
+
+#Event types are truncated to this size on the H5 files
+NAME_SIZE = 32
+
+#Known event types, the code of each is its index. New types must be appended,
+#never inserted, so that codes of existing files do not change.
+EVENT_NAMES = [
+    'Other / Viral',
+    'First referral from a subscriber',
+    'First view on a channel page',
+    'First referral from Google searc',
+    'First referral from YouTube sear',
+    'First referral from Google Video',
+    'First embedded view',
+    'First embedded on',
+    'First referral from',
+    'First referral from YouTube',
+    'First referral from related vide',
+    'First view from ad',
+    'First featured video view',
+    'First view from a mobile device',
+    'NOT_CAPTURED'
+]
+
+#Groups of event types, the code of each is its index. Codes of unknown
+#types are mapped to UNKNOWN_GROUP (which is not on GROUPS).
+GROUPS = sorted(VideoDAO.EV_GROUPS)
+UNKNOWN_GROUP = len(GROUPS)
+
+#Code to group code, the last position is used for every unknown code
+CODE_GROUPS = np.array([GROUPS.index(VideoDAO.EV2GROUP[name])
+                        for name in EVENT_NAMES] + [UNKNOWN_GROUP])
+
+#Node which stores the code to name table
+EVENT_TYPES_NODE = 'event_types'
+
+class EventTypeDesc(IsDescription):
+    CODE = Int16Col(pos=1) #@UndefinedVariable
+    NAME = StringCol(NAME_SIZE, pos=2) #@UndefinedVariable
+
+class EventEncoder(object):
+    '''
+    Encodes event types to codes. Types which are not on EVENT_NAMES are
+    given new codes, so the names of an encoder must be persisted (see
+    `write_names`) with the data it encoded.
+    '''
+
+    def __init__(self, names=None):
+        if names is None:
+            names = EVENT_NAMES
+
+        self.names = list(names)
+        self.codes = dict((name, code) for code, name in enumerate(self.names))
+
+    def encode(self, event_types):
+        '''
+        Returns the array of codes of the given event types.
+        '''
+        codes = np.empty(len(event_types), dtype='int16')
+        for i, event_type in enumerate(event_types):
+            event_type = event_type[:NAME_SIZE]
+            code = self.codes.get(event_type)
+            if code is None:
+                code = self.codes[event_type] = len(self.names)
+                self.names.append(event_type)
+            codes[i] = code
+
+        return codes
+
+def decode(codes, names):
+    '''
+    Returns the event types of the given codes. `names` is the array of
+    names of a file (see `read_names`).
+    '''
+    return names[codes]
+
+def code_groups(codes):
+    '''
+    Returns the group code (an index of GROUPS) of each event code.
+    '''
+    return CODE_GROUPS[np.minimum(codes, len(EVENT_NAMES))]
+
+def group_sums(codes, values):
+    '''
+    Sums `values` (e.g. event views) per group of the corresponding event
+    codes. Returns the sums and the number of events of each group, indexed
+    by the codes of GROUPS.
+    '''
+    groups = code_groups(codes)
+    counts = np.bincount(groups, minlength=UNKNOWN_GROUP + 1)
+    sums = np.bincount(groups, values, minlength=UNKNOWN_GROUP + 1)
+    return sums[:UNKNOWN_GROUP], counts[:UNKNOWN_GROUP]
+
+def write_names(h5file, names):
+    '''
+    Writes (or replaces) the code to name table of a file. A new table is 
+    written before the previous one is replaced, so that the codes on the
+    file can always be decoded.
+    '''
+    tmp_name = EVENT_TYPES_NODE + '_tmp'
+    if tmp_name in h5file.root:
+        h5file.removeNode(h5file.root, tmp_name)
+    
+    table = h5file.createTable(h5file.root, tmp_name, EventTypeDesc)
+    rows = np.zeros(len(names), dtype=table.dtype)
+    rows['CODE'] = np.arange(len(names))
+    rows['NAME'] = names
+    table.append(rows)
+    table.flush()
+    
+    h5file.renameNode(table, EVENT_TYPES_NODE, overwrite=True)
+
+def read_names(h5file):
+    '''
+    Reads the code to name table of a file. Returns an array with the name
+    of each code.
+    '''
+    table = h5file.getNode(h5file.root, EVENT_TYPES_NODE)
+    rows = table.read()
+
+    names = np.zeros(len(rows), dtype='S%d' % NAME_SIZE)
+    names[rows['CODE']] = rows['NAME']
+    return names
@@ -0,0 +1,101 @@
+# -*- coding: utf8
+'''
+Variable length (ragged) arrays stored as a contiguous array of values and
+an array of offsets. This is how time series are kept by the ragged layout
+of the H5 files.
+'''
+from __future__ import division, print_function
+
+import numpy as np
+
+class RaggedArray(object):
+    '''
+    A sequence of variable length arrays. Every array is stored in the
+    contiguous `values` array and the i-th one is:
+        values[offsets[i]:offsets[i + 1]]
+    Thus, `offsets` has one more element than the number of arrays.
+    '''
+
+    def __init__(self, values, offsets):
+        self.values = values
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.values[self.offsets[i]:self.offsets[i + 1]]
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self[i]
+
+    def lengths(self):
+        '''Returns the length of each array'''
+        return np.diff(self.offsets)
+
+    def to_padded(self, length):
+        '''
+        Returns a 2d array with `length` + 1 columns using the layout of
+        `youtime.common.dao.VideoDesc`. The first element of each row is the
+        length of the array, followed by the values and zeros.
+
+        Arguments
+        ---------
+        length: int
+            maximum length of the arrays
+        '''
+        lengths = self.lengths()
+        mask = np.arange(length) < lengths[:, np.newaxis]
+
+        return_val = np.zeros((len(lengths), length + 1),
+                              dtype=self.values.dtype)
+        return_val[:, 0] = lengths
+        return_val[:, 1:][mask] = self.values
+        return return_val
+
+    @classmethod
+    def from_arrays(cls, arrays, dtype=None):
+        '''
+        Creates a ragged array by concatenating `arrays`.
+        '''
+        lengths = [len(array) for array in arrays]
+        offsets = np.zeros(len(lengths) + 1, dtype='int64')
+        np.cumsum(lengths, out=offsets[1:])
+
+        if offsets[-1] > 0:
+            values = np.concatenate([np.asarray(array, dtype=dtype)
+                                     for array in arrays if len(array) > 0])
+        else:
+            values = np.zeros(0, dtype=dtype)
+
+        return cls(values, offsets)
+
+    @classmethod
+    def concatenate(cls, ragged_arrays):
+        '''
+        Creates a ragged array with the arrays of every one of 
+        `ragged_arrays` (at least one), in order.
+        '''
+        lengths = np.concatenate([ragged.lengths() 
+                                  for ragged in ragged_arrays])
+        offsets = np.zeros(len(lengths) + 1, dtype='int64')
+        np.cumsum(lengths, out=offsets[1:])
+
+        values = np.concatenate([ragged.values for ragged in ragged_arrays])
+        return cls(values, offsets)
+
+    @classmethod
+    def from_padded(cls, padded):
+        '''
+        Creates a ragged array from a 2d array in which the first element of
+        each row is the number of valid values (see
+        `youtime.common.dao.VideoDesc`). This is a vectorized version of
+        trimming each row.
+        '''
+        lengths = padded[:, 0].astype(float).astype('int64')
+        mask = np.arange(padded.shape[1] - 1) < lengths[:, np.newaxis]
+
+        offsets = np.zeros(len(lengths) + 1, dtype='int64')
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(padded[:, 1:][mask], offsets)
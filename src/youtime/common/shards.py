@@ -0,0 +1,109 @@
+# -*- coding: utf8
+'''
+Videos may be stored on several H5 files (shards) partitioned by the INT_ID
+of the videos. A manifest lists the shard files, one per line,
+relative to the folder of the manifest.
+
+The scheme used to partition the videos is written on the manifest. Code
+which routes videos to shards (lookups and appends) checks it with 
+`check_scheme`, so manifests partitioned by other schemes (e.g. the crc32 
+of the video ids, which has no scheme line) are not silently mis-routed. 
+Such manifests can still be read in full, and sharded again with 
+`youtime.convert_dao`.
+'''
+from __future__ import division, print_function
+
+from youtime.common.dao import to_int_id
+
+import os
+
+#First line of every manifest
+MANIFEST_HEADER = '#youtime-shards'
+
+#Prefix of the line with the sharding scheme
+SCHEME_PREFIX = '#scheme '
+
+#Scheme of `shard_of`
+SHARD_SCHEME = 'youtube64-mod'
+
+def shard_of(video_id, num_shards):
+    '''
+    Returns the shard of a video, i.e., its INT_ID (see 
+    `youtime.common.dao.to_int_id`) modulo the number of shards. The same 
+    video is always mapped to the same shard.
+    '''
+    return to_int_id(video_id) % num_shards
+
+def shard_paths(manifest_path, num_shards):
+    '''
+    Returns the paths of the shard files of a new manifest.
+    '''
+    base_path = os.path.splitext(manifest_path)[0]
+    return ['%s-%03d.h5' % (base_path, shard) for shard in xrange(num_shards)]
+
+def write_manifest(manifest_path, paths):
+    '''
+    Writes the manifest listing the shard files in `paths`.
+    '''
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, 'w') as manifest_file:
+        print(MANIFEST_HEADER, file=manifest_file)
+        print(SCHEME_PREFIX + SHARD_SCHEME, file=manifest_file)
+        for path in paths:
+            print(os.path.relpath(os.path.abspath(path), manifest_dir),
+                  file=manifest_file)
+
+def is_manifest(fpath):
+    '''
+    Checks if the file is a manifest.
+    '''
+    with open(fpath) as some_file:
+        return some_file.readline().strip() == MANIFEST_HEADER
+
+def read_manifest(manifest_path):
+    '''
+    Returns the paths of the shard files of a manifest (in shard order).
+    '''
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path) as manifest_file:
+        lines = [line.strip() for line in manifest_file]
+
+    return [os.path.join(manifest_dir, line) for line in lines[1:] 
+            if line and not line.startswith('#')]
+
+def manifest_scheme(manifest_path):
+    '''
+    Returns the sharding scheme of a manifest, or None if it has none.
+    '''
+    with open(manifest_path) as manifest_file:
+        for line in manifest_file:
+            if line.startswith(SCHEME_PREFIX):
+                return line[len(SCHEME_PREFIX):].strip()
+    
+    return None
+
+def check_scheme(manifest_path):
+    '''
+    Raises an exception if the videos of a manifest are not partitioned by
+    `shard_of`.
+    '''
+    scheme = manifest_scheme(manifest_path)
+    if scheme != SHARD_SCHEME:
+        raise Exception('Manifest %s is sharded with scheme %s, not %s. '
+                        'Shard it again with convert_dao' % 
+                        (manifest_path, scheme, SHARD_SCHEME))
+
+def get_files(fpath, shard=None):
+    '''
+    Returns the H5 files to be read given an H5 file or a manifest. If
+    `shard` is not None, only that shard of the manifest is returned.
+    '''
+    if is_manifest(fpath):
+        paths = read_manifest(fpath)
+    else:
+        paths = [fpath]
+
+    if shard is not None:
+        paths = [paths[shard]]
+
+    return paths
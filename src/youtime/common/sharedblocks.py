@@ -0,0 +1,86 @@
+# -*- coding: utf8
+'''
+Blocks of rows shared among processes. A block (a dict of columns, as the
+ones read by `youtime.mapred.ig`) is written once to a folder on shared
+memory (SHM_DIR) with one `.npy` file per column, plus `<FIELD>_OFFSET.npy`
+for `RaggedArray`s. Other processes attach to it by name, memory mapping
+the files, so columns are not copied nor pickled when sent to workers.
+The process which finishes using a block must release it.
+'''
+from __future__ import division, print_function
+
+from youtime.common.dao import offset_col
+from youtime.common.ragged import RaggedArray
+
+import numpy as np
+import os
+import shutil
+import tempfile
+
+#Folder where blocks are created, a tmpfs (RAM) when available
+SHM_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+#Prefix of the name of every block
+PREFIX = 'youtime-'
+
+#File with the layout of the block (see `youtime.common.dao.get_layout`)
+LAYOUT_FILE = 'LAYOUT'
+
+def _path(name):
+    if not name.startswith(PREFIX) or os.sep in name:
+        raise Exception('Invalid block name %s' % name)
+
+    return os.path.join(SHM_DIR, name)
+
+def share(columns, layout):
+    '''
+    Writes a block of columns to shared memory and returns its name.
+    '''
+    path = tempfile.mkdtemp(prefix=PREFIX, dir=SHM_DIR)
+    try:
+        with open(os.path.join(path, LAYOUT_FILE), 'w') as layout_file:
+            layout_file.write(layout)
+
+        for name, data in columns.iteritems():
+            if isinstance(data, RaggedArray):
+                np.save(os.path.join(path, offset_col(name) + '.npy'),
+                        data.offsets)
+                data = data.values
+            np.save(os.path.join(path, name + '.npy'), np.asarray(data))
+    except:
+        shutil.rmtree(path)
+        raise
+
+    return os.path.basename(path)
+
+def attach(name):
+    '''
+    Memory maps a shared block. Returns its layout and columns.
+    '''
+    path = _path(name)
+    with open(os.path.join(path, LAYOUT_FILE)) as layout_file:
+        layout = layout_file.read()
+
+    fnames = set(fname[:-len('.npy')] for fname in os.listdir(path)
+                 if fname.endswith('.npy'))
+
+    columns = {}
+    for fname in fnames:
+        if fname.endswith('_OFFSET') and fname[:-len('_OFFSET')] in fnames:
+            continue
+
+        values = np.load(os.path.join(path, fname + '.npy'), mmap_mode='r')
+        if offset_col(fname) in fnames:
+            offsets = np.load(os.path.join(path, offset_col(fname) + '.npy'),
+                              mmap_mode='r')
+            values = RaggedArray(values, offsets)
+        columns[fname] = values
+
+    return layout, columns
+
+def release(name):
+    '''
+    Removes a shared block. Processes which attached to it can still use
+    their maps.
+    '''
+    shutil.rmtree(_path(name), ignore_errors=True)
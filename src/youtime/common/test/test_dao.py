@@ -0,0 +1,82 @@
+# -*- coding: utf-8
+
+from youtime.common.dao import RaggedVideoDAO
+from youtime.common.dao import to_int_id
+from youtime.common.dao import VideoDAO
+
+import cPickle
+import numpy as np
+import unittest
+
+class TestVideoDAO(unittest.TestCase):
+
+    def setUp(self):
+        self.raw = {VideoDAO.ID:'video', VideoDAO.INT_ID:np.int64(10),
+                    VideoDAO.TOTAL_VIEW:20,
+                    VideoDAO.VIEW_DATA_ORIG:np.array([2, 5, 6, 0]),
+                    VideoDAO.EVENT_TYPES:np.array(['1', 'a', ''])}
+
+    def test_lazy(self):
+        dao = VideoDAO(self.raw)
+        self.assertFalse(hasattr(dao, '__dict__'))
+        self.assertEqual([5, 6], list(dao[VideoDAO.VIEW_DATA_ORIG]))
+        self.assertEqual(['a'], list(dao[VideoDAO.EVENT_TYPES]))
+        self.assertEqual(10, hash(dao))
+        self.assertRaises(KeyError, dao.__getitem__, VideoDAO.TOTAL_COMM)
+    
+    def test_columns(self):
+        dao = VideoDAO(self.raw, frozenset([VideoDAO.TOTAL_VIEW]))
+        self.assertEqual('video', dao[VideoDAO.ID])
+        self.assertEqual(20, dao[VideoDAO.TOTAL_VIEW])
+        self.assertRaises(KeyError, dao.__getitem__, VideoDAO.VIEW_DATA_ORIG)
+    
+    def test_ragged(self):
+        self.raw[VideoDAO.VIEW_DATA_ORIG] = np.array([5, 6])
+        dao = RaggedVideoDAO(self.raw)
+        self.assertEqual([5, 6], list(dao[VideoDAO.VIEW_DATA_ORIG]))
+    
+    def test_pickle(self):
+        columns = [VideoDAO.TOTAL_VIEW, VideoDAO.VIEW_DATA_ORIG]
+        dao = cPickle.loads(cPickle.dumps(VideoDAO(self.raw, columns)))
+        self.assertEqual(10, dao[VideoDAO.INT_ID])
+        self.assertEqual(20, dao[VideoDAO.TOTAL_VIEW])
+        self.assertEqual([5, 6], list(dao[VideoDAO.VIEW_DATA_ORIG]))
+        self.assertRaises(KeyError, dao.__getitem__, VideoDAO.EVENT_TYPES)
+    
+    def test_materialize(self):
+        columns = [VideoDAO.TOTAL_VIEW, VideoDAO.VIEW_DATA_ORIG]
+        dao = VideoDAO(self.raw, columns)
+        self.assertTrue(dao.materialize() is dao)
+        self.assertTrue(dao.raw_data is None)
+        self.assertEqual(20, dao[VideoDAO.TOTAL_VIEW])
+        
+        views = dao[VideoDAO.VIEW_DATA_ORIG]
+        self.assertEqual([5, 6], list(views))
+        self.assertFalse(np.may_share_memory(views, 
+                                             self.raw[VideoDAO.VIEW_DATA_ORIG]))
+        self.assertRaises(KeyError, dao.__getitem__, VideoDAO.EVENT_TYPES)
+
+class TestIntId(unittest.TestCase):
+
+    def test_youtube_ids(self):
+        self.assertEqual(0, to_int_id('AAAAAAAAAAA'))
+        self.assertEqual(1, to_int_id('AAAAAAAAAAE'))
+        self.assertEqual(-1, to_int_id('__________8'))
+        self.assertEqual(-2 ** 63, to_int_id('gAAAAAAAAAA'))
+        
+        video_ids = ['5PsnxDQvQpw', 'fhGb6qPiluE', 'p0Jwx7n2cwc', 
+                     'ZzmEBY6lVAE', 'X2B6-44q91Y', 'G-zjxv6hL1o']
+        int_ids = [to_int_id(video_id) for video_id in video_ids]
+        self.assertEqual(len(video_ids), len(set(int_ids)))
+        for int_id in int_ids:
+            self.assertTrue(-2 ** 63 <= int_id < 2 ** 63)
+    
+    def test_other_ids(self):
+        self.assertEqual(to_int_id('video00001'), to_int_id('video00001'))
+        self.assertNotEqual(to_int_id('video00001'), to_int_id('video00002'))
+        self.assertNotEqual(to_int_id('AAAAAAAAAAB'), 
+                            to_int_id('AAAAAAAAAAA'))
+        self.assertTrue(-2 ** 63 <= to_int_id('some id') < 2 ** 63)
+
+if __name__ == "__main__":
+    unittest.main()
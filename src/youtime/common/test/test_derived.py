@@ -0,0 +1,79 @@
+# -*- coding: utf-8
+
+from youtime.common import derived
+from youtime.common import events
+from youtime.common.dao import VideoDAO
+from youtime.common.ragged import RaggedArray
+
+import numpy as np
+import unittest
+
+class TestDerived(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = [np.arange(1, 11), np.zeros(0, dtype='int64'), 
+                     np.arange(3), np.ones(30)]
+        self.series = RaggedArray.from_arrays(self.rows, 'int32')
+
+    def test_cumulative(self):
+        cum = derived.cumulative(self.series)
+        self.assertEqual(len(self.rows), len(cum))
+        for i, row in enumerate(self.rows):
+            self.assertEqual(list(np.cumsum(row)), list(cum[i]))
+
+    def test_window_sums(self):
+        weeks = derived.window_sums(self.series, 7)
+        self.assertEqual([28, 27], list(weeks[0]))
+        self.assertEqual([], list(weeks[1]))
+        self.assertEqual([3], list(weeks[2]))
+        self.assertEqual([7, 7, 7, 7, 2], list(weeks[3]))
+        
+        self.assertEqual([3, 7, 11, 15, 19], 
+                         list(derived.window_sums(self.series, 2)[0]))
+        
+        empty = RaggedArray.from_arrays([[], []], 'int32')
+        self.assertEqual([0, 0, 0], 
+                         list(derived.window_sums(empty, 7).offsets))
+
+    def test_runs(self):
+        self.assertEqual([], derived._runs(np.zeros(0, dtype='int64')))
+        self.assertEqual([(3, 4)], derived._runs(np.array([3])))
+        self.assertEqual([(0, 3), (5, 6), (8, 10)], 
+                         derived._runs(np.array([0, 1, 2, 5, 8, 9])))
+
+    def test_group_views(self):
+        codes = [[0, 6, 6, 20], [], [13]]
+        views = [[1, 2, 3, 4], [], [5]]
+        sums = derived.group_views(RaggedArray.from_arrays(codes, 'int16'),
+                                   RaggedArray.from_arrays(views, 'int32'))
+        
+        self.assertEqual((3, len(events.GROUPS)), sums.shape)
+        for i in xrange(3):
+            expected, _ = events.group_sums(np.array(codes[i], dtype='int16'),
+                                            np.array(views[i]))
+            self.assertEqual(list(expected), list(sums[i]))
+
+    def test_levels(self):
+        name = derived.window_col(VideoDAO.COMM_DATA_INTERP, 14)
+        self.assertEqual('COMM_DATA_INTERP_14D', name)
+        self.assertTrue(derived.is_derived(name))
+        self.assertTrue(derived.is_derived(VideoDAO.WEEK_VIEW))
+        self.assertFalse(derived.is_derived(VideoDAO.VIEW_DATA_INTERP))
+        self.assertFalse(derived.is_derived('DAYS_14D'))
+        
+        columns = dict((field, self.series) for field in derived.INTERP)
+        columns[VideoDAO.EVENT_CODES] = RaggedArray.from_arrays([[]] * 4, 
+                                                                'int16')
+        columns[VideoDAO.EVENT_VIEWS] = RaggedArray.from_arrays([[]] * 4, 
+                                                                'int32')
+        computed = derived.compute(columns, levels=[2, 7])
+        for field in derived.INTERP:
+            for size in [2, 7]:
+                level = computed[derived.window_col(field, size)]
+                expected = derived.window_sums(self.series, size)
+                self.assertEqual(list(expected.values), list(level.values))
+                self.assertEqual(list(expected.offsets), 
+                                 list(level.offsets))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8
+
+from youtime.common import events
+from youtime.common.dao import VideoDAO
+
+from tables import openFile
+
+import numpy as np
+import os
+import shutil
+import tempfile
+import unittest
+
+class TestEvents(unittest.TestCase):
+
+    def test_encode(self):
+        encoder = events.EventEncoder()
+        codes = encoder.encode(['First embedded view', 'Other / Viral', 
+                                'Something new', 'First embedded view'])
+        
+        self.assertEqual([6, 0, 15, 6], list(codes))
+        self.assertEqual('Something new', encoder.names[15])
+        self.assertEqual([15], list(encoder.encode(['Something new'])))
+        
+        names = np.array(encoder.names)
+        self.assertEqual(['First embedded view', 'Other / Viral', 
+                          'Something new', 'First embedded view'], 
+                         list(events.decode(codes, names)))
+    
+    def test_truncate(self):
+        encoder = events.EventEncoder()
+        self.assertEqual([3], list(encoder.encode(
+            ['First referral from Google search'])))
+    
+    def test_groups(self):
+        for code, name in enumerate(events.EVENT_NAMES):
+            group = events.GROUPS[events.code_groups(np.array([code]))[0]]
+            self.assertEqual(VideoDAO.EV2GROUP[name], group)
+        
+        self.assertEqual([events.UNKNOWN_GROUP], 
+                         list(events.code_groups(np.array([100]))))
+    
+    def test_group_sums(self):
+        codes = np.array([6, 7, 0, 100], dtype='int16')
+        views = np.array([1, 2, 4, 8], dtype='int32')
+        sums, counts = events.group_sums(codes, views)
+        
+        external = events.GROUPS.index('EXTERNAL')
+        viral = events.GROUPS.index('VIRAL')
+        self.assertEqual(3, sums[external])
+        self.assertEqual(2, counts[external])
+        self.assertEqual(4, sums[viral])
+        self.assertEqual(7, sums.sum())
+        self.assertEqual(len(events.GROUPS), len(sums))
+    
+    def test_names(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            fpath = os.path.join(tmp_dir, 'names.h5')
+            names = events.EVENT_NAMES + ['Something new']
+            
+            h5file = openFile(fpath, 'w')
+            events.write_names(h5file, names)
+            h5file.close()
+            
+            h5file = openFile(fpath, 'r')
+            self.assertEqual(names, list(events.read_names(h5file)))
+            h5file.close()
+        finally:
+            shutil.rmtree(tmp_dir)
+
+if __name__ == "__main__":
+    unittest.main()
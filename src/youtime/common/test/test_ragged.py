@@ -0,0 +1,48 @@
+# -*- coding: utf-8
+
+from youtime.common.ragged import RaggedArray
+
+import numpy as np
+import unittest
+
+class TestRagged(unittest.TestCase):
+
+    def test_from_arrays(self):
+        arrays = [np.array([1, 2, 3]), np.array([]), np.array([4])]
+        ragged = RaggedArray.from_arrays(arrays, 'int32')
+        
+        self.assertEqual(3, len(ragged))
+        self.assertEqual([0, 3, 3, 4], list(ragged.offsets))
+        self.assertEqual([3, 0, 1], list(ragged.lengths()))
+        self.assertEqual([1, 2, 3], list(ragged[0]))
+        self.assertEqual([], list(ragged[1]))
+        self.assertEqual([4], list(ragged[2]))
+    
+    def test_concatenate(self):
+        first = RaggedArray.from_arrays([[1, 2], []], 'int32')
+        second = RaggedArray.from_arrays([[3], [4, 5, 6]], 'int32')
+        ragged = RaggedArray.concatenate([first, second])
+        
+        self.assertEqual([0, 2, 2, 3, 6], list(ragged.offsets))
+        self.assertEqual([[1, 2], [], [3], [4, 5, 6]], 
+                         [list(array) for array in ragged])
+    
+    def test_padded(self):
+        padded = np.array([[2, 5, 6, 0], [0, 0, 0, 0], [3, 7, 8, 9]])
+        ragged = RaggedArray.from_padded(padded)
+        
+        self.assertEqual([[5, 6], [], [7, 8, 9]], 
+                         [list(array) for array in ragged])
+        self.assertTrue((padded == ragged.to_padded(3)).all())
+    
+    def test_padded_strings(self):
+        padded = np.array([['2', 'a', 'b'], ['1', 'c', '']], dtype='S32')
+        ragged = RaggedArray.from_padded(padded)
+        
+        self.assertEqual(['a', 'b', 'c'], list(ragged.values))
+        self.assertEqual([['a', 'b'], ['c']], 
+                         [list(array) for array in ragged])
+        self.assertTrue((padded == ragged.to_padded(2)).all())
+
+if __name__ == "__main__":
+    unittest.main()
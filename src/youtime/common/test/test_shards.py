@@ -0,0 +1,61 @@
+# -*- coding: utf-8
+
+from youtime.common import shards
+from youtime.common.dao import to_int_id
+
+import os
+import shutil
+import tempfile
+import unittest
+
+class TestShards(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_shard_of(self):
+        self.assertEqual(to_int_id('5PsnxDQvQpw') % 7, 
+                         shards.shard_of('5PsnxDQvQpw', 7))
+        for video_id in ['a', 'fhGb6qPiluE', 'p0Jwx7n2cwc']:
+            self.assertTrue(0 <= shards.shard_of(video_id, 4) < 4)
+            self.assertEqual(0, shards.shard_of(video_id, 1))
+    
+    def test_manifest(self):
+        manifest_path = os.path.join(self.tmp_dir, 'videos.shards')
+        paths = shards.shard_paths(manifest_path, 3)
+        self.assertEqual(os.path.join(self.tmp_dir, 'videos-001.h5'), 
+                         paths[1])
+        
+        shards.write_manifest(manifest_path, paths)
+        self.assertTrue(shards.is_manifest(manifest_path))
+        self.assertEqual(paths, shards.read_manifest(manifest_path))
+        self.assertEqual(paths, shards.get_files(manifest_path))
+        self.assertEqual([paths[2]], shards.get_files(manifest_path, 2))
+        
+        other = os.path.join(self.tmp_dir, 'other.h5')
+        with open(other, 'w') as other_file:
+            other_file.write('\x89HDF\r\n')
+        self.assertFalse(shards.is_manifest(other))
+        self.assertEqual([other], shards.get_files(other))
+    
+    def test_scheme(self):
+        manifest_path = os.path.join(self.tmp_dir, 'videos.shards')
+        paths = shards.shard_paths(manifest_path, 2)
+        shards.write_manifest(manifest_path, paths)
+        self.assertEqual(shards.SHARD_SCHEME, 
+                         shards.manifest_scheme(manifest_path))
+        shards.check_scheme(manifest_path)
+        
+        #Manifests without a scheme are read, but not routed
+        with open(manifest_path, 'w') as manifest_file:
+            manifest_file.write(shards.MANIFEST_HEADER + '\n')
+            manifest_file.write('videos-000.h5\nvideos-001.h5\n')
+        self.assertEqual(paths, shards.get_files(manifest_path))
+        self.assertEqual(None, shards.manifest_scheme(manifest_path))
+        self.assertRaises(Exception, shards.check_scheme, manifest_path)
+
+if __name__ == "__main__":
+    unittest.main()
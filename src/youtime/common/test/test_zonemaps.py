@@ -0,0 +1,82 @@
+# -*- coding: utf-8
+
+from youtime.common import zonemaps
+from youtime.common.dao import VideoDesc
+
+from tables import openFile
+
+import numpy as np
+import os
+import shutil
+import tempfile
+import unittest
+
+class TestZoneMaps(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.h5file = openFile(os.path.join(self.tmp_dir, 'zones.h5'), 'w')
+        self.table = self.h5file.createTable(self.h5file.root, 'days', 
+                                             VideoDesc, chunkshape=(4,))
+        
+        rows = np.zeros(10, dtype=self.table.dtype)
+        rows['DAYS'] = np.arange(10)
+        rows['TOTAL_VIEW'] = np.arange(10) * 100
+        self.table.append(rows)
+        self.table.flush()
+        
+    def tearDown(self):
+        self.h5file.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_zones(self):
+        self.assertEqual(None, zonemaps.read_zones(self.table))
+        
+        zonemaps.write_zones(self.h5file, self.table, 4)
+        zones = zonemaps.read_zones(self.table)
+        zone_table = self.h5file.getNode('/' + zonemaps.ZONEMAPS_GROUP, 
+                                         'days')
+        self.assertEqual(4, zone_table.attrs.ZONE_SIZE)
+        self.assertEqual([0, 4, 8], list(zones['START']))
+        self.assertEqual([4, 8, 10], list(zones['STOP']))
+        self.assertEqual([0, 4, 8], list(zones['MIN_DAYS']))
+        self.assertEqual([300, 700, 900], list(zones['MAX_TOTAL_VIEW']))
+        
+        #Zone maps which do not cover every row are not used
+        self.table.append(self.table.read(0, 1))
+        self.assertEqual(None, zonemaps.read_zones(self.table))
+        
+        zonemaps.write_zones(self.h5file, self.table)
+        zones = zonemaps.read_zones(self.table)
+        self.assertEqual([0], list(zones['START']))
+        self.assertEqual([11], list(zones['STOP']))
+    
+    def test_candidate_zones(self):
+        zones = zonemaps.compute_zones(self.table, 4)
+        candidates = lambda where, condvars=None: \
+            zonemaps.candidate_zones(zones, where, condvars)
+        
+        self.assertEqual([(0, 10)], candidates('DAYS >= 0'))
+        self.assertEqual([(8, 10)], candidates('DAYS > 7'))
+        self.assertEqual([(8, 10)], candidates('7 < DAYS'))
+        self.assertEqual([(0, 4)], candidates('TOTAL_VIEW < 100'))
+        self.assertEqual([(4, 8)], candidates('DAYS == 5'))
+        self.assertEqual([(4, 8)], candidates('(3 < DAYS) & (DAYS < 8)'))
+        self.assertEqual([(4, 8)], candidates('3 < DAYS < 8'))
+        self.assertEqual([(0, 4), (8, 10)], 
+                         candidates('(DAYS < 1) | (TOTAL_VIEW > 850)'))
+        self.assertEqual([], candidates('(DAYS < 1) & (TOTAL_VIEW > 850)'))
+        self.assertEqual([(8, 10)], candidates('DAYS > lim', {'lim':7}))
+        self.assertEqual([], candidates('DAYS < -1'))
+        
+        #Adjacent zones are searched as one range
+        self.assertEqual([(4, 10)], candidates('DAYS > 4'))
+        
+        #Unknown parts of the condition never skip zones
+        self.assertEqual([(0, 10)], candidates('~(DAYS > 7)'))
+        self.assertEqual([(0, 10)], candidates('DAYS > TOTAL_VIEW'))
+        self.assertEqual([(0, 10)], candidates('(DAYS < 1) | (ID == "a")'))
+        self.assertEqual([(8, 10)], candidates('(DAYS > 7) & (ID == "a")'))
+
+if __name__ == "__main__":
+    unittest.main()
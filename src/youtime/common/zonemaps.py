@@ -0,0 +1,205 @@
+# -*- coding: utf8
+'''
+Zone maps: the minimum and maximum of the scalar fields over each zone 
+(ZONE_SIZE consecutive rows) of a table. They are kept on the ZONEMAPS_GROUP
+group (one table per video table, with the zone size on its ZONE_SIZE 
+attribute) and are used to skip zones which cannot match a condition before
+searching the table (see `candidate_zones`).
+'''
+from __future__ import division, print_function
+
+from youtime.common.dao import SCALARS
+from youtime.common.dao import VideoDAO
+
+import ast
+import numpy as np
+import operator
+
+#Group where the zone maps are stored
+ZONEMAPS_GROUP = 'zonemaps'
+
+#Default number of rows of each zone. Chunks of padded tables have only a 
+#few rows, zones of one chunk would make searches almost per row.
+ZONE_SIZE = 1024
+
+#Fields with zone maps (every numeric scalar)
+ZONE_FIELDS = [field for field in SCALARS if field != VideoDAO.ID]
+
+def zone_dtype(table):
+    '''
+    Returns the dtype of the zone map of a table.
+    '''
+    descr = [('START', 'int64'), ('STOP', 'int64')]
+    for field in ZONE_FIELDS:
+        dtype = table.coldtypes[field]
+        descr.append(('MIN_' + field, dtype))
+        descr.append(('MAX_' + field, dtype))
+
+    return np.dtype(descr)
+
+def compute_zones(table, zone_size=ZONE_SIZE):
+    '''
+    Computes the zone map of a table with zones of `zone_size` rows. Only
+    the ZONE_FIELDS columns are read.
+    '''
+    zones = np.zeros(-(-table.nrows // zone_size), dtype=zone_dtype(table))
+    for i, start in enumerate(xrange(0, table.nrows, zone_size)):
+        stop = min(start + zone_size, table.nrows)
+
+        zones['START'][i] = start
+        zones['STOP'][i] = stop
+        for field in ZONE_FIELDS:
+            column = table.read(start, stop, field=field)
+            zones['MIN_' + field][i] = column.min()
+            zones['MAX_' + field][i] = column.max()
+
+    return zones
+
+def write_zones(h5file, table, zone_size=ZONE_SIZE):
+    '''
+    Computes and writes (replacing the previous one) the zone map of a table.
+    '''
+    if ZONEMAPS_GROUP in h5file.root:
+        group = h5file.getNode(h5file.root, ZONEMAPS_GROUP)
+    else:
+        group = h5file.createGroup(h5file.root, ZONEMAPS_GROUP)
+
+    if table.name in group:
+        h5file.removeNode(group, table.name)
+
+    zones = compute_zones(table, zone_size)
+    zone_table = h5file.createTable(group, table.name, zones.dtype)
+    zone_table.attrs.ZONE_SIZE = zone_size
+    if len(zones) > 0:
+        zone_table.append(zones)
+    zone_table.flush()
+
+def read_zones(table):
+    '''
+    Reads the zone map of a table. Returns None for files without zone maps
+    or if the table has rows not covered by its zone map.
+    '''
+    h5file = table._v_file
+    if ZONEMAPS_GROUP not in h5file.root:
+        return None
+
+    group = h5file.getNode(h5file.root, ZONEMAPS_GROUP)
+    if table.name not in group:
+        return None
+
+    zones = h5file.getNode(group, table.name).read()
+    covered = zones['STOP'][-1] if len(zones) > 0 else 0
+    if covered != table.nrows:
+        return None
+
+    return zones
+
+#Maps a comparison of `field OP value` to a test over (min, max) ranges
+_RANGE_TESTS = {
+    ast.Gt: lambda lo, hi, v: hi > v,
+    ast.GtE: lambda lo, hi, v: hi >= v,
+    ast.Lt: lambda lo, hi, v: lo < v,
+    ast.LtE: lambda lo, hi, v: lo <= v,
+    ast.Eq: lambda lo, hi, v: (lo <= v) & (hi >= v),
+    ast.NotEq: lambda lo, hi, v: (lo != v) | (hi != v),
+}
+
+#The comparison obtained when swapping the sides of `value OP field`
+_SWAPPED = {ast.Gt: ast.Lt, ast.GtE: ast.LtE, ast.Lt: ast.Gt, ast.LtE: ast.GtE,
+            ast.Eq: ast.Eq, ast.NotEq: ast.NotEq}
+
+def _constant(node, condvars):
+    if isinstance(node, ast.Num):
+        return node.n
+    elif isinstance(node, ast.Name) and node.id in condvars:
+        return condvars[node.id]
+    elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        value = _constant(node.operand, condvars)
+        return None if value is None else -value
+
+def _compare(zones, left, op, right, condvars):
+    op_type = type(op)
+    value = _constant(right, condvars)
+    if value is None:
+        left, right = right, left
+        op_type = _SWAPPED.get(op_type)
+        value = _constant(right, condvars)
+
+    if value is None or op_type not in _RANGE_TESTS or \
+            not isinstance(left, ast.Name) or left.id not in ZONE_FIELDS:
+        return None
+
+    return _RANGE_TESTS[op_type](zones['MIN_' + left.id],
+                                 zones['MAX_' + left.id], value)
+
+def _may_match(zones, node, condvars):
+    '''
+    Returns a boolean array which is False for the zones where the
+    condition `node` is surely False, or None if that is unknown.
+    '''
+    if isinstance(node, ast.Expression):
+        return _may_match(zones, node.body, condvars)
+
+    if isinstance(node, ast.Compare):
+        result = None
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            match = _compare(zones, left, op, right, condvars)
+            if match is not None:
+                result = match if result is None else result & match
+            left = right
+        return result
+
+    if isinstance(node, ast.BinOp) and type(node.op) in (ast.BitAnd, ast.BitOr):
+        left = _may_match(zones, node.left, condvars)
+        right = _may_match(zones, node.right, condvars)
+        if isinstance(node.op, ast.BitAnd):
+            #Unknown sides do not restrict the zones of the other one
+            if left is None:
+                return right
+            if right is None:
+                return left
+            return left & right
+        elif left is not None and right is not None:
+            return left | right
+
+    if isinstance(node, ast.BoolOp):
+        matches = [_may_match(zones, value, condvars) for value in node.values]
+        if isinstance(node.op, ast.And):
+            matches = [match for match in matches if match is not None]
+            if matches:
+                return reduce(operator.and_, matches)
+        elif None not in matches:
+            return reduce(operator.or_, matches)
+
+    return None
+
+def candidate_zones(zones, where, condvars=None):
+    '''
+    Returns the `(start, stop)` row ranges of the zones which may contain
+    rows matching the condition `where`. Adjacent zones are merged. Parts of
+    the condition which are not comparisons of a field with a constant are
+    ignored, so that no matching row is ever skipped.
+    '''
+    if condvars is None:
+        condvars = {}
+
+    try:
+        tree = ast.parse(where.strip(), mode='eval')
+    except SyntaxError:
+        tree = None
+
+    match = None
+    if tree is not None:
+        match = _may_match(zones, tree, condvars)
+    if match is None:
+        match = np.ones(len(zones), dtype='bool')
+
+    ranges = []
+    for start, stop in zip(zones['START'][match], zones['STOP'][match]):
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], stop)
+        else:
+            ranges.append((start, stop))
+
+    return ranges
@@ -0,0 +1,65 @@
+# -*- coding: utf-8
+'''
+Converts an H5 file created by `create_dao` to a new file with the given
+layout. By default the ragged layout is used, in which only the valid points
+of each array are stored.
+'''
+from __future__ import division, print_function
+
+from youtime.common.dao import FIELDS
+from youtime.common.dao import TABLES
+from youtime.common.dao import to_int_id
+from youtime.common.dao import VideoDAO
+from youtime.create_dao import COMPLIBS
+from youtime.create_dao import DaoReducer
+from youtime.create_dao import ShardedDaoReducer
+from youtime.mapred.ig import PyTablesBlockIterator
+
+import plac
+import sys
+
+#Event types are read by name since codes are specific to each file
+COLUMNS = [field for field in FIELDS if field != VideoDAO.EVENT_CODES]
+
+def convert(in_file, out_file, ragged=True, shards=None, **kwargs):
+    '''
+    Copies every table of `in_file` (an H5 file or a manifest of shards) to
+    `out_file` block by block. If `shards` is given, `out_file` will be a 
+    manifest of this number of shards. Keyword arguments (compression and 
+    chunk options) are passed to `DaoReducer`.
+    '''
+    if shards:
+        reducer = ShardedDaoReducer(out_file, shards, ragged=ragged, **kwargs)
+    else:
+        reducer = DaoReducer(out_file, ragged, **kwargs)
+    
+    try:
+        for tname in TABLES:
+            with PyTablesBlockIterator(in_file, tname, 
+                                       columns=COLUMNS) as blocks:
+                for ids, columns in blocks:
+                    #Older files have INT_IDs created with Python's hash
+                    columns[VideoDAO.INT_ID] = [to_int_id(video_id) 
+                                                for video_id in ids]
+                    reducer.append_block(tname, columns)
+    finally:
+        reducer.close()
+
+@plac.annotations(
+    in_file=plac.Annotation('Input H5 file'),
+    out_file=plac.Annotation('Output H5 file'),
+    padded=plac.Annotation('Use the padded layout instead of ragged', 'flag'),
+    complib=plac.Annotation('Compression library', 'option', 
+                            choices=COMPLIBS),
+    complevel=plac.Annotation('Compression level (0-9)', 'option', type=int),
+    chunkshape=plac.Annotation('Number of rows of each chunk', 'option',
+                               type=int),
+    shards=plac.Annotation('Number of shards (out_file will be a manifest)',
+                           'option', type=int))
+def main(in_file, out_file, padded=False, complib=None, complevel=5,
+         chunkshape=None, shards=None):
+    convert(in_file, out_file, not padded, shards, complib=complib, 
+            complevel=complevel, chunkshape=chunkshape)
+
+if __name__ == '__main__':
+    sys.exit(plac.call(main))
@@ -15,7 +15,6 @@ from vodstats.plot.plot2d import xy_plot, XYPoints
 
 from youtime import YoutimeH5Runner
 from youtime.common.dao import VideoDAO
-from youtime.mapred.ig import PyTablesDaoIterator
 
 import numpy as np
 import os
@@ -111,7 +110,9 @@ class Correlate(YoutimeH5Runner):
     def setup(self, arg_vals):
         self.mapper_obj = CorrelateMapper()
         self.reducer_obj = CorrelateReducer(arg_vals.outf)
-        self.igen = PyTablesDaoIterator(arg_vals.in_file, arg_vals.table)
+        columns = [VideoDAO.VIEW_DATA_INTERP, VideoDAO.COMM_DATA_INTERP,
+                   VideoDAO.FAVS_DATA_INTERP]
+        self.igen = self.dao_iterator(arg_vals, columns)
     
     def finalize(self):
         self.reducer_obj.close()
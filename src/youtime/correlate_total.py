@@ -13,7 +13,6 @@ from vodstats.plot.plot2d import xy_plot, XYPoints
 
 from youtime import YoutimeH5Runner
 from youtime.common.dao import VideoDAO
-from youtime.mapred.ig import PyTablesDaoIterator
 from youtime.mapred.mappers import Noop
 
 import os
@@ -115,7 +114,9 @@ class CorrelateTotal(YoutimeH5Runner):
         super(CorrelateTotal, self).setup(arg_vals)
         self.mapper_obj = Noop()
         self.reducer_obj = CorrelateTotalReducer(arg_vals.outf)
-        self.igen = PyTablesDaoIterator(arg_vals.in_file, arg_vals.table)
+        columns = [VideoDAO.TOTAL_VIEW, VideoDAO.TOTAL_COMM,
+                   VideoDAO.TOTAL_FAVS, VideoDAO.EVENT_DATES]
+        self.igen = self.dao_iterator(arg_vals, columns)
         
     def finalize(self):
         self.reducer_obj.close()
@@ -9,81 +9,438 @@ from vod.mapreducescript import BaseMapper
 from vod.mapreducescript import BaseReducer
 from vod.mapreducescript import Runner
 
+from youtime.common import events
 from youtime.common import log
+from youtime.common import zonemaps
+from youtime.common.dao import _pc
+from youtime.common.dao import get_layout
+from youtime.common.dao import INT_ID_SCHEME
+from youtime.common.dao import offset_col
+from youtime.common.dao import RAGGED
+from youtime.common.dao import SCALARS
+from youtime.common.dao import SERIES
+from youtime.common.dao import SERIES_ATOMS
+from youtime.common.dao import SERIES_GROUP
+from youtime.common.dao import TABLES
+from youtime.common.dao import VideoDAO
 from youtime.common.dao import VideoDesc
+from youtime.common.dao import VideoRaggedDesc
+from youtime.common.ragged import RaggedArray
+from youtime.common.shards import check_scheme
+from youtime.common.shards import read_manifest
+from youtime.common.shards import shard_paths
+from youtime.common.shards import write_manifest
+from youtime.derive import derive
 from youtime.parser.dao_creator import create
+from youtime.mapred.ig import BLOCK_SIZE
 from youtime.mapred.ig import ListDir
 from youtime.parser import stats_files 
+from youtime.parser.backends import BACKENDS
 
+from tables import Filters
 from tables import openFile
 
+import numpy as np
+import os
 import sys
 
+#Compression libraries which can be used on the output
+COMPLIBS = ['zlib', 'lzo', 'blosc']
+
+#Suffix of the file listing the stats files already stored on an output
+PROCESSED_SUFFIX = '.processed'
+
+def read_processed(fpath):
+    '''
+    Returns the names of the stats files listed on `fpath`, if it exists.
+    '''
+    if not os.path.exists(fpath):
+        return []
+    
+    with open(fpath) as processed_file:
+        return [line.strip() for line in processed_file if line.strip()]
+
+def write_processed(fpath, names, append=False):
+    '''
+    Writes (or appends) the names of stats files to `fpath`.
+    '''
+    with open(fpath, 'a' if append else 'w') as processed_file:
+        for name in names:
+            print(name, file=processed_file)
+
 class CreateDAOMapper(BaseMapper):
     
-    def __init__(self, up_dates, del_dates):
+    def __init__(self, up_dates, del_dates, backend=None):
         self.up_dates = up_dates 
         self.del_dates = del_dates
+        self.backend = backend
     
-    def _map(self, key, item):
-        videos = stats_files.parse_stats(item, self.up_dates)
-        daos = []
-        for vid in videos:
+    def iter_daos(self, fpath):
+        '''
+        Yields the daos of a stats file, each video is converted as soon as
+        it is parsed.
+        '''
+        for vid in stats_files.parse_stats(fpath, self.up_dates, 
+                                           self.backend):
             try:
                 dao = create(vid, self.del_dates)
                 if dao != None:
-                    daos.append(dao)
+                    yield dao
             except:
-                log('Unable to create video')
-                
-        return daos
+                log('Unable to create video of %s' % fpath)
+    
+    def _map(self, key, item):
+        #Results may be sent to another process, thus are not a generator
+        return list(self.iter_daos(item))
 
 class DaoReducer(BaseReducer):
+    '''
+    Writes VideoDAOs (as dicts created by `youtime.parser.dao_creator`) to 
+    the days, weeks, months and years tables of an H5 file. Rows are 
+    buffered and written in blocks. If `ragged` is True, the tables are 
+    created with the ragged layout (see `youtime.common.dao.VideoRaggedDesc`)
+    instead of padding arrays to a fixed size.
     
-    def __init__(self, out_file):
+    Arguments
+    ---------
+    out_file: str
+        path of the H5 file to create
+    ragged: bool
+        use the ragged layout
+    block_size: int
+        number of rows buffered before writing
+    complib: str
+        compression library (one of COMPLIBS) or None for no compression
+    complevel: int
+        compression level (0-9), only used with `complib`
+    expectedrows: int
+        expected number of rows of each table, used by PyTables to choose 
+        the chunk shape
+    chunkshape: int
+        number of rows of each chunk of the tables, overrides `expectedrows`
+    index: bool
+        index the ID and INT_ID columns when closing (used for lookups by 
+        `youtime.mapred.ig.PyTablesDaoLookup`)
+    append: bool
+        if `out_file` exists, add videos to it instead of overwriting it. 
+        Videos already stored (on any table) are skipped and the layout of
+        the existing tables is kept.
+    '''
+    
+    def __init__(self, out_file, ragged=False, block_size=BLOCK_SIZE, 
+                 complib=None, complevel=5, expectedrows=None, 
+                 chunkshape=None, index=True, append=False):
         super(DaoReducer, self).__init__()
         
         self.out_file = out_file
+        self.ragged = ragged
+        self.block_size = block_size
+        self.index = index
+        self.pending_ids = None
+        
+        if append and os.path.exists(self.out_file):
+            self._open_existing()
+        else:
+            self._create(complib, complevel, expectedrows, chunkshape)
+    
+    def _create(self, complib, complevel, expectedrows, chunkshape):
+        filters = None
+        if complib is not None:
+            filters = Filters(complevel=complevel, complib=complib)
+        
+        table_kwargs = {'filters':filters}
+        if expectedrows is not None:
+            table_kwargs['expectedrows'] = expectedrows
+        if chunkshape is not None:
+            table_kwargs['chunkshape'] = (chunkshape,)
         
         self.h5f = openFile(self.out_file, 'w')
-        self.days   = self.h5f.createTable(self.h5f.root, 
-                                           'days', VideoDesc)
-        self.weeks  = self.h5f.createTable(self.h5f.root, 
-                                           'weeks', VideoDesc)
-        self.months = self.h5f.createTable(self.h5f.root, 
-                                           'months', VideoDesc)
-        self.years  = self.h5f.createTable(self.h5f.root, 
-                                           'years', VideoDesc)
+        self.encoder = events.EventEncoder()
+        self.tables = {}
+        self.series = {}
+        self.pending = {}
+        
+        for tname in TABLES:
+            self.pending[tname] = []
+            if self.ragged:
+                table = self.h5f.createTable(self.h5f.root, tname, 
+                                             VideoRaggedDesc, **table_kwargs)
+                table.attrs.LAYOUT = RAGGED
+                
+                group = self.h5f.createGroup('/' + SERIES_GROUP, tname, 
+                                             createparents=True)
+                self.series[tname] = {}
+                for field in SERIES:
+                    self.series[tname][field] = \
+                        self.h5f.createEArray(group, field, 
+                                              SERIES_ATOMS[field], (0,),
+                                              filters=filters)
+            else:
+                table = self.h5f.createTable(self.h5f.root, tname, VideoDesc,
+                                             **table_kwargs)
+            
+            table.attrs.INT_ID_SCHEME = INT_ID_SCHEME
+            self.tables[tname] = table
+    
+    def _open_existing(self):
+        self.h5f = openFile(self.out_file, 'a')
+        self.encoder = events.EventEncoder(events.read_names(self.h5f))
+        
+        self.tables = {}
+        self.series = {}
+        self.pending = {}
+        self.pending_ids = {}
+        
+        for tname in TABLES:
+            self.pending[tname] = []
+            table = self.h5f.getNode(self.h5f.root, tname)
+            self.ragged = get_layout(table) == RAGGED
+            if self.ragged:
+                group = self.h5f.getNode('/' + SERIES_GROUP, tname)
+                self.series[tname] = dict((field, getattr(group, field))
+                                          for field in SERIES)
+            
+            #Stored videos are looked up by INT_ID (see `_is_stored`)
+            if not table.cols.INT_ID.is_indexed:
+                table.cols.INT_ID.createIndex()
+            self.tables[tname] = table
+    
+    def append(self, dao):
+        '''
+        Adds a video to the table corresponding to its lifetime.
+        '''
+        if self.pending_ids is not None:
+            #Videos already stored are skipped when flushing
+            ids = self.pending_ids.setdefault(dao['INT_ID'], set())
+            if dao['ID'] in ids:
+                return
+            ids.add(dao['ID'])
+        
+        days = dao['DAYS']
+        
+        tname = None
+        if days <= 7:
+            tname = 'days'
+        elif days <= 30:
+            tname = 'weeks'
+        elif days <= 365:
+            tname = 'months'
+        else:
+            tname = 'years'
+        
+        pending = self.pending[tname]
+        pending.append(dao)
+        if len(pending) >= self.block_size:
+            self._flush(tname)
+    
+    def append_block(self, tname, columns):
+        '''
+        Appends a block of rows to a table. `columns` maps every field name
+        to an array with one element per row. Array fields may be given 
+        either as `RaggedArray`s or as 2d arrays in the layout of `VideoDesc`.
+        Event types may be given by name (EVENT_TYPES) instead of by code.
+        '''
+        if VideoDAO.EVENT_CODES not in columns:
+            columns = dict(columns)
+            columns[VideoDAO.EVENT_CODES] = \
+                self._encode(columns[VideoDAO.EVENT_TYPES])
+        
+        table = self.tables[tname]
+        num_rows = len(columns[VideoDAO.ID])
+        rows = np.zeros(num_rows, dtype=table.dtype)
+        
+        for field in SCALARS:
+            rows[field] = columns[field]
+        
+        for field in SERIES:
+            data = columns[field]
+            if self.ragged:
+                if not isinstance(data, RaggedArray):
+                    data = RaggedArray.from_padded(data)
+                
+                values = self.series[tname][field]
+                rows[offset_col(field)] = data.offsets[:-1] + values.nrows
+                if len(data.values) > 0:
+                    values.append(data.values)
+            else:
+                if isinstance(data, RaggedArray):
+                    data = data.to_padded(table.coldtypes[field].shape[0] - 1)
+                rows[field] = data
+        
+        table.append(rows)
+    
+    def _encode(self, event_types):
+        if not isinstance(event_types, RaggedArray):
+            event_types = RaggedArray.from_padded(event_types)
+        
+        return RaggedArray(self.encoder.encode(event_types.values), 
+                           event_types.offsets)
+    
+    def _is_stored(self, dao):
+        '''
+        Checks if a video is stored on any table. The INT_ID is looked up on
+        the index and IDs are compared only for the rows found.
+        '''
+        condvars = {'int_id':np.int64(dao[VideoDAO.INT_ID])}
+        for table in self.tables.values():
+            ids = table.readWhere('INT_ID == int_id', condvars, 
+                                  field=VideoDAO.ID)
+            if dao[VideoDAO.ID] in ids:
+                return True
+        return False
+    
+    def _flush(self, tname):
+        pending = self.pending[tname]
+        if self.pending_ids is not None:
+            for dao in pending:
+                ids = self.pending_ids[dao[VideoDAO.INT_ID]]
+                ids.discard(dao[VideoDAO.ID])
+                if not ids:
+                    del self.pending_ids[dao[VideoDAO.INT_ID]]
+            
+            pending = [dao for dao in pending if not self._is_stored(dao)]
+        
+        if not pending:
+            self.pending[tname] = []
+            return
+        
+        columns = {}
+        for field in SCALARS:
+            columns[field] = [dao[field] for dao in pending]
+        
+        columns[VideoDAO.EVENT_TYPES] = \
+            RaggedArray.from_arrays([_pc(dao[VideoDAO.EVENT_TYPES]) 
+                                     for dao in pending], 
+                                    'S%d' % events.NAME_SIZE)
+        
+        for field in SERIES:
+            if field == VideoDAO.EVENT_CODES:
+                continue
+            elif self.ragged:
+                columns[field] = \
+                    RaggedArray.from_arrays([_pc(dao[field]) 
+                                             for dao in pending],
+                                            SERIES_ATOMS[field].dtype)
+            else:
+                dtype = self.tables[tname].coldtypes[field].base
+                columns[field] = np.array([dao[field] for dao in pending],
+                                          dtype=dtype)
+        
+        self.append_block(tname, columns)
+        self.pending[tname] = []
+        
+        #Rows must be visible to the lookups of the next blocks
+        if self.pending_ids is not None:
+            self.tables[tname].flush()
     
     def _reduce(self, key, value):
         if value:
             for dao in value:
-                days = dao['DAYS']
-                
-                table = None
-                if days <= 7:
-                    table = self.days
-                elif days <= 30:
-                    table = self.weeks
-                elif days <= 365:
-                    table = self.months
-                else:
-                    table = self.years
-                row = table.row
-            
-                for key, val in dao.items():
-                    row[key] = val
-                row.append()
+                self.append(dao)
     
     def close(self):
-        self.days.flush()
-        self.weeks.flush()
-        self.months.flush()
-        self.years.flush()
+        for tname in TABLES:
+            self._flush(tname)
+            
+            table = self.tables[tname]
+            if self.index:
+                for column in (table.cols.ID, table.cols.INT_ID):
+                    if not column.is_indexed:
+                        column.createIndex()
+            table.flush()
+            zonemaps.write_zones(self.h5f, table)
         
+        events.write_names(self.h5f, self.encoder.names)
         self.h5f.flush()
         self.h5f.close()
 
+class ShardedDaoReducer(BaseReducer):
+    '''
+    Writes VideoDAOs to `num_shards` H5 files partitioned by their INT_ID 
+    (see `youtime.common.shards`). Each shard is written by a 
+    `DaoReducer` created with the keyword arguments given. The manifest 
+    listing the shards is written on `manifest_path` when closing.
+    '''
+    
+    def __init__(self, manifest_path, num_shards, **kwargs):
+        super(ShardedDaoReducer, self).__init__()
+        
+        if kwargs.get('append') and os.path.exists(manifest_path):
+            check_scheme(manifest_path)
+            if len(read_manifest(manifest_path)) != num_shards:
+                raise Exception('Manifest %s does not have %d shards' % 
+                                (manifest_path, num_shards))
+        
+        self.manifest_path = manifest_path
+        self.num_shards = num_shards
+        self.paths = shard_paths(manifest_path, num_shards)
+        self.reducers = [DaoReducer(path, **kwargs) for path in self.paths]
+    
+    def append(self, dao):
+        '''
+        Adds a video to its shard.
+        '''
+        shard = dao['INT_ID'] % self.num_shards
+        self.reducers[shard].append(dao)
+    
+    def append_block(self, tname, columns):
+        '''
+        Splits a block of rows (see `DaoReducer.append_block`) among the 
+        shards.
+        '''
+        shards = np.asarray(columns[VideoDAO.INT_ID]) % self.num_shards
+        
+        for shard, reducer in enumerate(self.reducers):
+            idx = np.where(shards == shard)[0]
+            if len(idx) == 0:
+                continue
+            
+            shard_columns = {}
+            for field, data in columns.iteritems():
+                if isinstance(data, RaggedArray):
+                    data = RaggedArray.from_arrays([data[i] for i in idx], 
+                                                   data.values.dtype)
+                else:
+                    data = np.asarray(data)[idx]
+                shard_columns[field] = data
+            
+            reducer.append_block(tname, shard_columns)
+    
+    def _reduce(self, key, value):
+        if value:
+            for dao in value:
+                self.append(dao)
+    
+    def close(self):
+        for reducer in self.reducers:
+            reducer.close()
+        
+        write_manifest(self.manifest_path, self.paths)
+
+class ProcessedReducer(BaseReducer):
+    '''
+    Gives the daos created from each stats file (the key) to `reducer` and
+    keeps the names of the files which produced any dao on `processed`. 
+    Files without daos (e.g., every video failed to be created) are logged 
+    and not kept, so that they are not recorded as processed and are tried 
+    again by `--append`.
+    '''
+    
+    def __init__(self, reducer):
+        super(ProcessedReducer, self).__init__()
+        self.reducer = reducer
+        self.processed = []
+    
+    def _reduce(self, key, value):
+        if value:
+            self.reducer._reduce(key, value)
+            self.processed.append(key)
+        else:
+            log('No videos created from %s' % key)
+    
+    def close(self):
+        self.reducer.close()
+
 class CreateDAO(Runner):
 
     def __init__(self, name, description):
@@ -91,6 +448,10 @@ class CreateDAO(Runner):
         self.igen_obj = None
         self.mapper_obj = None
         self.reducer_obj = None
+        self.processed_fpath = None
+        self.append = False
+        self.derive = False
+        self.outf = None
     
     def item_generator(self):
         return self.igen_obj
@@ -103,6 +464,11 @@ class CreateDAO(Runner):
     
     def finalize(self):
         self.reducer_obj.close()
+        write_processed(self.processed_fpath, self.reducer_obj.processed, 
+                        self.append)
+        
+        if self.derive:
+            derive(self.outf)
     
     def add_custom_aguments(self, parser):
         parser.add_argument('indir', type=str, 
@@ -117,6 +483,38 @@ class CreateDAO(Runner):
         parser.add_argument('--del_dates',  action='store_true', 
                             help='Indicates if deletion dates are on the file')
         
+        parser.add_argument('--ragged',  action='store_true', 
+                            help='Store arrays with the ragged layout')
+        
+        parser.add_argument('--complib', type=str, choices=COMPLIBS,
+                            default=None, help='Compression library')
+        
+        parser.add_argument('--complevel', type=int, default=5,
+                            help='Compression level (0-9)')
+        
+        parser.add_argument('--expectedrows', type=int, default=None,
+                            help='Expected number of rows of each table')
+        
+        parser.add_argument('--chunkshape', type=int, default=None,
+                            help='Number of rows of each chunk')
+        
+        parser.add_argument('--shards', type=int, default=None,
+                            help='Partition videos in this number of files. '
+                                 'The output file will be a manifest '
+                                 'listing them')
+        
+        parser.add_argument('--append',  action='store_true', 
+                            help='Add new videos to an existing output, '
+                                 'skipping stats files already processed')
+        
+        parser.add_argument('--derive',  action='store_true', 
+                            help='Compute the derived fields (see '
+                                 'youtime.derive) of the output')
+        
+        parser.add_argument('--parser', type=str, choices=sorted(BACKENDS),
+                            default=None, help='Parser backend (lxml is '
+                                               'used when installed)')
+        
     def setup(self, arg_vals):
         up_dates_dict = {}
         del_dates_dict = None
@@ -135,9 +533,31 @@ class CreateDAO(Runner):
                     del_date = float(spl[2])
                     del_dates_dict[id_] = del_date
         
-        self.igen_obj = ListDir(arg_vals.indir, ignore='info')
-        self.mapper_obj = CreateDAOMapper(up_dates_dict, del_dates_dict)
-        self.reducer_obj = DaoReducer(arg_vals.outf)
+        self.append = arg_vals.append
+        self.derive = arg_vals.derive
+        self.outf = arg_vals.outf
+        self.processed_fpath = arg_vals.outf + PROCESSED_SUFFIX
+        
+        skip = None
+        if self.append:
+            skip = read_processed(self.processed_fpath)
+        
+        self.igen_obj = ListDir(arg_vals.indir, ignore='info', skip=skip)
+        self.mapper_obj = CreateDAOMapper(up_dates_dict, del_dates_dict, 
+                                          arg_vals.parser)
+        kwargs = {'ragged':arg_vals.ragged,
+                  'complib':arg_vals.complib,
+                  'complevel':arg_vals.complevel,
+                  'expectedrows':arg_vals.expectedrows,
+                  'chunkshape':arg_vals.chunkshape,
+                  'append':arg_vals.append}
+        
+        if arg_vals.shards:
+            reducer = ShardedDaoReducer(arg_vals.outf, arg_vals.shards, 
+                                        **kwargs)
+        else:
+            reducer = DaoReducer(arg_vals.outf, **kwargs)
+        self.reducer_obj = ProcessedReducer(reducer)
         
 if __name__ == '__main__':
     runner = CreateDAO(sys.argv[0], __doc__)
@@ -15,7 +15,6 @@ from youtime import YoutimeH5Runner
 from youtime.common.constants import TSERIES_SIZE
 from youtime.common.time_series import cross_corr
 from youtime.common.dao import VideoDAO
-from youtime.mapred.ig import PyTablesDaoIterator
 
 import numpy as np
 import os
@@ -131,7 +130,9 @@ class Correlate(YoutimeH5Runner):
     def setup(self, arg_vals):
         self.mapper_obj = CorrelateMapper()
         self.reducer_obj = CorrelateReducer(arg_vals.outf)
-        self.igen = PyTablesDaoIterator(arg_vals.in_file, arg_vals.table)
+        columns = [VideoDAO.VIEW_DATA_ORIG, VideoDAO.COMM_DATA_ORIG,
+                   VideoDAO.FAVS_DATA_ORIG]
+        self.igen = self.dao_iterator(arg_vals, columns)
     
     def finalize(self):
         self.reducer_obj.close()
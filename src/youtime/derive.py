@@ -0,0 +1,67 @@
+# -*- coding: utf-8
+'''
+Computes the derived fields (see `youtime.common.derived`) of every table
+of an H5 file created by `create_dao` (or of every shard of a manifest).
+After this, iterators can read the derived fields (CUM_VIEW, WEEK_VIEW,
+MONTH_VIEW, GROUP_VIEW, ...) as any other field. Aggregation levels of
+other sizes are computed with `--windows`, e.g. `--windows 14,90` adds
+VIEW_DATA_INTERP_14D, VIEW_DATA_INTERP_90D and the same levels of comments
+and favorites. Run it again whenever videos are appended to the file.
+'''
+from __future__ import division, print_function
+
+from youtime.common import derived
+from youtime.common.dao import TABLES
+from youtime.common.ragged import RaggedArray
+from youtime.common.shards import get_files
+from youtime.mapred.ig import _read
+from youtime.mapred.ig import BLOCK_SIZE
+
+from tables import openFile
+
+import plac
+import sys
+
+def _source_blocks(table, block_size):
+    for start in xrange(0, table.nrows, block_size):
+        stop = min(start + block_size, table.nrows)
+        columns = _read(table, derived.SOURCES, start, stop)
+        for field, data in columns.items():
+            if not isinstance(data, RaggedArray):
+                columns[field] = RaggedArray.from_padded(data)
+        yield columns
+
+def parse_windows(windows):
+    '''
+    Parses a comma separated list of window sizes (in days).
+    '''
+    levels = [int(size) for size in windows.split(',') if size.strip()]
+    if any(size <= 0 for size in levels):
+        raise Exception('Window sizes must be positive: %s' % windows)
+    return levels
+
+def derive(in_file, block_size=BLOCK_SIZE, levels=derived.LEVELS):
+    '''
+    Computes and writes the derived fields of `in_file`, with aggregation
+    levels of `levels` days.
+    '''
+    for fpath in get_files(in_file):
+        h5file = openFile(fpath, 'a')
+        try:
+            for tname in TABLES:
+                table = h5file.getNode(h5file.root, tname)
+                derived.write_derived(h5file, table,
+                                      _source_blocks(table, block_size),
+                                      levels)
+        finally:
+            h5file.close()
+
+@plac.annotations(
+    in_file=plac.Annotation('H5 file (or manifest)'),
+    windows=plac.Annotation('Comma separated sizes (in days) of extra '
+                            'aggregation levels', kind='option'))
+def main(in_file, windows=''):
+    derive(in_file, levels=derived.LEVELS + parse_windows(windows))
+
+if __name__ == '__main__':
+    sys.exit(plac.call(main))
@@ -17,7 +17,6 @@ from vodstats.plot.plot2d import xy_plot, XYPoints
 
 from youtime import YoutimeH5Runner
 from youtime.common.dao import VideoDAO
-from youtime.mapred.ig import PyTablesDaoIterator
 
 import os
 import sys
@@ -81,7 +80,9 @@ class EventDatesRunner(YoutimeH5Runner):
         return self.reducer_obj
     
     def setup(self, arg_vals):
-        self.igen = PyTablesDaoIterator(arg_vals.in_file, arg_vals.table)
+        columns = [VideoDAO.EVENT_DATES, VideoDAO.EVENT_TYPES,
+                   VideoDAO.DATE_POINTS_INTERP]
+        self.igen = self.dao_iterator(arg_vals, columns)
         self.mapper_obj = EventDateMapper()
         self.reducer_obj = EventDateReducer(arg_vals.outf)
     
@@ -14,7 +14,6 @@ from vod.mapreducescript import BaseMapper
 from vod.mapreducescript import BaseReducer
 
 from youtime import YoutimeH5Runner
-from youtime.mapred.ig import PyTablesDaoIterator
 from youtime.common.dao import VideoDAO
 
 import numpy as np
@@ -94,7 +93,9 @@ class EventViewsRunner(YoutimeH5Runner):
         return self.reducer_obj
     
     def setup(self, arg_vals):
-        self.igen = PyTablesDaoIterator(arg_vals.in_file, arg_vals.table)
+        columns = [VideoDAO.EVENT_VIEWS, VideoDAO.EVENT_TYPES,
+                   VideoDAO.TOTAL_VIEW]
+        self.igen = self.dao_iterator(arg_vals, columns)
         self.mapper_obj = EventViewsMapper()
         self.reducer_obj = EventViewsReducer(arg_vals.outf)
     
@@ -17,7 +17,6 @@ from vodstats.plot.plot2d import box_plot, xy_plot, Box, XYPoints
 from youtime import YoutimeH5Runner
 from youtime.common.dao import VideoDAO
 from youtime.event_views import EventViewsMapper
-from youtime.mapred.ig import PyTablesDaoIterator
 
 import os
 import sys
@@ -94,7 +93,9 @@ class EventViewsGroupedRunner(YoutimeH5Runner):
         return self.reducer_obj
     
     def setup(self, arg_vals):
-        self.igen = PyTablesDaoIterator(arg_vals.in_file, arg_vals.table)
+        columns = [VideoDAO.EVENT_VIEWS, VideoDAO.EVENT_TYPES,
+                   VideoDAO.TOTAL_VIEW]
+        self.igen = self.dao_iterator(arg_vals, columns)
         self.mapper_obj = EventViewsMapper()
         self.reducer_obj = EventViewsReducer(arg_vals.outf)
     
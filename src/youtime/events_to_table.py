@@ -1,16 +1,14 @@
 # -*- coding: utf-8
 from __future__ import division, print_function
 
-from itertools import izip
-
 from vod.mapreducescript import BaseMapper
 from vod.mapreducescript import BaseReducer
 
 from youtime import YoutimeH5Runner
+from youtime.common import events
 from youtime.common.constants import DAY
 from youtime.common.constants import TSERIES_SIZE 
 from youtime.common.dao import VideoDAO
-from youtime.mapred.ig import PyTablesDaoIterator
 
 import numpy as np
 
@@ -70,14 +68,25 @@ class EventsTableMapper(BaseMapper):
         video_collect_date = item[VideoDAO.LAST_DATE]
         delta = DAY
         
-        ev_types = item[VideoDAO.EVENT_TYPES]
+        ev_codes = item[VideoDAO.EVENT_CODES]
         ev_dates = item[VideoDAO.EVENT_DATES]
         ev_views = item[VideoDAO.EVENT_VIEWS]
 
-        ev2group = VideoDAO.EV2GROUP
         groups = VideoDAO.EV_GROUPS.copy()
         del groups['NOT_CAPTURED']
         
+        #Views and first date of each group of events
+        ev_groups = events.code_groups(ev_codes)
+        num_groups = events.UNKNOWN_GROUP
+        grouped_views, grouped_counts = events.group_sums(ev_codes, ev_views)
+        grouped_dates = np.empty(num_groups + 1, dtype='int64')
+        grouped_dates.fill(np.iinfo('int64').max)
+        np.minimum.at(grouped_dates, ev_groups, ev_dates)
+        
+        present_groups = [(events.GROUPS[code], code) 
+                          for code in np.nonzero(grouped_counts)[0]
+                          if events.GROUPS[code] in groups]
+        
         return_val = {}
         windows = range(1, TSERIES_SIZE + 1) + [-1]
         for time_window in windows:
@@ -111,26 +120,14 @@ class EventsTableMapper(BaseMapper):
             current_row[GROWTH_COMM] = get_avg_rate(comms_so_far)
             current_row[GROWTH_FAVS] = get_avg_rate(favs_so_far)
             
-            grouped_dates = {}
-            grouped_views = {}
-            for ev_type, ev_date, ev_view in izip(ev_types, ev_dates, ev_views):
-                ev_group = ev2group[ev_type]
-                    
-                if ev_group not in grouped_dates:
-                    grouped_views[ev_group] = ev_view
-                    grouped_dates[ev_group] = ev_date
-                else:
-                    prev_date = grouped_dates[ev_group]
-                    grouped_dates[ev_group] = min(prev_date, ev_date)
-                    grouped_views[ev_group] = grouped_views[ev_group]+ ev_view
-            
             date_so_far = video_upload_date + (time_window + 1) * delta
-            for ev_group, group_date in grouped_dates.items():
-                if group_date <= date_so_far:
+            for ev_group, code in present_groups:
+                if grouped_dates[code] <= date_so_far:
                     current_row[date_label(ev_group)] = video_upload_date
                 
                 if print_ev_views:
-                    current_row[view_label(ev_group)] = grouped_views[ev_group] 
+                    current_row[view_label(ev_group)] = \
+                        int(grouped_views[code])
                      
         return return_val
         
@@ -191,7 +188,12 @@ class EventsTableRunner(YoutimeH5Runner):
         return self.reducer_obj
     
     def setup(self, arg_vals):
-        self.igen = PyTablesDaoIterator(arg_vals.in_file, arg_vals.table)
+        columns = [VideoDAO.VIEW_DATA_ORIG, VideoDAO.VIEW_DATA_INTERP,
+                   VideoDAO.COMM_DATA_INTERP, VideoDAO.FAVS_DATA_INTERP,
+                   VideoDAO.FIRST_DATE, VideoDAO.LAST_DATE,
+                   VideoDAO.EVENT_CODES, VideoDAO.EVENT_DATES,
+                   VideoDAO.EVENT_VIEWS]
+        self.igen = self.dao_iterator(arg_vals, columns)
         self.mapper_obj = EventsTableMapper()
         self.reducer_obj = EventsTableReducer(arg_vals.outf)
     
@@ -0,0 +1,127 @@
+# -*- coding: utf-8
+'''
+Exports an H5 file created by `create_dao` (or a manifest of shards) to a
+folder of NumPy `.npy` files which can be memory mapped. Each table becomes
+a sub-folder with one file per scalar field and, for each array field, one
+file with the values of every video and one (`<FIELD>_OFFSET.npy`) with
+the offsets where the values of each video start (plus the total size).
+Names of the event codes are kept on `event_types.npy`.
+
+Use `youtime.mapred.ig.NpyDaoIterator` (or the folder as the input of any
+`YoutimeH5Runner` script) to read the exported data.
+'''
+from __future__ import division, print_function
+
+from youtime.common import events
+from youtime.common.dao import offset_col
+from youtime.common.dao import SCALARS
+from youtime.common.dao import SERIES
+from youtime.common.dao import SERIES_ATOMS
+from youtime.common.dao import TABLES
+from youtime.common.dao import VideoDAO
+from youtime.common.dao import VideoRaggedDesc
+from youtime.common.ragged import RaggedArray
+from youtime.convert_dao import COLUMNS
+from youtime.mapred.ig import NPY_EVENT_TYPES
+from youtime.mapred.ig import PyTablesBlockIterator
+
+import numpy as np
+import os
+import plac
+import sys
+
+class _NpyAppender(object):
+    '''
+    Appends arrays to a temporary file which is turned into an `.npy` file
+    (of one dimension) when closed.
+    '''
+
+    def __init__(self, fpath, dtype):
+        self.fpath = fpath
+        self.dtype = np.dtype(dtype)
+        self.tmp_fpath = fpath + '.tmp'
+        self.tmp_file = open(self.tmp_fpath, 'wb')
+        self.size = 0
+
+    def append(self, data):
+        data = np.asarray(data, dtype=self.dtype)
+        self.tmp_file.write(data.tostring())
+        self.size += len(data)
+
+    def close(self):
+        self.tmp_file.close()
+
+        out = np.lib.format.open_memmap(self.fpath, 'w+', self.dtype,
+                                        (self.size,))
+        if self.size > 0:
+            out[:] = np.memmap(self.tmp_fpath, self.dtype, 'r',
+                               shape=(self.size,))
+        out.flush()
+        del out
+        os.remove(self.tmp_fpath)
+
+def export(in_file, out_dir):
+    '''
+    Exports every table of `in_file` to `out_dir`.
+    '''
+    encoder = events.EventEncoder()
+    for tname in TABLES:
+        table_dir = os.path.join(out_dir, tname)
+        if not os.path.exists(table_dir):
+            os.makedirs(table_dir)
+
+        appenders = {}
+        for field in SCALARS:
+            dtype = VideoRaggedDesc.columns[field].dtype
+            appenders[field] = \
+                _NpyAppender(os.path.join(table_dir, field + '.npy'), dtype)
+
+        num_values = {}
+        for field in SERIES:
+            appenders[field] = \
+                _NpyAppender(os.path.join(table_dir, field + '.npy'),
+                             SERIES_ATOMS[field].dtype)
+            appenders[offset_col(field)] = \
+                _NpyAppender(os.path.join(table_dir,
+                                          offset_col(field) + '.npy'), 'int64')
+            appenders[offset_col(field)].append([0])
+            num_values[field] = 0
+
+        with PyTablesBlockIterator(in_file, tname, 
+                                   columns=COLUMNS) as blocks:
+            for _, columns in blocks:
+                #Codes are specific to each file, so events are encoded again
+                event_types = columns.pop(VideoDAO.EVENT_TYPES)
+                if not isinstance(event_types, RaggedArray):
+                    event_types = RaggedArray.from_padded(event_types)
+                columns[VideoDAO.EVENT_CODES] = \
+                    RaggedArray(encoder.encode(event_types.values),
+                                event_types.offsets)
+
+                for field in SCALARS:
+                    appenders[field].append(columns[field])
+
+                for field in SERIES:
+                    data = columns[field]
+                    if not isinstance(data, RaggedArray):
+                        data = RaggedArray.from_padded(data)
+
+                    appenders[field].append(data.values)
+                    appenders[offset_col(field)].append(data.offsets[1:] +
+                                                        num_values[field])
+                    num_values[field] += len(data.values)
+
+        for appender in appenders.values():
+            appender.close()
+
+    np.save(os.path.join(out_dir, NPY_EVENT_TYPES),
+            np.array(encoder.names, dtype='S%d' % events.NAME_SIZE))
+
+@plac.annotations(
+    in_file=plac.Annotation('Input H5 file (or manifest)'),
+    out_dir=plac.Annotation('Output folder'))
+def main(in_file, out_dir):
+    export(in_file, out_dir)
+
+if __name__ == '__main__':
+    sys.exit(plac.call(main))
@@ -0,0 +1,115 @@
+# -*- coding: utf-8
+'''
+Exports an H5 file created by `create_dao` (or a manifest of shards) to a
+folder of Apache Parquet files, one per table (`<table>.parquet`). Scalar
+fields become plain columns and array fields (time series and event types)
+become list columns, so columnar readers can load only the fields they need.
+Each block of rows read from the H5 file is written as a row group.
+
+Requires pyarrow. Use `youtime.mapred.ig.ParquetDaoIterator` (or the folder
+as the input of any `YoutimeH5Runner` script) to read the exported data.
+'''
+from __future__ import division, print_function
+
+from youtime.common.dao import SCALARS
+from youtime.common.dao import SERIES
+from youtime.common.dao import SERIES_ATOMS
+from youtime.common.dao import TABLES
+from youtime.common.dao import VideoDAO
+from youtime.common.dao import VideoRaggedDesc
+from youtime.common.ragged import RaggedArray
+from youtime.convert_dao import COLUMNS
+from youtime.mapred.ig import BLOCK_SIZE
+from youtime.mapred.ig import PARQUET_EXT
+from youtime.mapred.ig import PyTablesBlockIterator
+
+import os
+import plac
+import pyarrow as pa
+import pyarrow.parquet as pq
+import sys
+
+#Compression codecs which can be used on the output
+CODECS = ['none', 'snappy', 'gzip', 'brotli', 'lz4', 'zstd']
+
+#Event codes are specific to each H5 file, so names are exported instead
+LIST_FIELDS = [field for field in SERIES if field != VideoDAO.EVENT_CODES] + \
+    [VideoDAO.EVENT_TYPES]
+
+def _arrow_type(dtype):
+    if dtype.kind == 'S':
+        return pa.string()
+    else:
+        return pa.from_numpy_dtype(dtype)
+
+def _schema():
+    fields = []
+    for field in SCALARS:
+        dtype = VideoRaggedDesc.columns[field].dtype
+        fields.append(pa.field(field, _arrow_type(dtype)))
+
+    for field in LIST_FIELDS:
+        if field == VideoDAO.EVENT_TYPES:
+            value_type = pa.string()
+        else:
+            value_type = _arrow_type(SERIES_ATOMS[field].dtype)
+        fields.append(pa.field(field, pa.list_(value_type)))
+
+    return pa.schema(fields)
+
+def _to_arrow(data, arrow_type):
+    if arrow_type == pa.string():
+        #Fixed size strings are padded with zeros which are not kept
+        return pa.array(data.tolist(), type=arrow_type)
+    else:
+        return pa.array(data, type=arrow_type)
+
+def to_table(columns, schema):
+    '''
+    Converts a block of rows (as returned by
+    `youtime.mapred.ig.PyTablesBlockIterator`) to an Arrow table.
+    '''
+    arrays = []
+    for field in schema:
+        data = columns[field.name]
+        if field.name in SCALARS:
+            arrays.append(_to_arrow(data, field.type))
+        else:
+            if not isinstance(data, RaggedArray):
+                data = RaggedArray.from_padded(data)
+
+            offsets = pa.array(data.offsets.astype('int32'))
+            values = _to_arrow(data.values, field.type.value_type)
+            arrays.append(pa.ListArray.from_arrays(offsets, values))
+
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def export(in_file, out_dir, compression='snappy', block_size=BLOCK_SIZE):
+    '''
+    Exports every table of `in_file` to `out_dir`.
+    '''
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+
+    schema = _schema()
+    for tname in TABLES:
+        fpath = os.path.join(out_dir, tname + PARQUET_EXT)
+        writer = pq.ParquetWriter(fpath, schema, compression=compression)
+        try:
+            with PyTablesBlockIterator(in_file, tname, block_size=block_size,
+                                       columns=COLUMNS) as blocks:
+                for _, columns in blocks:
+                    writer.write_table(to_table(columns, schema))
+        finally:
+            writer.close()
+
+@plac.annotations(
+    in_file=plac.Annotation('Input H5 file (or manifest)'),
+    out_dir=plac.Annotation('Output folder'),
+    compression=plac.Annotation('Compression codec', kind='option',
+                                choices=CODECS))
+def main(in_file, out_dir, compression='snappy'):
+    export(in_file, out_dir, compression)
+
+if __name__ == '__main__':
+    sys.exit(plac.call(main))
@@ -5,8 +5,6 @@ crawl.
 '''
 from __future__ import division, print_function
 
-from BeautifulSoup import BeautifulStoneSoup
-
 from parser import stats_files
 
 import glob
@@ -26,8 +24,7 @@ def extract(fpath):
      
     try:
         xmls = stats_files._get_video_xmls(fpath, up_dates)
-        xml_soup = BeautifulStoneSoup(xmls[vid_id])
-        html = xml_soup.find('html_content').string
+        html = stats_files._html_content(xmls[vid_id])
 
         data = stats_files._parse_html_topic(vid_id, html, up_dates)
         top = data['TOPY']
@@ -4,80 +4,884 @@
 from __future__ import division, print_function
 
 from collections import defaultdict
+from collections import deque
 from collections import Iterator
 from itertools import chain
+from multiprocessing import Pool
 from tables import openFile
 
+from youtime.common import derived
+from youtime.common import events
+from youtime.common import sharedblocks
+from youtime.common import zonemaps
+from youtime.common.dao import FIELDS
+from youtime.common.dao import get_layout
+from youtime.common.dao import INT_ID_SCHEME
+from youtime.common.dao import offset_col
+from youtime.common.dao import RaggedVideoDAO
+from youtime.common.dao import RAGGED
+from youtime.common.dao import SCALARS
+from youtime.common.dao import SERIES_GROUP
+from youtime.common.dao import TABLES
+from youtime.common.dao import to_int_id
 from youtime.common.dao import VideoDAO
+from youtime.common.datasets import read_dataset
+from youtime.common.ragged import RaggedArray
+from youtime.common.shards import check_scheme
+from youtime.common.shards import get_files
+from youtime.common.shards import is_manifest
+from youtime.common.shards import shard_of
 
+import numexpr
+import numpy as np
 import os
 
+#Number of rows read at once by block iterators
+BLOCK_SIZE = 1024
+
+#File with the names of event codes on folders created by `export_npy`
+NPY_EVENT_TYPES = 'event_types.npy'
+
+#Extension of the tables on folders created by `export_parquet`
+PARQUET_EXT = '.parquet'
+
 class ListDir(Iterator):
     '''
     This iterator returns the files which belong to a folder
-    in a non-recursive manner. 
+    in a non-recursive manner. Files with names in `skip` (e.g., files 
+    already processed) are not returned. The names of the returned files 
+    are kept on `listed`.
     ''' 
     
     #TODO: change ignore to be a regex
-    def __init__(self, indir, ignore=None):
+    def __init__(self, indir, ignore=None, skip=None):
         self.indir = indir
         self.items = iter(os.listdir(self.indir))
         self.filter = ignore
+        self.skip = frozenset(skip or [])
+        self.listed = []
+
+    def _ignored(self, item_name):
+        return (self.filter and self.filter in item_name) or \
+            item_name in self.skip
 
     def next(self):
         item_name = self.items.next()
-        if self.filter: 
-            while self.filter in item_name: 
-                item_name = self.items.next()
+        while self._ignored(item_name): 
+            item_name = self.items.next()
         
+        self.listed.append(item_name)
         full_path = os.path.join(self.indir, item_name)
         return (item_name, full_path)
 
-class PyTablesDaoIterator(Iterator):
+def _get_tables(h5file, tname=None):
+    '''
+    Returns the tables of an H5 PyTables file which should be processed. 
+    Using `None` or 'all' as the table name will return every table.
+    
+    Arguments
+    ---------
+    h5file: PyTables file
+        the opened file
+    tname: str
+        one of `youtime.common.dao.TABLES`, 'all' or None
+    '''
+    if tname is None or tname == 'all':
+        return [h5file.getNode(h5file.root, name) for name in TABLES]
+    elif tname in TABLES:
+        return [h5file.getNode(h5file.root, tname)]
+    else:
+        raise Exception('Unknown table %s' % tname)
+
+def _open_tables(pytfpath, tname=None, shard=None):
+    '''
+    Opens an H5 file, or the shards listed on a manifest (see 
+    `youtime.common.shards`), and returns the opened files and the tables to 
+    be processed (see `_get_tables`). If `shard` is given only that shard 
+    of the manifest is opened.
+    '''
+    files = [openFile(fpath, 'r') for fpath in get_files(pytfpath, shard)]
+    tables = []
+    try:
+        for h5file in files:
+            tables.extend(_get_tables(h5file, tname))
+    except:
+        for h5file in files:
+            h5file.close()
+        raise
+    
+    return files, tables
+
+def _read_ragged(table, start, stop, names):
+    '''
+    Reads rows `[start, stop)` of a ragged table. The values of each array
+    field are read with a single slice of the corresponding EArray and 
+    returned as a `RaggedArray`.
+    '''
+    #One extra row is read so that we know where the last array ends
+    block = table.read(start, min(stop + 1, table.nrows))
+    num_rows = stop - start
+    
+    columns = {}
+    for name in names:
+        if name in SCALARS:
+            columns[name] = block[name][:num_rows]
+            continue
+        
+        values = table._v_file.getNode('/%s/%s' % (SERIES_GROUP, table.name), 
+                                       name)
+        offsets = np.empty(num_rows + 1, dtype='int64')
+        offsets[:num_rows] = block[offset_col(name)][:num_rows]
+        if len(block) > num_rows:
+            offsets[num_rows] = block[offset_col(name)][num_rows]
+        else:
+            offsets[num_rows] = values.nrows
+        
+        first = offsets[0]
+        columns[name] = RaggedArray(values.read(first, offsets[num_rows]), 
+                                    offsets - first)
+    return columns
+
+def _read_coordinates(table, coords, names):
+    '''
+    Reads the rows at the (sorted) `coords` of a table. Returns a dict which
+    maps field names to arrays, as the ones of `_read_blocks`. On ragged 
+    tables, coordinates are read as runs of consecutive rows (see 
+    `_read_ragged`), so each array field is read with one slice per run.
+    '''
+    if get_layout(table) != RAGGED:
+        rows = table.readCoordinates(coords)
+        return dict((name, rows[name]) for name in names)
+    
+    #An empty run still gives the columns (with no rows)
+    runs = derived._runs(np.asarray(coords)) or [(0, 0)]
+    parts = [_read_ragged(table, start, stop, names) for start, stop in runs]
+    
+    columns = {}
+    for name in names:
+        if name in SCALARS:
+            columns[name] = np.concatenate([part[name] for part in parts])
+        else:
+            columns[name] = RaggedArray.concatenate([part[name] 
+                                                     for part in parts])
+    return columns
+
+def _stores_codes(table):
+    return VideoDAO.EVENT_CODES in table.colnames or \
+        offset_col(VideoDAO.EVENT_CODES) in table.colnames
+
+def _stored_names(table, names):
+    '''
+    Returns the fields which have to be read from a table to return `names`.
+    Files created before event types were encoded store only the names
+    of the events, newer ones only the codes.
     '''
-    A generator over VideoDAOs stored on an H5 PyTables file.
+    stores_codes = _stores_codes(table)
+    
+    return_val = []
+    for name in names:
+        if derived.is_derived(name):
+            continue
+        elif name == VideoDAO.EVENT_TYPES and stores_codes:
+            name = VideoDAO.EVENT_CODES
+        elif name == VideoDAO.EVENT_CODES and not stores_codes:
+            name = VideoDAO.EVENT_TYPES
+        
+        if name not in return_val:
+            return_val.append(name)
+    return return_val
+
+def _event_columns(table, columns, names):
+    '''
+    Decodes (or encodes) event types if `names` has a field which is not 
+    stored (see `_stored_names`).
+    '''
+    if VideoDAO.EVENT_TYPES in names and VideoDAO.EVENT_TYPES not in columns:
+        codes = columns[VideoDAO.EVENT_CODES]
+        event_names = events.read_names(table._v_file)
+        if isinstance(codes, RaggedArray):
+            types = RaggedArray(events.decode(codes.values, event_names), 
+                                codes.offsets)
+        else:
+            types = events.decode(codes, event_names)
+            types[:, 0] = codes[:, 0]
+        columns[VideoDAO.EVENT_TYPES] = types
+    
+    if VideoDAO.EVENT_CODES in names and VideoDAO.EVENT_CODES not in columns:
+        types = columns[VideoDAO.EVENT_TYPES]
+        encoder = events.EventEncoder()
+        if isinstance(types, RaggedArray):
+            codes = RaggedArray(encoder.encode(types.values), types.offsets)
+        else:
+            ragged = RaggedArray.from_padded(types)
+            codes = RaggedArray(encoder.encode(ragged.values), ragged.offsets)
+            codes = codes.to_padded(types.shape[1] - 1)
+        columns[VideoDAO.EVENT_CODES] = codes
+    
+    for name in columns.keys():
+        if name not in names:
+            del columns[name]
+    
+    return columns
+
+def _read(table, names, start=None, stop=None, coords=None):
+    '''
+    Reads rows `[start, stop)`, or the ones at `coords`, of a table of either 
+    layout. Returns a dict which maps each name to an array. Derived fields 
+    (see `youtime.common.derived`) are always `RaggedArray`s.
+    '''
+    stored = _stored_names(table, names)
+    if coords is not None:
+        columns = _read_coordinates(table, coords, stored)
+    elif get_layout(table) == RAGGED:
+        columns = _read_ragged(table, start, stop, stored)
+    else:
+        block = table.read(start, stop)
+        columns = dict((name, block[name]) for name in stored)
+    
+    columns = _event_columns(table, columns, names)
+    
+    derived_names = [name for name in names if derived.is_derived(name)]
+    if derived_names:
+        columns.update(derived.read_derived(table, derived_names, start, 
+                                            stop, coords))
+    return columns
+
+def _where_coords(table, where, start=None, stop=None):
+    '''
+    Returns the coordinates of the rows of a table (of rows `[start, stop)`
+    if given) matching `where`. If the table has a zone map, only the zones
+    which may have matching rows are searched.
+    '''
+    zones = zonemaps.read_zones(table)
+    if zones is None:
+        return table.getWhereList(where, start=start, stop=stop)
+    
+    if start is None:
+        start = 0
+    if stop is None:
+        stop = table.nrows
+    
+    ranges = [(max(zone_start, start), min(zone_stop, stop))
+              for zone_start, zone_stop in 
+              zonemaps.candidate_zones(zones, where)]
+    coords = [table.getWhereList(where, start=range_start, stop=range_stop)
+              for range_start, range_stop in ranges 
+              if range_start < range_stop]
+    if not coords:
+        return np.zeros(0, dtype='int64')
+    
+    return np.concatenate(coords)
+
+def _read_blocks(tables, block_size=BLOCK_SIZE, names=None, where=None):
+    '''
+    Reads the given tables in blocks of at most `block_size` rows. Each
+    block is returned as a tuple `(layout, columns)` where `columns` maps 
+    field names (every field if `names` is None) to arrays. On padded 
+    tables, array fields are 2d arrays in the layout of `VideoDesc`, on 
+    ragged ones they are `RaggedArray`s.
+    
+    If `where` (a PyTables condition over scalar columns) is given, it is
+    evaluated in-kernel and only the matching rows are read. Chunks which 
+    cannot match it are skipped using the zone maps of the tables (see 
+    `youtime.common.zonemaps`).
+    '''
+    for table in tables:
+        layout = get_layout(table)
+        
+        table_names = names
+        if table_names is None:
+            table_names = FIELDS
+        
+        if where is not None:
+            coords = _where_coords(table, where)
+            for start in xrange(0, len(coords), block_size):
+                block_coords = coords[start:start + block_size]
+                yield layout, _read(table, table_names, coords=block_coords)
+            continue
+        
+        for start in xrange(0, table.nrows, block_size):
+            stop = min(start + block_size, table.nrows)
+            yield layout, _read(table, table_names, start, stop)
+
+class _BlockRow(object):
+    '''
+    Dict like access to the i-th row of a block of columns.
+    '''
+    
+    __slots__ = ('columns', 'i')
+    
+    def __init__(self, columns, i):
+        self.columns = columns
+        self.i = i
+        
+    def __getitem__(self, key):
+        return self.columns[key][self.i]
+
+def _iter_rows(blocks):
+    for layout, columns in blocks:
+        dao_class = RaggedVideoDAO if layout == RAGGED else VideoDAO
+        for i in xrange(len(columns[VideoDAO.ID])):
+            yield dao_class, _BlockRow(columns, i)
+
+def _closing(files, items):
+    '''
+    Yields the items and closes the files once the items are exhausted or
+    the generator is closed.
+    '''
+    try:
+        for item in items:
+            yield item
+    finally:
+        for h5file in files:
+            h5file.close()
+
+class _FileIterator(Iterator):
+    '''
+    Base of the iterators over opened H5 files. Files are closed when the
+    iteration ends, or by `close` (also called when used as a context 
+    manager) if it is stopped before. `self.items` is the generator 
+    returned by `_closing`.
+    '''
+    
+    def close(self):
+        self.items.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+class PyTablesDaoIterator(_FileIterator):
+    '''
+    A generator over VideoDAOs stored on an H5 PyTables file. Rows are read
+    in blocks and, if `columns` is given, only the VideoDAO fields in it are
+    read and converted. Both the padded and the ragged layouts are supported.
+    Rows not matching the condition `where` (see `_read_blocks`) are skipped
+    without creating VideoDAOs.
+    
+    `pytfpath` may also be a manifest of shards, in which case every shard 
+    is read in turn or, if `shard` is given, only that one. Files are closed
+    as in `_FileIterator`.
     ''' 
     
-    def __init__(self, pytfpath, tname=None):
+    def __init__(self, pytfpath, tname=None, columns=None, 
+                 block_size=BLOCK_SIZE, where=None, shard=None):
         
         self.pytfpah = pytfpath
         self.tname = tname
-        self.file = openFile(self.pytfpah, 'r')
-        
-        table = None
-        if self.tname is None or self.tname == 'all':
-            table = chain(self.file.root.days,
-                               self.file.root.weeks,
-                               self.file.root.months,
-                               self.file.root.years)
+        self.columns = columns
+        
+        names = None
+        self.names = None
+        if columns is not None:
+            names = [VideoDAO.ID, VideoDAO.INT_ID] + list(columns)
+            self.names = frozenset(names)
+        
+        self.files, tables = _open_tables(self.pytfpah, self.tname, shard)
+        self.items = _closing(self.files, 
+                              _iter_rows(_read_blocks(tables, block_size, 
+                                                      names, where)))
+    
+    def next(self):
+        dao_class, video_row = self.items.next()
+        dao = dao_class(video_row, self.names)
+        return dao[VideoDAO.ID], dao
+
+class PyTablesBlockIterator(_FileIterator):
+    '''
+    A generator over blocks of rows stored on an H5 PyTables file. Each
+    block is read with a single `Table.read` call into a NumPy structured
+    array and is returned as a tuple `(ids, columns)`. `ids` is the array 
+    of video ids of the block and `columns` maps the field names of
+    `VideoDAO` to arrays with one entry per row. When `columns` is given 
+    to the constructor only these fields are returned.
+    
+    No conversion is performed. On padded tables array fields keep the 
+    layout of `VideoDesc`, i.e., the first element of each row is the 
+    number of valid points. On ragged tables they are `RaggedArray`s (use
+    `RaggedArray.from_padded` to handle both in the same way). If `where` is
+    given, blocks contain only the rows matching it (see `_read_blocks`).
+    Manifests of shards are handled as in `PyTablesDaoIterator`.
+    '''
+    
+    def __init__(self, pytfpath, tname=None, block_size=BLOCK_SIZE, 
+                 columns=None, where=None, shard=None):
+        
+        self.pytfpath = pytfpath
+        self.tname = tname
+        self.columns = columns
+        
+        names = None
+        if columns is not None:
+            names = [VideoDAO.ID] + \
+                [name for name in columns if name != VideoDAO.ID]
+        
+        self.files, tables = _open_tables(self.pytfpath, self.tname, shard)
+        self.items = _closing(self.files, _read_blocks(tables, block_size, 
+                                                       names, where))
+    
+    def next(self):
+        _, columns = self.items.next()
+        
+        ids = columns[VideoDAO.ID]
+        if self.columns is not None and VideoDAO.ID not in self.columns:
+            del columns[VideoDAO.ID]
+        
+        return ids, columns
+
+def _read_task(task):
+    '''
+    Reads a block of rows of a crawl of a dataset. `task` is a tuple 
+    `(tag, fpath, tname, start, stop, names, where)`. Returns `(layout, 
+    columns)` as in `_read_blocks`, with the tag of the crawl of each row
+    on the CRAWL column, or None if no row matches `where`. 
+    '''
+    tag, fpath, tname, start, stop, names, where = task
+    
+    h5file = openFile(fpath, 'r')
+    try:
+        table = h5file.getNode(h5file.root, tname)
+        if where is not None:
+            coords = _where_coords(table, where, start, stop)
+            if len(coords) == 0:
+                return None
+            columns = _read(table, names, coords=coords)
+        else:
+            columns = _read(table, names, start, stop)
+        layout = get_layout(table)
+    finally:
+        h5file.close()
+    
+    num_rows = len(columns[VideoDAO.ID])
+    columns[VideoDAO.CRAWL] = np.array([tag] * num_rows)
+    return layout, columns
+
+def _prefetch(tasks, workers):
+    '''
+    Runs the tasks on `workers` processes, keeping up to two tasks per 
+    worker ahead of the consumer. Results are yielded in order.
+    '''
+    pool = Pool(workers)
+    try:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(_read_task, (task,)))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().get()
+        
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
+
+class DatasetDaoIterator(Iterator):
+    '''
+    A generator over the VideoDAOs of every crawl of a dataset (see 
+    `youtime.common.datasets`). Crawls (and their shards) are read in 
+    turn, block by block, and the tag of the crawl of each video is on its
+    CRAWL field. The `tname`, `columns`, `block_size` and `where` arguments
+    are the same as in `PyTablesDaoIterator`. If `shard` is given, only that
+    shard of each crawl is read, thus every crawl must be a manifest.
+    
+    If `workers` is given, blocks are read ahead by this number of 
+    processes, so reading (and decompressing) the next blocks of every 
+    file overlaps with the processing of the current one.
+    '''
+    
+    def __init__(self, dataset_path, tname=None, columns=None, 
+                 block_size=BLOCK_SIZE, where=None, workers=None, 
+                 shard=None):
+        self.dataset_path = dataset_path
+        self.tname = tname
+        self.columns = columns
+        
+        names = list(FIELDS)
+        if columns is not None:
+            names = [VideoDAO.ID, VideoDAO.INT_ID] + \
+                [name for name in columns if name != VideoDAO.CRAWL]
+        self.names = frozenset(names + [VideoDAO.CRAWL])
+        
+        tasks = []
+        for tag, path in read_dataset(dataset_path):
+            if shard is not None and not is_manifest(path):
+                raise Exception('Crawl %s of %s is not sharded' % 
+                                (tag, dataset_path))
+            
+            files, tables = _open_tables(path, tname, shard)
+            for table in tables:
+                fpath = table._v_file.filename
+                for start in xrange(0, table.nrows, block_size):
+                    stop = min(start + block_size, table.nrows)
+                    tasks.append((tag, fpath, table.name, start, stop, 
+                                  names, where))
             
-        elif self.tname == 'days':
-            table = iter(self.file.root.days)
-        elif self.tname == 'weeks':
-            table = iter(self.file.root.weeks)
-        elif self.tname == 'months':
-            table = iter(self.file.root.months)
-        elif self.tname == 'years':
-            table = iter(self.file.root.years)
+            for h5file in files:
+                h5file.close()
+        
+        if workers:
+            blocks = _prefetch(tasks, workers)
         else:
-            raise Exception()
+            blocks = (_read_task(task) for task in tasks)
         
-        self.table = table
+        self.table = _iter_rows(block for block in blocks 
+                                if block is not None)
     
     def next(self):
-        video_row = self.table.next()
-        dao = VideoDAO(video_row)
+        dao_class, video_row = self.table.next()
+        dao = dao_class(video_row, self.names)
         return dao[VideoDAO.ID], dao
 
+class SharedBlockIterator(_FileIterator):
+    '''
+    A generator over blocks of rows of an H5 PyTables file which are 
+    written to shared memory (see `youtime.common.sharedblocks`). The name 
+    of each block is returned, so that blocks can be sent to worker 
+    processes at no cost. Workers read the videos of a block with 
+    `shared_daos`. The arguments are the same as in `PyTablesDaoIterator`.
+    
+    Once the workers are done (or stopped), `close` (also called when used 
+    as a context manager) releases the blocks which were shared but never
+    released by a worker, so they do not stay on shared memory.
+    '''
+    
+    def __init__(self, pytfpath, tname=None, columns=None, 
+                 block_size=BLOCK_SIZE, where=None, shard=None):
+        self.pytfpath = pytfpath
+        self.tname = tname
+        self.columns = columns
+        
+        names = None
+        if columns is not None:
+            names = [VideoDAO.ID, VideoDAO.INT_ID] + list(columns)
+        
+        self.files, tables = _open_tables(self.pytfpath, self.tname, shard)
+        self.items = _closing(self.files, _read_blocks(tables, block_size, 
+                                                       names, where))
+        self.shared = []
+    
+    def next(self):
+        layout, columns = self.items.next()
+        name = sharedblocks.share(columns, layout)
+        self.shared.append(name)
+        return name
+    
+    def close(self):
+        super(SharedBlockIterator, self).close()
+        for name in self.shared:
+            sharedblocks.release(name)
+        self.shared = []
+
+def shared_daos(name, release=True):
+    '''
+    Returns a generator of the `(id, dao)` pairs of the videos of a shared 
+    block. If `release` is True, the block is released as soon as it is 
+    mapped (the maps stay valid), before the generator is returned, so that
+    it is freed even if the generator is not consumed.
+    '''
+    layout, columns = sharedblocks.attach(name)
+    if release:
+        sharedblocks.release(name)
+    
+    return _shared_rows(layout, columns)
+
+def _shared_rows(layout, columns):
+    names = frozenset(columns)
+    dao_class = RaggedVideoDAO if layout == RAGGED else VideoDAO
+    for i in xrange(len(columns[VideoDAO.ID])):
+        dao = dao_class(_BlockRow(columns, i), names)
+        yield dao[VideoDAO.ID], dao
+
+def _find(table, video_id):
+    '''
+    Returns the coordinates of the rows of a video. The integer INT_ID column 
+    is searched when the INT_IDs of the table were created with 
+    `youtime.common.dao.to_int_id`, otherwise the video ids are compared.
+    '''
+    if getattr(table.attrs, 'INT_ID_SCHEME', None) == INT_ID_SCHEME:
+        return table.getWhereList('INT_ID == int_id', 
+                                  {'int_id':np.int64(to_int_id(video_id))})
+    else:
+        return table.getWhereList('ID == video_id', {'video_id':video_id})
+
+def _table_names(tname=None):
+    '''
+    Returns the names of the tables to be processed from exported folders.
+    Using `None` or 'all' as the table name will return every table.
+    '''
+    if tname is None or tname == 'all':
+        return TABLES
+    elif tname in TABLES:
+        return [tname]
+    else:
+        raise Exception('Unknown table %s' % tname)
+
+def _load_npy(npy_dir, tname, names):
+    '''
+    Memory maps the given fields of a table exported by 
+    `youtime.export_npy`. Array fields are returned as `RaggedArray`s.
+    '''
+    table_dir = os.path.join(npy_dir, tname)
+    load = lambda name: np.load(os.path.join(table_dir, name + '.npy'), 
+                                mmap_mode='r')
+    
+    columns = {}
+    for name in names:
+        if name in SCALARS:
+            columns[name] = load(name)
+        elif name == VideoDAO.EVENT_TYPES:
+            codes = load(VideoDAO.EVENT_CODES)
+            event_names = np.load(os.path.join(npy_dir, NPY_EVENT_TYPES))
+            columns[name] = RaggedArray(events.decode(codes, event_names), 
+                                        load(offset_col(VideoDAO.EVENT_CODES)))
+        else:
+            columns[name] = RaggedArray(load(name), load(offset_col(name)))
+    
+    return columns
+
+class NpyDaoIterator(Iterator):
+    '''
+    A generator over VideoDAOs exported to `.npy` files by 
+    `youtime.export_npy`. Files are memory mapped, so array fields of the
+    daos are views of the maps (no data is copied). As in 
+    `PyTablesDaoIterator`, only `columns` are read if given and only the 
+    videos matching `where` (evaluated with numexpr over the scalar fields)
+    are returned.
+    '''
+    
+    def __init__(self, npy_dir, tname=None, columns=None, where=None):
+        self.npy_dir = npy_dir
+        self.tname = tname
+        self.columns = columns
+        self.where = where
+        
+        names = FIELDS
+        self.names = None
+        if columns is not None:
+            names = [VideoDAO.ID, VideoDAO.INT_ID] + list(columns)
+            self.names = frozenset(names)
+        
+        self.rows = chain.from_iterable(self._rows(tname, names) 
+                                        for tname in _table_names(tname))
+    
+    def _rows(self, tname, names):
+        columns = _load_npy(self.npy_dir, tname, names)
+        
+        if self.where is not None:
+            scalars = _load_npy(self.npy_dir, tname, SCALARS)
+            idx = np.nonzero(numexpr.evaluate(self.where, scalars))[0]
+        else:
+            idx = xrange(len(columns[VideoDAO.ID]))
+        
+        for i in idx:
+            yield _BlockRow(columns, i)
+    
+    def next(self):
+        dao = RaggedVideoDAO(self.rows.next(), self.names)
+        return dao[VideoDAO.ID], dao
+
+def is_parquet_dir(fpath):
+    '''
+    Checks if `fpath` is a folder created by `youtime.export_parquet`.
+    '''
+    return os.path.isdir(fpath) and \
+        any(fname.endswith(PARQUET_EXT) for fname in os.listdir(fpath))
+
+def _read_row_group(pq_file, i, names, encoder):
+    '''
+    Reads the given fields of a row group of a Parquet file. List columns 
+    are returned as `RaggedArray`s. Event codes are computed from the names
+    of the events using `encoder`.
+    '''
+    stored = set(names)
+    if VideoDAO.EVENT_CODES in stored:
+        stored.discard(VideoDAO.EVENT_CODES)
+        stored.add(VideoDAO.EVENT_TYPES)
+    
+    arrow_table = pq_file.read_row_group(i, columns=sorted(stored))
+    
+    columns = {}
+    for name in stored:
+        array = arrow_table.column(name)
+        if name in SCALARS:
+            columns[name] = np.concatenate([_to_numpy(chunk) 
+                                            for chunk in array.chunks])
+        else:
+            chunks = [_to_ragged(chunk) for chunk in array.chunks]
+            if len(chunks) == 1:
+                columns[name] = chunks[0]
+            else:
+                columns[name] = RaggedArray.from_arrays([row 
+                                                         for chunk in chunks 
+                                                         for row in chunk])
+    
+    if VideoDAO.EVENT_CODES in names:
+        event_types = columns[VideoDAO.EVENT_TYPES]
+        columns[VideoDAO.EVENT_CODES] = \
+            RaggedArray(encoder.encode(event_types.values), 
+                        event_types.offsets)
+        if VideoDAO.EVENT_TYPES not in names:
+            del columns[VideoDAO.EVENT_TYPES]
+    
+    return columns
+
+def _to_numpy(array):
+    data = array.to_numpy(zero_copy_only=False)
+    if data.dtype == object:
+        data = np.asarray(data, dtype=str)
+    
+    return data
+
+def _to_ragged(list_array):
+    offsets = list_array.offsets.to_numpy().astype('int64')
+    return RaggedArray(_to_numpy(list_array.flatten()), offsets - offsets[0])
+
+class ParquetDaoIterator(Iterator):
+    '''
+    A generator over VideoDAOs exported to Parquet files by 
+    `youtime.export_parquet`. Files are read one row group at a time and,
+    as in `PyTablesDaoIterator`, only `columns` are read if given and only
+    the videos matching `where` (evaluated with numexpr over the scalar 
+    fields) are returned. Requires pyarrow.
+    '''
+    
+    def __init__(self, pq_dir, tname=None, columns=None, where=None):
+        import pyarrow.parquet as pq
+        
+        self.pq_dir = pq_dir
+        self.tname = tname
+        self.columns = columns
+        self.where = where
+        self.encoder = events.EventEncoder()
+        
+        names = FIELDS
+        self.names = None
+        if columns is not None:
+            names = [VideoDAO.ID, VideoDAO.INT_ID] + list(columns)
+            self.names = frozenset(names)
+        
+        pq_files = [pq.ParquetFile(os.path.join(pq_dir, tname + PARQUET_EXT))
+                    for tname in _table_names(tname)]
+        self.rows = chain.from_iterable(self._rows(pq_file, names) 
+                                        for pq_file in pq_files)
+    
+    def _rows(self, pq_file, names):
+        for i in xrange(pq_file.num_row_groups):
+            columns = _read_row_group(pq_file, i, names, self.encoder)
+            
+            if self.where is not None:
+                scalars = _read_row_group(pq_file, i, SCALARS, self.encoder)
+                idx = np.nonzero(numexpr.evaluate(self.where, scalars))[0]
+            else:
+                idx = xrange(len(columns[VideoDAO.ID]))
+            
+            for j in idx:
+                yield _BlockRow(columns, j)
+    
+    def next(self):
+        dao = RaggedVideoDAO(self.rows.next(), self.names)
+        return dao[VideoDAO.ID], dao
+
+class PyTablesDaoLookup(object):
+    '''
+    Point lookups of VideoDAOs by video id. The ID and INT_ID columns are 
+    indexed by `youtime.create_dao.DaoReducer`, thus each lookup is a search 
+    on the indexes followed by sorted reads of the matching rows. Files
+    without indexes also work, but every lookup scans the tables.
+    
+    On manifests of shards, only the shard of each video is searched, thus
+    the manifest must be sharded with `youtime.common.shards.shard_of`.
+    '''
+    
+    def __init__(self, pytfpath, tname=None):
+        self.pytfpath = pytfpath
+        self.tname = tname
+        
+        if is_manifest(self.pytfpath):
+            check_scheme(self.pytfpath)
+        
+        self.files = []
+        self.shard_tables = []
+        for fpath in get_files(self.pytfpath):
+            h5file = openFile(fpath, 'r')
+            self.files.append(h5file)
+            self.shard_tables.append(_get_tables(h5file, self.tname))
+        
+        self.tables = list(chain.from_iterable(self.shard_tables))
+    
+    def get_dao(self, video_id, columns=None):
+        '''
+        Returns the VideoDAO of the given video id or None if it does not 
+        exist. Only `columns` are read if given.
+        '''
+        return self.get_daos([video_id], columns).get(video_id)
+    
+    def get_daos(self, video_ids, columns=None):
+        '''
+        Returns a dict which maps each video id found to its VideoDAO. Rows 
+        are read in the order they are stored, one read per table. The daos
+        of a table share a block with only the rows found.
+        '''
+        names = None
+        names_set = None
+        if columns is not None:
+            names = [VideoDAO.ID, VideoDAO.INT_ID] + list(columns)
+            names_set = frozenset(names)
+        
+        num_shards = len(self.shard_tables)
+        shard_ids = defaultdict(set)
+        for video_id in video_ids:
+            shard_ids[shard_of(video_id, num_shards)].add(video_id)
+        
+        return_val = {}
+        for shard, ids in shard_ids.iteritems():
+            for table in self.shard_tables[shard]:
+                coords = []
+                for video_id in ids:
+                    coords.extend(_find(table, video_id))
+                
+                if not coords:
+                    continue
+                
+                coords = np.array(sorted(coords), dtype='int64')
+                table_names = names
+                if table_names is None:
+                    table_names = FIELDS
+                
+                dao_class = VideoDAO
+                if get_layout(table) == RAGGED:
+                    dao_class = RaggedVideoDAO
+                
+                block = _read(table, table_names, coords=coords)
+                for i in xrange(len(coords)):
+                    dao = dao_class(_BlockRow(block, i), names_set)
+                    if dao[VideoDAO.ID] in ids:
+                        return_val[dao[VideoDAO.ID]] = dao
+        
+        return return_val
+    
+    def close(self):
+        for h5file in self.files:
+            h5file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
 class DuplicateGroupsIgen(object):
     '''
     Given a h5 PyTables VideoDAO file and a file with a list of duplicate videos
     (one group of duplicates per line), this generator will yield the referrer
-    information for each group.
+    information for each group. Videos of each group are fetched with 
+    `PyTablesDaoLookup`, which is closed when the iteration ends.
     '''
     
     def __init__(self, pytfpath, duplicates_fpath, tname=None, min_vids=1):
-        self.pytables_gen = PyTablesDaoIterator(pytfpath, tname)
+        self.pytfpath = pytfpath
+        self.tname = tname
         self.duplicates_fpath = duplicates_fpath
         self.min_vids = min_vids
         
@@ -86,36 +890,35 @@ class DuplicateGroupsIgen(object):
         This method will create a set of sets of video events
         for each duplicate group.
         '''
-        groups = VideoDAO.EV2GROUP.copy()
-        
-        #Grouping events and views. 
-        id2event_data = {}
-        id2total_views = {}
-        for video_id, dao in self.pytables_gen:
-            event_types = dao[VideoDAO.EVENT_TYPES]
-            event_views = dao[VideoDAO.EVENT_VIEWS]
-            
-            #Summing up group views
-            grouped_sum = defaultdict(int)
-            for i, event_type in enumerate(event_types):
-                event_group = groups[event_type]
-                grouped_sum[event_group] += event_views[i]
-            
-            if len(grouped_sum) > 0:
-                id2event_data[video_id] = frozenset(grouped_sum.iteritems())
-                id2total_views[video_id] = dao[VideoDAO.TOTAL_VIEW]
-            
+        columns = [VideoDAO.EVENT_CODES, VideoDAO.EVENT_VIEWS, 
+                   VideoDAO.TOTAL_VIEW]
+        
         #Yields groups
-        with open(self.duplicates_fpath) as duplicates_file:
+        with open(self.duplicates_fpath) as duplicates_file, \
+                PyTablesDaoLookup(self.pytfpath, self.tname) as lookup:
             for line in duplicates_file:
                 spl = line.split()
+                daos = lookup.get_daos(spl, columns)
+                
                 to_yield = {}
                 for duplicate_id in spl:
-                    if duplicate_id in id2total_views:
-                        total_view = id2total_views[duplicate_id]
-                        to_yield[duplicate_id] = (id2event_data[duplicate_id], 
-                                                  total_view)
+                    if duplicate_id not in daos:
+                        continue
+                    
+                    dao = daos[duplicate_id]
+                    
+                    #Summing up group views
+                    sums, counts = \
+                        events.group_sums(dao[VideoDAO.EVENT_CODES], 
+                                          dao[VideoDAO.EVENT_VIEWS])
+                    
+                    group_codes = np.nonzero(counts)[0]
+                    if len(group_codes) > 0:
+                        grouped_sum = [(events.GROUPS[code], int(sums[code]))
+                                       for code in group_codes]
+                        to_yield[duplicate_id] = (frozenset(grouped_sum), 
+                                                  dao[VideoDAO.TOTAL_VIEW])
                         
                 if len(to_yield) > self.min_vids:
                     #We are ignoring keys.
-                    yield None, to_yield 
\ No newline at end of file
+                    yield None, to_yield
\ No newline at end of file
@@ -0,0 +1,59 @@
+# -*- coding: utf8
+'''
+Tests for the item generators. Also contains helpers which create small 
+H5 files with synthetic videos.
+'''
+from __future__ import division, print_function
+
+from youtime.common.constants import DAY
+from youtime.create_dao import DaoReducer
+from youtime.create_dao import ShardedDaoReducer
+from youtime.parser import dao_creator
+
+EVENTS = ['First embedded view', 'First referral from YouTube sear', 
+          'First view from a mobile device']
+
+def fake_video_data(video_id, num_points, total_views):
+    '''
+    Creates a dictionary similar to the ones returned by the parser with
+    `num_points` daily points.
+    '''
+    first_date = 1262304000
+    view_data = [100 * (i + 1) / num_points for i in xrange(num_points)]
+    events = [(EVENTS[i % len(EVENTS)], first_date + i * DAY, i + 1) 
+              for i in xrange(min(num_points, 3))]
+    
+    video_data = {}
+    video_data['VIDEO_ID'] = video_id
+    video_data['UPLOAD_DATE'] = first_date
+    video_data['FIRST_DATE'] = first_date
+    video_data['LAST_DATE'] = first_date + (num_points - 1) * DAY
+    video_data['TOPY'] = total_views
+    video_data['VIEW_DATA'] = view_data
+    video_data['TOTAL_COMM'] = 0
+    video_data['COMM_DATA'] = [0] * num_points
+    video_data['TOTAL_FAVS'] = 0
+    video_data['FAVS_DATA'] = [0] * num_points
+    video_data['EVENTS'] = events
+    video_data['HONORS'] = 0
+    return video_data
+
+def create_h5(fpath, lengths, shards=None, **kwargs):
+    '''
+    Writes one synthetic video for each element of `lengths` (number of 
+    daily points of the video) to the H5 file at `fpath` (a manifest if
+    `shards` is given). Returns the raw dictionaries which were written.
+    '''
+    daos = []
+    for i, num_points in enumerate(lengths):
+        video_data = fake_video_data('video%05d' % i, num_points, 
+                                     10 * (i + 1))
+        daos.append(dao_creator.create(video_data))
+    
+    if shards:
+        reducer = ShardedDaoReducer(fpath, shards, **kwargs)
+    else:
+        reducer = DaoReducer(fpath, **kwargs)
+    reducer._reduce(None, daos)
+    reducer.close()
+    return daos
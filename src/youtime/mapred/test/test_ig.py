@@ -0,0 +1,689 @@
+# -*- coding: utf8
+'''Tests for the iterators over H5 PyTables files'''
+from __future__ import division, print_function
+
+from itertools import chain
+from multiprocessing import Pool
+
+from youtime.common import derived
+from youtime.common import sharedblocks
+from youtime.common import zonemaps
+from youtime.common.dao import SCALARS
+from youtime.common.dao import SERIES
+from youtime.common.dao import TABLES
+from youtime.common.dao import VideoDAO
+from youtime.common.dao import VideoDesc
+from youtime.common.datasets import is_dataset
+from youtime.common.datasets import read_dataset
+from youtime.common.datasets import write_dataset
+from youtime.common.events import EVENT_NAMES
+from youtime.common.events import EVENT_TYPES_NODE
+from youtime.common.events import group_sums
+from youtime.common.ragged import RaggedArray
+from youtime.common.shards import get_files
+from youtime.common.shards import shard_of
+from youtime.convert_dao import convert
+from youtime.create_dao import DaoReducer
+from youtime.create_dao import ProcessedReducer
+from youtime.derive import derive
+from youtime.export_npy import export
+from youtime.mapred import ig
+from youtime.mapred.test import create_h5
+from youtime.mapred.test import fake_video_data
+from youtime.parser import dao_creator
+
+from tables import openFile
+from tables import StringCol
+
+import numpy as np
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+def _sum_views(name):
+    return [(video_id, (dao[VideoDAO.VIEW_DATA_INTERP].sum(), 
+                        list(dao[VideoDAO.EVENT_TYPES])))
+            for video_id, dao in ig.shared_daos(name)]
+
+class TestPyTablesIterators(unittest.TestCase):
+    
+    ragged = False
+    shards = None
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.fpath = os.path.join(self.tmp_dir, 'videos.h5')
+        self.lengths = [3, 5, 7, 10, 20, 40, 60, 80, 90, 99]
+        self.raw = create_h5(self.fpath, self.lengths, self.shards,
+                             ragged=self.ragged, block_size=2)
+        
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+    
+    def test_dao_iterator(self):
+        daos = dict(ig.PyTablesDaoIterator(self.fpath))
+        self.assertEqual(len(self.lengths), len(daos))
+        
+        for raw in self.raw:
+            dao = daos[raw[VideoDAO.ID]]
+            self.assertEqual(raw[VideoDAO.TOTAL_VIEW], dao[VideoDAO.TOTAL_VIEW])
+            self.assertEqual(raw[VideoDAO.VIEW_DATA_INTERP][0], 
+                             len(dao[VideoDAO.VIEW_DATA_INTERP]))
+    
+    def test_dao_iterator_table(self):
+        daos = list(ig.PyTablesDaoIterator(self.fpath, 'days'))
+        self.assertEqual(3, len(daos))
+        
+        self.assertRaises(Exception, ig.PyTablesDaoIterator, self.fpath, 
+                          'decades')
+    
+    def test_dao_iterator_columns(self):
+        columns = [VideoDAO.TOTAL_VIEW, VideoDAO.VIEW_DATA_INTERP]
+        for video_id, dao in ig.PyTablesDaoIterator(self.fpath, 
+                                                    columns=columns):
+            self.assertEqual(video_id, dao[VideoDAO.ID])
+            self.assertTrue(dao[VideoDAO.TOTAL_VIEW] > 0)
+            self.assertEqual(dao[VideoDAO.TOTAL_VIEW], 
+                             dao[VideoDAO.VIEW_DATA_INTERP].sum())
+            self.assertRaises(KeyError, dao.__getitem__, 
+                              VideoDAO.COMM_DATA_INTERP)
+    
+    def test_block_iterator(self):
+        expected = dict((video_id, dao[VideoDAO.VIEW_DATA_INTERP]) 
+                        for video_id, dao in ig.PyTablesDaoIterator(self.fpath))
+        
+        num_rows = 0
+        for ids, columns in ig.PyTablesBlockIterator(self.fpath, block_size=2):
+            self.assertTrue(len(ids) <= 2)
+            self.assertEqual(len(ids), len(columns[VideoDAO.TOTAL_VIEW]))
+            
+            series = columns[VideoDAO.VIEW_DATA_INTERP]
+            if not isinstance(series, RaggedArray):
+                series = RaggedArray.from_padded(series)
+            
+            for i, video_id in enumerate(ids):
+                self.assertEqual(list(expected[video_id]), list(series[i]))
+                num_rows += 1
+                
+        self.assertEqual(len(self.lengths), num_rows)
+    
+    def test_block_iterator_columns(self):
+        columns = [VideoDAO.TOTAL_VIEW, VideoDAO.TOTAL_COMM]
+        for ids, block in ig.PyTablesBlockIterator(self.fpath, block_size=3,
+                                                   columns=columns):
+            self.assertEqual(set(columns), set(block))
+            self.assertEqual(len(ids), len(block[VideoDAO.TOTAL_COMM]))
+    
+    def test_close(self):
+        daos = ig.PyTablesDaoIterator(self.fpath)
+        list(daos)
+        self.assertFalse(any(h5file.isopen for h5file in daos.files))
+        
+        with ig.PyTablesBlockIterator(self.fpath, block_size=2) as blocks:
+            blocks.next()
+            self.assertTrue(all(h5file.isopen for h5file in blocks.files))
+        self.assertFalse(any(h5file.isopen for h5file in blocks.files))
+        self.assertRaises(StopIteration, blocks.next)
+    
+    def test_events(self):
+        daos = dict(ig.PyTablesDaoIterator(self.fpath))
+        for raw in self.raw:
+            dao = daos[raw[VideoDAO.ID]]
+            num_events = int(float(raw[VideoDAO.EVENT_TYPES][0]))
+            self.assertEqual(list(raw[VideoDAO.EVENT_TYPES][1:num_events + 1]),
+                             list(dao[VideoDAO.EVENT_TYPES]))
+            self.assertEqual(list(raw[VideoDAO.EVENT_VIEWS][1:num_events + 1]),
+                             list(dao[VideoDAO.EVENT_VIEWS]))
+    
+    def test_convert(self):
+        out_fpath = os.path.join(self.tmp_dir, 'converted.h5')
+        convert(self.fpath, out_fpath, not self.ragged)
+        
+        expected = dict(ig.PyTablesDaoIterator(self.fpath))
+        converted = dict(ig.PyTablesDaoIterator(out_fpath))
+        self.assertEqual(set(expected), set(converted))
+        
+        for video_id, dao in converted.iteritems():
+            self.assertEqual(expected[video_id][VideoDAO.DAYS], 
+                             dao[VideoDAO.DAYS])
+            self.assertEqual(list(expected[video_id][VideoDAO.EVENT_TYPES]), 
+                             list(dao[VideoDAO.EVENT_TYPES]))
+            self.assertEqual(
+                    list(expected[video_id][VideoDAO.DATE_POINTS_INTERP]), 
+                    list(dao[VideoDAO.DATE_POINTS_INTERP]))
+
+    def test_compression(self):
+        fpath = os.path.join(self.tmp_dir, 'compressed.h5')
+        create_h5(fpath, self.lengths, ragged=self.ragged, complib='zlib',
+                  complevel=1, chunkshape=4)
+        
+        h5f = openFile(fpath, 'r')
+        try:
+            table = h5f.getNode(h5f.root, 'months')
+            self.assertEqual('zlib', table.filters.complib)
+            self.assertEqual(1, table.filters.complevel)
+            self.assertEqual((4,), table.chunkshape)
+        finally:
+            h5f.close()
+        
+        expected = dict(ig.PyTablesDaoIterator(self.fpath))
+        for video_id, dao in ig.PyTablesDaoIterator(fpath):
+            self.assertEqual(list(expected[video_id][VideoDAO.VIEW_DATA_ORIG]),
+                             list(dao[VideoDAO.VIEW_DATA_ORIG]))
+
+    def test_lookup(self):
+        expected = dict(ig.PyTablesDaoIterator(self.fpath))
+        lookup = ig.PyTablesDaoLookup(self.fpath)
+        for table in lookup.tables:
+            self.assertTrue(table.cols.ID.index is not None)
+            self.assertTrue(table.cols.INT_ID.index is not None)
+        
+        video_id = self.raw[3][VideoDAO.ID]
+        dao = lookup.get_dao(video_id)
+        self.assertEqual(video_id, dao[VideoDAO.ID])
+        self.assertEqual(list(expected[video_id][VideoDAO.VIEW_DATA_INTERP]), 
+                         list(dao[VideoDAO.VIEW_DATA_INTERP]))
+        self.assertEqual(None, lookup.get_dao('unknown'))
+        
+        video_ids = [raw[VideoDAO.ID] for raw in self.raw[::-2]]
+        daos = lookup.get_daos(video_ids + ['unknown'], 
+                               [VideoDAO.EVENT_VIEWS])
+        self.assertEqual(set(video_ids), set(daos))
+        for video_id in video_ids:
+            self.assertEqual(list(expected[video_id][VideoDAO.EVENT_VIEWS]),
+                             list(daos[video_id][VideoDAO.EVENT_VIEWS]))
+            self.assertRaises(KeyError, daos[video_id].__getitem__, 
+                              VideoDAO.TOTAL_VIEW)
+        lookup.close()
+    
+    def test_sparse_reads(self):
+        expected = dict(ig.PyTablesDaoIterator(self.fpath))
+        
+        #Matching rows are not consecutive
+        where = '(DAYS == 3) | (DAYS == 7) | (DAYS == 40) | (DAYS == 80) | ' \
+            '(DAYS == 99)'
+        files, tables = ig._open_tables(self.fpath)
+        runs = [derived._runs(ig._where_coords(table, where)) 
+                for table in tables]
+        for h5file in files:
+            h5file.close()
+        if self.shards is None:
+            self.assertEqual([2, 0, 3, 0], [len(run) for run in runs])
+        
+        daos = dict(ig.PyTablesDaoIterator(self.fpath, where=where))
+        video_ids = [raw[VideoDAO.ID] for raw in self.raw[::3]]
+        with ig.PyTablesDaoLookup(self.fpath) as lookup:
+            looked_up = lookup.get_daos(video_ids)
+        self.assertEqual(5, len(daos))
+        self.assertEqual(set(video_ids), set(looked_up))
+        
+        for video_id, dao in chain(daos.iteritems(), looked_up.iteritems()):
+            for field in SERIES + SCALARS:
+                self.assertEqual(list(np.atleast_1d(expected[video_id][field])),
+                                 list(np.atleast_1d(dao[field])))
+    
+    def test_lookup_no_index(self):
+        fpath = os.path.join(self.tmp_dir, 'no_index.h5')
+        create_h5(fpath, self.lengths, ragged=self.ragged, index=False)
+        
+        lookup = ig.PyTablesDaoLookup(fpath, 'months')
+        video_id = self.raw[-1][VideoDAO.ID]
+        self.assertEqual(video_id, lookup.get_dao(video_id)[VideoDAO.ID])
+        self.assertEqual(None, lookup.get_dao(self.raw[0][VideoDAO.ID]))
+        lookup.close()
+    
+    def test_duplicate_groups(self):
+        dups_fpath = os.path.join(self.tmp_dir, 'dups.txt')
+        with open(dups_fpath, 'w') as dups_file:
+            print('video00000 video00001 video00009 unknown', file=dups_file)
+            print('video00002', file=dups_file)
+        
+        expected = dict(ig.PyTablesDaoIterator(self.fpath))
+        groups = list(ig.DuplicateGroupsIgen(self.fpath, dups_fpath))
+        self.assertEqual(1, len(groups))
+        
+        group = groups[0][1]
+        self.assertEqual(set(['video00000', 'video00001', 'video00009']), 
+                         set(group))
+        self.assertEqual(expected['video00009'][VideoDAO.TOTAL_VIEW], 
+                         group['video00009'][1])
+        self.assertEqual(frozenset([('EXTERNAL', 1), ('SEARCH', 2), 
+                                    ('MOBILE', 3)]), 
+                         group['video00009'][0])
+
+    def test_where(self):
+        where = '(DAYS > 10) & (TOTAL_VIEW > 0)'
+        all_daos = dict(ig.PyTablesDaoIterator(self.fpath))
+        expected = set(video_id for video_id, dao in all_daos.iteritems()
+                       if dao[VideoDAO.DAYS] > 10)
+        
+        columns = [VideoDAO.DAYS, VideoDAO.VIEW_DATA_INTERP]
+        daos = dict(ig.PyTablesDaoIterator(self.fpath, columns=columns,
+                                           block_size=2, where=where))
+        self.assertEqual(expected, set(daos))
+        for video_id, dao in daos.iteritems():
+            self.assertEqual(
+                    list(all_daos[video_id][VideoDAO.VIEW_DATA_INTERP]),
+                    list(dao[VideoDAO.VIEW_DATA_INTERP]))
+        
+        num_rows = 0
+        for ids, block in ig.PyTablesBlockIterator(self.fpath, block_size=3,
+                                                   columns=columns,
+                                                   where=where):
+            self.assertTrue((block[VideoDAO.DAYS] > 10).all())
+            num_rows += len(ids)
+        self.assertEqual(len(expected), num_rows)
+
+    def test_where_zones(self):
+        fpath = os.path.join(self.tmp_dir, 'zones.h5')
+        create_h5(fpath, self.lengths, self.shards, ragged=self.ragged, 
+                  chunkshape=2)
+        
+        for fpath in get_files(fpath):
+            h5file = openFile(fpath)
+            table = h5file.root.months
+            zones = zonemaps.read_zones(table)
+            self.assertEqual(table.nrows, zones['STOP'][-1])
+            
+            where = 'DAYS > 80'
+            coords = ig._where_coords(table, where)
+            self.assertEqual(list(table.getWhereList(where)), list(coords))
+            h5file.close()
+    
+    def test_derived(self):
+        columns = [VideoDAO.CUM_VIEW, VideoDAO.WEEK_VIEW, VideoDAO.GROUP_VIEW]
+        daos = ig.PyTablesDaoIterator(self.fpath, columns=columns)
+        self.assertRaises(Exception, list, daos)
+        daos.close()
+        
+        derive(self.fpath)
+        expected = dict(ig.PyTablesDaoIterator(self.fpath))
+        daos = dict(ig.PyTablesDaoIterator(self.fpath, columns=columns))
+        self.assertEqual(sorted(expected), sorted(daos))
+        
+        for video_id, dao in daos.iteritems():
+            views = expected[video_id][VideoDAO.VIEW_DATA_INTERP]
+            self.assertEqual(list(np.cumsum(views)), 
+                             list(dao[VideoDAO.CUM_VIEW]))
+            self.assertEqual([views[i:i + 7].sum() 
+                              for i in xrange(0, len(views), 7)],
+                             list(dao[VideoDAO.WEEK_VIEW]))
+            
+            sums, _ = group_sums(expected[video_id][VideoDAO.EVENT_CODES],
+                                 expected[video_id][VideoDAO.EVENT_VIEWS])
+            self.assertEqual(list(sums), list(dao[VideoDAO.GROUP_VIEW]))
+        
+        where = 'DAYS > 10'
+        daos = dict(ig.PyTablesDaoIterator(self.fpath, columns=columns, 
+                                           where=where))
+        for video_id, dao in daos.iteritems():
+            self.assertTrue(expected[video_id][VideoDAO.DAYS] > 10)
+            self.assertEqual(
+                    list(np.cumsum(expected[video_id][VideoDAO.VIEW_DATA_INTERP])),
+                    list(dao[VideoDAO.CUM_VIEW]))
+        
+        #Rows which are not consecutive
+        where = '(DAYS == 40) | (DAYS == 80) | (DAYS == 99)'
+        daos = dict(ig.PyTablesDaoIterator(self.fpath, 'months', columns,
+                                           where=where))
+        self.assertEqual(3, len(daos))
+        for video_id, dao in daos.iteritems():
+            views = expected[video_id][VideoDAO.VIEW_DATA_INTERP]
+            self.assertEqual(list(np.cumsum(views)), 
+                             list(dao[VideoDAO.CUM_VIEW]))
+            self.assertEqual([views[i:i + 7].sum() 
+                              for i in xrange(0, len(views), 7)],
+                             list(dao[VideoDAO.WEEK_VIEW]))
+            sums, _ = group_sums(expected[video_id][VideoDAO.EVENT_CODES],
+                                 expected[video_id][VideoDAO.EVENT_VIEWS])
+            self.assertEqual(list(sums), list(dao[VideoDAO.GROUP_VIEW]))
+    
+    def test_derived_levels(self):
+        level = derived.window_col(VideoDAO.FAVS_DATA_INTERP, 3)
+        derive(self.fpath)
+        daos = ig.PyTablesDaoIterator(self.fpath, columns=[level])
+        self.assertRaises(Exception, list, daos)
+        daos.close()
+        
+        derive(self.fpath, levels=[3])
+        expected = dict(ig.PyTablesDaoIterator(self.fpath))
+        columns = [level, VideoDAO.MONTH_VIEW]
+        for video_id, dao in ig.PyTablesDaoIterator(self.fpath, 
+                                                    columns=columns):
+            favs = expected[video_id][VideoDAO.FAVS_DATA_INTERP]
+            self.assertEqual([favs[i:i + 3].sum() 
+                              for i in xrange(0, len(favs), 3)],
+                             list(dao[level]))
+            
+            views = expected[video_id][VideoDAO.VIEW_DATA_INTERP]
+            self.assertEqual([views[i:i + 30].sum() 
+                              for i in xrange(0, len(views), 30)],
+                             list(dao[VideoDAO.MONTH_VIEW]))
+    
+    def test_dataset(self):
+        other_fpath = os.path.join(self.tmp_dir, 'other', 'videos.h5')
+        os.makedirs(os.path.dirname(other_fpath))
+        create_h5(other_fpath, [4, 50, 95], ragged=not self.ragged)
+        
+        dataset_path = os.path.join(self.tmp_dir, 'crawls.dataset')
+        write_dataset(dataset_path, [('first', self.fpath), 
+                                     ('second', other_fpath)])
+        self.assertTrue(is_dataset(dataset_path))
+        self.assertFalse(is_dataset(self.tmp_dir))
+        self.assertEqual([('first', self.fpath), ('second', other_fpath)],
+                         read_dataset(dataset_path))
+        
+        expected = {}
+        for tag, fpath in read_dataset(dataset_path):
+            for video_id, dao in ig.PyTablesDaoIterator(fpath):
+                expected[tag, video_id] = dao
+        
+        for workers in (None, 2):
+            daos = ig.DatasetDaoIterator(dataset_path, block_size=2, 
+                                         workers=workers)
+            seen = set()
+            for video_id, dao in daos:
+                key = (dao[VideoDAO.CRAWL], video_id)
+                self.assertEqual(list(expected[key][VideoDAO.VIEW_DATA_INTERP]),
+                                 list(dao[VideoDAO.VIEW_DATA_INTERP]))
+                self.assertEqual(list(expected[key][VideoDAO.EVENT_TYPES]),
+                                 list(dao[VideoDAO.EVENT_TYPES]))
+                seen.add(key)
+            self.assertEqual(set(expected), seen)
+        
+        columns = [VideoDAO.TOTAL_VIEW]
+        daos = list(ig.DatasetDaoIterator(dataset_path, 'months', columns, 
+                                          where='TOTAL_VIEW > 50', 
+                                          workers=2))
+        self.assertEqual(sorted(key for key, dao in expected.items()
+                                if dao[VideoDAO.DAYS] > 30 and 
+                                dao[VideoDAO.DAYS] <= 365 and
+                                dao[VideoDAO.TOTAL_VIEW] > 50),
+                         sorted((dao[VideoDAO.CRAWL], video_id) 
+                                for video_id, dao in daos))
+        for _, dao in daos:
+            self.assertRaises(KeyError, dao.__getitem__, VideoDAO.DAYS)
+        
+        #CRAWL is not stored, but may be among the columns
+        columns = [VideoDAO.CRAWL, VideoDAO.DAYS]
+        daos = list(ig.DatasetDaoIterator(dataset_path, columns=columns,
+                                          where='DAYS > 60'))
+        self.assertEqual(sorted(key for key, dao in expected.items()
+                                if dao[VideoDAO.DAYS] > 60),
+                         sorted((dao[VideoDAO.CRAWL], video_id) 
+                                for video_id, dao in daos))
+    
+    def test_shared_blocks(self):
+        expected = dict(ig.PyTablesDaoIterator(self.fpath))
+        columns = [VideoDAO.VIEW_DATA_INTERP, VideoDAO.EVENT_TYPES]
+        
+        names = list(ig.SharedBlockIterator(self.fpath, columns=columns, 
+                                            block_size=3))
+        for name in names:
+            self.assertTrue(os.path.isdir(os.path.join(sharedblocks.SHM_DIR,
+                                                       name)))
+        
+        pool = Pool(2)
+        try:
+            results = dict(chain.from_iterable(pool.map(_sum_views, names)))
+        finally:
+            pool.terminate()
+        
+        self.assertEqual(sorted(expected), sorted(results))
+        for video_id, dao in expected.items():
+            self.assertEqual((dao[VideoDAO.VIEW_DATA_INTERP].sum(), 
+                              list(dao[VideoDAO.EVENT_TYPES])), 
+                             results[video_id])
+        
+        for name in names:
+            self.assertFalse(os.path.exists(os.path.join(sharedblocks.SHM_DIR,
+                                                         name)))
+        
+        name = ig.SharedBlockIterator(self.fpath, columns=columns).next()
+        for video_id, dao in ig.shared_daos(name, release=False):
+            self.assertTrue(isinstance(dao[VideoDAO.VIEW_DATA_INTERP], 
+                                       np.memmap))
+            self.assertRaises(KeyError, dao.__getitem__, VideoDAO.TOTAL_VIEW)
+        sharedblocks.release(name)
+        self.assertRaises(Exception, sharedblocks.release, '../' + name)
+    
+    def test_shared_blocks_unconsumed(self):
+        with ig.SharedBlockIterator(self.fpath, block_size=3) as blocks:
+            first = blocks.next()
+            second = blocks.next()
+            
+            #Released even if the videos are never read
+            ig.shared_daos(first)
+            self.assertFalse(os.path.exists(os.path.join(sharedblocks.SHM_DIR,
+                                                         first)))
+            self.assertTrue(os.path.exists(os.path.join(sharedblocks.SHM_DIR,
+                                                        second)))
+        
+        #Never attached, released when closing
+        self.assertFalse(os.path.exists(os.path.join(sharedblocks.SHM_DIR,
+                                                     second)))
+    
+    def test_event_codes(self):
+        expected = dict(ig.PyTablesDaoIterator(self.fpath))
+        columns = [VideoDAO.EVENT_CODES]
+        for video_id, dao in ig.PyTablesDaoIterator(self.fpath, 
+                                                    columns=columns):
+            names = [EVENT_NAMES[code] for code in dao[VideoDAO.EVENT_CODES]]
+            self.assertEqual(list(expected[video_id][VideoDAO.EVENT_TYPES]),
+                             names)
+            self.assertRaises(KeyError, dao.__getitem__, VideoDAO.EVENT_TYPES)
+    
+    def test_event_types_by_name(self):
+        #Files created before event codes store the names of events
+        fpath = os.path.join(self.tmp_dir, 'names.h5')
+        description = VideoDesc.columns.copy()
+        del description[VideoDAO.EVENT_CODES]
+        description[VideoDAO.EVENT_TYPES] = StringCol(32, shape=(11,))
+        
+        h5file = openFile(fpath, 'w')
+        for tname in TABLES:
+            table = h5file.createTable(h5file.root, tname, description)
+            for raw in self.raw:
+                if tname == 'months':
+                    row = table.row
+                    for field in description:
+                        row[field] = raw[field]
+                    row.append()
+            table.flush()
+        h5file.close()
+        
+        expected = dict(ig.PyTablesDaoIterator(self.fpath))
+        for video_id, dao in ig.PyTablesDaoIterator(fpath):
+            self.assertEqual(list(expected[video_id][VideoDAO.EVENT_TYPES]),
+                             list(dao[VideoDAO.EVENT_TYPES]))
+            self.assertEqual(list(expected[video_id][VideoDAO.EVENT_CODES]),
+                             list(dao[VideoDAO.EVENT_CODES]))
+
+    def test_npy(self):
+        npy_dir = os.path.join(self.tmp_dir, 'npy')
+        export(self.fpath, npy_dir)
+        
+        expected = dict(ig.PyTablesDaoIterator(self.fpath))
+        daos = dict(ig.NpyDaoIterator(npy_dir))
+        self.assertEqual(sorted(expected), sorted(daos))
+        
+        for video_id, dao in daos.items():
+            for field in SCALARS + SERIES:
+                self.assertEqual(list(np.atleast_1d(expected[video_id][field])),
+                                 list(np.atleast_1d(dao[field])))
+            self.assertEqual(list(expected[video_id][VideoDAO.EVENT_TYPES]),
+                             list(dao[VideoDAO.EVENT_TYPES]))
+            self.assertTrue(isinstance(dao[VideoDAO.VIEW_DATA_INTERP].base,
+                                       np.memmap))
+        
+        self.assertEqual(3, len(list(ig.NpyDaoIterator(npy_dir, 'days'))))
+        self.assertEqual([], list(ig.NpyDaoIterator(npy_dir, 'years')))
+        self.assertRaises(Exception, ig.NpyDaoIterator, npy_dir, 'decades')
+    
+    def test_npy_where(self):
+        npy_dir = os.path.join(self.tmp_dir, 'npy')
+        export(self.fpath, npy_dir)
+        
+        where = 'TOTAL_VIEW > 50'
+        columns = [VideoDAO.TOTAL_VIEW]
+        expected = dict(ig.PyTablesDaoIterator(self.fpath, where=where))
+        daos = dict(ig.NpyDaoIterator(npy_dir, columns=columns, where=where))
+        self.assertEqual(sorted(expected), sorted(daos))
+        
+        for video_id, dao in daos.items():
+            self.assertTrue(dao[VideoDAO.TOTAL_VIEW] > 50)
+            self.assertRaises(KeyError, dao.__getitem__, 
+                              VideoDAO.VIEW_DATA_INTERP)
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_parquet(self):
+        from youtime.export_parquet import export as export_parquet
+        
+        pq_dir = os.path.join(self.tmp_dir, 'parquet')
+        export_parquet(self.fpath, pq_dir, block_size=2)
+        self.assertTrue(ig.is_parquet_dir(pq_dir))
+        self.assertFalse(ig.is_parquet_dir(self.fpath))
+        
+        expected = dict(ig.PyTablesDaoIterator(self.fpath))
+        daos = dict(ig.ParquetDaoIterator(pq_dir))
+        self.assertEqual(sorted(expected), sorted(daos))
+        
+        for video_id, dao in daos.items():
+            for field in SCALARS + SERIES + [VideoDAO.EVENT_TYPES]:
+                self.assertEqual(list(np.atleast_1d(expected[video_id][field])),
+                                 list(np.atleast_1d(dao[field])))
+        
+        self.assertEqual(3, len(list(ig.ParquetDaoIterator(pq_dir, 'days'))))
+        self.assertEqual([], list(ig.ParquetDaoIterator(pq_dir, 'years')))
+        self.assertRaises(Exception, ig.ParquetDaoIterator, pq_dir, 'decades')
+    
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_parquet_where(self):
+        from youtime.export_parquet import export as export_parquet
+        
+        pq_dir = os.path.join(self.tmp_dir, 'parquet')
+        export_parquet(self.fpath, pq_dir)
+        
+        where = 'TOTAL_VIEW > 50'
+        columns = [VideoDAO.EVENT_CODES]
+        expected = dict(ig.PyTablesDaoIterator(self.fpath, where=where))
+        daos = dict(ig.ParquetDaoIterator(pq_dir, columns=columns, 
+                                          where=where))
+        self.assertEqual(sorted(expected), sorted(daos))
+        
+        for video_id, dao in daos.items():
+            self.assertEqual(list(expected[video_id][VideoDAO.EVENT_CODES]),
+                             list(dao[VideoDAO.EVENT_CODES]))
+            self.assertRaises(KeyError, dao.__getitem__, VideoDAO.EVENT_TYPES)
+            self.assertRaises(KeyError, dao.__getitem__, VideoDAO.TOTAL_VIEW)
+
+    def test_append(self):
+        fpath = os.path.join(self.tmp_dir, 'appended.h5')
+        create_h5(fpath, self.lengths[:5], self.shards, ragged=self.ragged)
+        create_h5(fpath, self.lengths, self.shards, append=True)
+        
+        expected = dict(ig.PyTablesDaoIterator(self.fpath))
+        ids = [video_id for video_id, _ in ig.PyTablesDaoIterator(fpath)]
+        self.assertEqual(sorted(expected), sorted(ids))
+        
+        lookup = ig.PyTablesDaoLookup(fpath)
+        for video_id, dao in expected.items():
+            appended = lookup.get_dao(video_id)
+            self.assertEqual(list(dao[VideoDAO.VIEW_DATA_INTERP]),
+                             list(appended[VideoDAO.VIEW_DATA_INTERP]))
+            self.assertEqual(list(dao[VideoDAO.EVENT_TYPES]),
+                             list(appended[VideoDAO.EVENT_TYPES]))
+        lookup.close()
+    
+    def test_processed(self):
+        fpath = os.path.join(self.tmp_dir, 'processed.h5')
+        daos = [dao_creator.create(fake_video_data('video%05d' % i, 10, 10))
+                for i in xrange(3)]
+        
+        #Every video of the second file failed to be created
+        reducer = ProcessedReducer(DaoReducer(fpath, ragged=self.ragged))
+        reducer._reduce('stats-1', daos)
+        reducer._reduce('stats-2', [])
+        reducer.close()
+        
+        self.assertEqual(['stats-1'], reducer.processed)
+        self.assertEqual(sorted(dao[VideoDAO.ID] for dao in daos),
+                         sorted(dict(ig.PyTablesDaoIterator(fpath))))
+    
+    def test_append_interrupted(self):
+        fpath = os.path.join(self.tmp_dir, 'interrupted.h5')
+        daos = create_h5(fpath, self.lengths[:3], ragged=self.ragged)
+        
+        #A stored video, a new one and a duplicate of the new one
+        new_dao = dao_creator.create(fake_video_data('new', 10, 10))
+        reducer = DaoReducer(fpath, append=True, block_size=1)
+        self.assertTrue(EVENT_TYPES_NODE in reducer.h5f.root)
+        reducer._reduce(None, [daos[0], new_dao, new_dao])
+        
+        #The file is not closed by the reducer
+        reducer.h5f.close()
+        
+        appended = dict(ig.PyTablesDaoIterator(fpath))
+        self.assertEqual(sorted([dao[VideoDAO.ID] for dao in daos] + 
+                                ['new']), sorted(appended))
+        for dao in daos:
+            self.assertEqual(list(dao[VideoDAO.EVENT_TYPES][1:4]),
+                             list(appended[dao[VideoDAO.ID]]\
+                                  [VideoDAO.EVENT_TYPES]))
+    
+    def test_list_dir(self):
+        for name in ['a.stats', 'b.stats', 'c.info']:
+            open(os.path.join(self.tmp_dir, name), 'w').close()
+        
+        listdir = ig.ListDir(self.tmp_dir, ignore='info', skip=['a.stats'])
+        self.assertEqual(['b.stats'], 
+                         [name for name, _ in listdir 
+                          if name.endswith('stats')])
+        self.assertTrue('b.stats' in listdir.listed)
+
+class TestRaggedIterators(TestPyTablesIterators):
+    
+    ragged = True
+
+class TestShardedIterators(TestPyTablesIterators):
+    
+    shards = 3
+    
+    def test_shards(self):
+        self.assertEqual(3, len(get_files(self.fpath)))
+        
+        seen = set()
+        for shard in xrange(3):
+            for ids, _ in ig.PyTablesBlockIterator(self.fpath, shard=shard):
+                for video_id in ids:
+                    self.assertEqual(shard, shard_of(video_id, 3))
+                    self.assertFalse(video_id in seen)
+                    seen.add(video_id)
+        
+        self.assertEqual(set(raw[VideoDAO.ID] for raw in self.raw), seen)
+    
+    def test_dataset_shard(self):
+        dataset_path = os.path.join(self.tmp_dir, 'crawls.dataset')
+        write_dataset(dataset_path, [('first', self.fpath)])
+        
+        for shard in xrange(3):
+            expected = dict(ig.PyTablesDaoIterator(self.fpath, shard=shard))
+            daos = dict(ig.DatasetDaoIterator(dataset_path, shard=shard))
+            self.assertEqual(sorted(expected), sorted(daos))
+        
+        #Crawls which are not sharded cannot be split
+        other_fpath = os.path.join(self.tmp_dir, 'other.h5')
+        create_h5(other_fpath, [4, 50])
+        write_dataset(dataset_path, [('first', self.fpath), 
+                                     ('second', other_fpath)])
+        self.assertRaises(Exception, ig.DatasetDaoIterator, dataset_path, 
+                          shard=0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,314 @@
+# -*- coding: utf-8
+'''
+Merges the snapshots of the same video found on several crawls into a
+single video with a longer time series. Each input (H5 file, manifest of
+shards or dataset of crawls) is read in (INT_ID, COLLECT_DATE) order and the
+inputs are sort-merged. Tables larger than a block are sorted with an 
+external merge sort (see `_sorted_snapshots`), so tables are only read 
+sequentially and about one block of rows per table is kept in memory.
+
+The interpolated (daily) series of the snapshots of a video are aligned on
+the days of DATE_POINTS_INTERP. When snapshots overlap, the values of the
+most recent one (the largest COLLECT_DATE) are kept, except for its first
+point, which is always zero (see `youtime.parser.dao_creator._to_delta`).
+Totals, original (non interpolated) series, events and honors are the ones
+of the most recent snapshot. The output uses the ragged layout, since
+merged series may not fit on padded tables.
+
+Only snapshots which overlap (share at least one day) are merged. Series
+are deltas from the first point of each snapshot, so the views gained
+between snapshots which do not overlap are unknown. Such snapshots are 
+merged as separate videos (with the same id), one per group of 
+overlapping snapshots (see `_overlapping`).
+'''
+from __future__ import division, print_function
+
+from itertools import count
+from itertools import groupby
+
+from youtime.common.constants import DAY
+from youtime.common.dao import get_layout
+from youtime.common.dao import INT_ID_SCHEME
+from youtime.common.dao import RAGGED
+from youtime.common.dao import RaggedVideoDAO
+from youtime.common.dao import to_int_id
+from youtime.common.dao import VideoDAO
+from youtime.common.datasets import is_dataset
+from youtime.common.datasets import read_dataset
+from youtime.common.ragged import RaggedArray
+from youtime.convert_dao import COLUMNS
+from youtime.create_dao import COMPLIBS
+from youtime.create_dao import DaoReducer
+from youtime.create_dao import ShardedDaoReducer
+from youtime.mapred.ig import _BlockRow
+from youtime.mapred.ig import _open_tables
+from youtime.mapred.ig import _read
+from youtime.mapred.ig import BLOCK_SIZE
+from youtime.parser.dao_creator import _fill
+
+from tables import openFile
+
+import heapq
+import numpy as np
+import os
+import plac
+import shutil
+import sys
+import tempfile
+
+#Series merged day by day
+INTERP = [VideoDAO.VIEW_DATA_INTERP, VideoDAO.COMM_DATA_INTERP,
+          VideoDAO.FAVS_DATA_INTERP]
+
+#Table of the temporary files with the sorted runs of a table
+RUNS_TABLE = 'days'
+
+#Fields copied from the most recent snapshot
+LATEST = [VideoDAO.TOTAL_VIEW, VideoDAO.TOTAL_COMM, VideoDAO.TOTAL_FAVS,
+          VideoDAO.VIEW_DATA_ORIG, VideoDAO.COMM_DATA_ORIG,
+          VideoDAO.FAVS_DATA_ORIG, VideoDAO.DATE_POINTS_ORIG,
+          VideoDAO.EVENT_TYPES, VideoDAO.EVENT_DATES, VideoDAO.EVENT_VIEWS,
+          VideoDAO.HONORS]
+
+def _sort_keys(table, ids, int_ids):
+    #Older files have INT_IDs created with Python's hash
+    if getattr(table.attrs, 'INT_ID_SCHEME', None) == INT_ID_SCHEME:
+        return int_ids
+    else:
+        return np.array([to_int_id(video_id) for video_id in ids],
+                        dtype='int64')
+
+def _take(columns, idx):
+    '''
+    Returns the rows at `idx` of a block of columns.
+    '''
+    taken = {}
+    for field, data in columns.iteritems():
+        if isinstance(data, RaggedArray):
+            data = RaggedArray.from_arrays([data[i] for i in idx],
+                                           data.values.dtype)
+        else:
+            data = np.asarray(data)[idx]
+        taken[field] = data
+    return taken
+
+def _sorted_block(table, columns):
+    '''
+    Sorts a block of rows of a table by (INT_ID, COLLECT_DATE). Returns the
+    sort keys and the sorted columns.
+    '''
+    keys = _sort_keys(table, columns[VideoDAO.ID], columns[VideoDAO.INT_ID])
+    order = np.lexsort((columns[VideoDAO.COLLECT_DATE], keys))
+    return keys[order], _take(columns, order)
+
+def _block_snapshots(dao_class, keys, columns):
+    names = frozenset(columns)
+    for i in xrange(len(keys)):
+        dao = dao_class(_BlockRow(columns, i), names)
+        yield keys[i], dao[VideoDAO.COLLECT_DATE], dao
+
+def _run_snapshots(table, start, stop, block_size):
+    '''
+    Yields the videos of rows `[start, stop)` (a sorted run) of a table of 
+    runs, reading `block_size` rows at a time. INT_IDs are the sort keys.
+    '''
+    for block_start in xrange(start, stop, block_size):
+        block_stop = min(block_start + block_size, stop)
+        columns = _read(table, COLUMNS, block_start, block_stop)
+        for item in _block_snapshots(RaggedVideoDAO, columns[VideoDAO.INT_ID],
+                                     columns):
+            yield item
+
+def _tagged(snapshots, counter):
+    #A unique number avoids comparing daos on ties
+    for key, collect_date, dao in snapshots:
+        yield key, collect_date, counter.next(), dao
+
+def _sorted_snapshots(table, block_size, runs_path):
+    '''
+    Yields the videos of a table in (INT_ID, COLLECT_DATE) order as tuples 
+    `(INT_ID, COLLECT_DATE, dao)`. Tables larger than `block_size` rows are
+    read sequentially in blocks, each block is sorted and written as a run
+    to the temporary file `runs_path` and the runs are then merged, reading
+    each one sequentially.
+    '''
+    if table.nrows <= block_size:
+        dao_class = RaggedVideoDAO if get_layout(table) == RAGGED \
+            else VideoDAO
+        keys, columns = _sorted_block(table, _read(table, COLUMNS, 0, 
+                                                   table.nrows))
+        for item in _block_snapshots(dao_class, keys, columns):
+            yield item
+        return
+
+    runs = []
+    writer = DaoReducer(runs_path, ragged=True, index=False)
+    for start in xrange(0, table.nrows, block_size):
+        stop = min(start + block_size, table.nrows)
+        keys, columns = _sorted_block(table, _read(table, COLUMNS, start, 
+                                                   stop))
+        columns[VideoDAO.INT_ID] = keys
+        writer.append_block(RUNS_TABLE, columns)
+        runs.append((start, stop))
+    writer.close()
+
+    runs_file = openFile(runs_path, 'r')
+    try:
+        runs_table = runs_file.getNode(runs_file.root, RUNS_TABLE)
+        run_block_size = max(1, block_size // len(runs))
+        counter = count()
+        streams = [_tagged(_run_snapshots(runs_table, start, stop, 
+                                          run_block_size), counter)
+                   for start, stop in runs]
+        for key, collect_date, _, dao in heapq.merge(*streams):
+            yield key, collect_date, dao
+    finally:
+        runs_file.close()
+
+def _overlapping(snapshots):
+    '''
+    Splits the snapshots of a video into groups of snapshots whose days
+    overlap, i.e., each snapshot of a group starts on or before the last 
+    day of the previous ones. Returns a list of groups.
+    '''
+    spans = []
+    for dao in snapshots:
+        dates = dao[VideoDAO.DATE_POINTS_INTERP]
+        start = dao[VideoDAO.FIRST_DATE]
+        end = dates[-1] if len(dates) > 0 else start
+        spans.append((start, end, dao))
+    spans.sort(key=lambda span: span[0])
+    
+    groups = []
+    group_end = None
+    for start, end, dao in spans:
+        if group_end is None or round((start - group_end) / DAY) > 0:
+            groups.append([])
+            group_end = end
+        groups[-1].append(dao)
+        group_end = max(group_end, end)
+    
+    return groups
+
+def merge(snapshots):
+    '''
+    Merges the snapshots (VideoDAOs) of a video into a dict as the ones 
+    created by `youtime.parser.dao_creator`. The snapshots must overlap 
+    (see `_overlapping`), otherwise the merged series would skip the days
+    between them.
+    '''
+    snapshots = sorted(snapshots, key=lambda dao: dao[VideoDAO.COLLECT_DATE])
+    latest = snapshots[-1]
+    first_date = min(dao[VideoDAO.FIRST_DATE] for dao in snapshots)
+    collect_date = max(dao[VideoDAO.COLLECT_DATE] for dao in snapshots)
+
+    merged = {}
+    merged[VideoDAO.ID] = latest[VideoDAO.ID]
+    merged[VideoDAO.INT_ID] = to_int_id(latest[VideoDAO.ID])
+    merged[VideoDAO.DAYS] = int(collect_date - first_date) // DAY + 1
+    merged[VideoDAO.UPLOAD_DATE] = \
+        min(dao[VideoDAO.UPLOAD_DATE] for dao in snapshots)
+    merged[VideoDAO.COLLECT_DATE] = collect_date
+    merged[VideoDAO.FIRST_DATE] = first_date
+    merged[VideoDAO.LAST_DATE] = \
+        max(dao[VideoDAO.LAST_DATE] for dao in snapshots)
+
+    #Day of each point and its priority (lower is better): newer snapshots
+    #first, the first point of every snapshot last
+    days = []
+    priorities = []
+    for rank, dao in enumerate(reversed(snapshots)):
+        dates = np.asarray(dao[VideoDAO.DATE_POINTS_INTERP], dtype='int64')
+        days.append(np.round((dates - first_date) / DAY).astype('int64'))
+
+        priority = np.empty(len(dates), dtype='int64')
+        priority.fill(rank)
+        priority[:1] += len(snapshots)
+        priorities.append(priority)
+
+    days = np.concatenate(days)
+    order = np.lexsort((np.concatenate(priorities), days))
+    keep = order[np.concatenate(([True], np.diff(days[order]) != 0))]
+
+    dates = first_date + days[keep] * DAY
+    merged[VideoDAO.DATE_POINTS_INTERP] = \
+        _fill(dates.astype('int32'), len(dates) + 1)
+    for field in INTERP:
+        values = np.concatenate([np.asarray(dao[field], dtype='int32')
+                                 for dao in reversed(snapshots)])[keep]
+        merged[field] = _fill(values, len(values) + 1)
+
+    for field in LATEST:
+        value = latest[field]
+        if isinstance(value, np.ndarray):
+            value = _fill(value, len(value) + 1)
+        merged[field] = value
+
+    return merged
+
+def merge_snapshots(in_files, reducer, block_size=BLOCK_SIZE):
+    '''
+    Sort-merges the videos of `in_files` and appends the merged videos to
+    `reducer` (a `DaoReducer` or `ShardedDaoReducer`).
+    '''
+    paths = []
+    for in_file in in_files:
+        if is_dataset(in_file):
+            paths.extend(path for _, path in read_dataset(in_file))
+        else:
+            paths.append(in_file)
+
+    opened = []
+    streams = []
+    counter = count()
+    tmp_dir = tempfile.mkdtemp()
+    for path in paths:
+        files, tables = _open_tables(path)
+        opened.extend(files)
+        for table in tables:
+            runs_path = os.path.join(tmp_dir, 'runs-%d.h5' % len(streams))
+            streams.append(_tagged(_sorted_snapshots(table, block_size,
+                                                     runs_path), counter))
+
+    try:
+        for _, group in groupby(heapq.merge(*streams), lambda item: item[0]):
+            #Different ids may share an INT_ID (hashed ids). Snapshots are
+            #copied, a group may span several blocks.
+            by_id = {}
+            for _, _, _, dao in group:
+                by_id.setdefault(dao[VideoDAO.ID], []).append(
+                        dao.materialize())
+
+            for snapshots in by_id.values():
+                for group in _overlapping(snapshots):
+                    reducer.append(merge(group))
+    finally:
+        for stream in streams:
+            stream.close()
+        for h5file in opened:
+            h5file.close()
+        shutil.rmtree(tmp_dir)
+
+@plac.annotations(
+    out_file=plac.Annotation('Output H5 file (or manifest with --shards)'),
+    in_files=plac.Annotation('Input H5 files, manifests or datasets'),
+    complib=plac.Annotation('Compression library', kind='option',
+                            choices=COMPLIBS),
+    complevel=plac.Annotation('Compression level (0-9)', kind='option',
+                              type=int),
+    shards=plac.Annotation('Partition output in this number of files',
+                           kind='option', type=int))
+def main(out_file, complib=None, complevel=5, shards=None, *in_files):
+    kwargs = {'ragged':True, 'complib':complib, 'complevel':complevel}
+    if shards:
+        reducer = ShardedDaoReducer(out_file, shards, **kwargs)
+    else:
+        reducer = DaoReducer(out_file, **kwargs)
+
+    try:
+        merge_snapshots(in_files, reducer)
+    finally:
+        reducer.close()
+
+if __name__ == '__main__':
+    sys.exit(plac.call(main))
@@ -0,0 +1,148 @@
+# -*- coding: utf8
+'''
+Parser backends used by `stats_files` and `info_files`. A backend parses
+HTML and finds elements on the parsed tree, parsing functions only use the
+methods below so that the same code runs on any backend. The lxml backend
+(C accelerated) is the default when lxml is installed, the BeautifulSoup
+one is kept as a fallback. Both must produce the same values.
+'''
+from __future__ import division, print_function
+
+from BeautifulSoup import BeautifulSoup
+
+from HTMLParser import HTMLParser
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+_ENTITIES = HTMLParser()
+
+def decode(html):
+    '''
+    Decodes an HTML document (if not unicode) as BeautifulSoup would.
+    '''
+    if isinstance(html, str):
+        try:
+            html = html.decode('utf-8')
+        except UnicodeDecodeError:
+            html = html.decode('windows-1252', 'replace')
+    return html
+
+def unescape(text):
+    '''
+    Decodes the entities of a text.
+    '''
+    return _ENTITIES.unescape(text)
+
+class SoupBackend(object):
+    '''
+    Backend based on BeautifulSoup 3.
+    '''
+
+    name = 'soup'
+
+    def parse(self, html):
+        '''
+        Parses an HTML document (str, unicode or file) and returns its root.
+        '''
+        return BeautifulSoup(html)
+
+    def find(self, node, tag, attrs=None):
+        '''
+        Returns the first `tag` element inside `node` with the exact
+        values of `attrs`, or None. `tag` may be None for any tag.
+        '''
+        return node.find(tag, attrs or {})
+
+    def find_all(self, node, tag, attrs=None):
+        '''
+        Same as `find`, but returns every element found.
+        '''
+        return node.findAll(tag, attrs or {})
+
+    def string(self, node):
+        '''
+        Returns the text of an element which has only text inside,
+        otherwise None.
+        '''
+        return node.string
+
+    def attr(self, node, name):
+        '''
+        Returns the value of an attribute of an element.
+        '''
+        return node[name]
+
+    def next_text(self, node):
+        '''
+        Returns the first text inside the element which follows `node`.
+        '''
+        return node.findNextSibling().next
+
+class LxmlBackend(object):
+    '''
+    Backend based on lxml (XPath queries over libxml2 trees).
+    '''
+
+    name = 'lxml'
+
+    def parse(self, html):
+        if hasattr(html, 'read'):
+            html = html.read()
+
+        #Decodes as BeautifulSoup would, libxml2 assumes latin-1
+        html = decode(html)
+
+        #BeautifulSoup keeps entities of texts as they are, escaping them
+        #does the same here
+        return lxml.html.document_fromstring(html.replace('&', '&amp;'))
+
+    def _xpath(self, tag, attrs):
+        conds = ''.join('[@%s="%s"]' % item for item in (attrs or {}).items())
+        return './/%s%s' % (tag or '*', conds)
+
+    def find(self, node, tag, attrs=None):
+        found = node.xpath(self._xpath(tag, attrs))
+        if found:
+            return found[0]
+
+    def find_all(self, node, tag, attrs=None):
+        return node.xpath(self._xpath(tag, attrs))
+
+    def string(self, node):
+        if len(node) == 0:
+            return node.text
+
+    def attr(self, node, name):
+        #Entities of attributes are decoded by BeautifulSoup
+        return unescape(node.attrib[name])
+
+    def next_text(self, node):
+        return node.getnext().text
+
+BACKENDS = {
+    SoupBackend.name: SoupBackend,
+    LxmlBackend.name: LxmlBackend
+}
+
+#Backend used when none is given
+DEFAULT_BACKEND = LxmlBackend.name if lxml else SoupBackend.name
+
+def get_backend(backend=None):
+    '''
+    Returns a backend given its name (one of BACKENDS). Backend objects
+    are returned as they are and None means DEFAULT_BACKEND.
+    '''
+    if backend is None:
+        backend = DEFAULT_BACKEND
+
+    if not isinstance(backend, basestring):
+        return backend
+
+    if backend not in BACKENDS:
+        raise Exception('Unknown parser backend %s' % backend)
+    if backend == LxmlBackend.name and lxml is None:
+        raise Exception('lxml is not installed')
+    return BACKENDS[backend]()
@@ -9,6 +9,7 @@ from scipy.interpolate import interp1d
 
 from youtime.common import log
 from youtime.common.constants import DAY
+from youtime.common.dao import to_int_id
 
 import numpy as np
 from youtime.common.dao import VideoDAO
@@ -88,7 +89,7 @@ def __real_create(video_id, range_days, upload_date, collect_date, first_date,
     
     dao = {}
     dao[VideoDAO.ID] = video_id
-    dao[VideoDAO.INT_ID] = hash(video_id)
+    dao[VideoDAO.INT_ID] = to_int_id(video_id)
     
     dao[VideoDAO.DAYS] = range_days
     dao[VideoDAO.UPLOAD_DATE] = upload_date
@@ -0,0 +1,169 @@
+# -*- coding: utf8
+'''
+Conversion of the dates found on crawled files to timestamps (as
+`mktime(strptime(...))`). Dates are written in a few formats, grouped in
+families of formats which may be used on the same field (e.g. 'March 3,
+2010' and 'Mar 3, 2010'). Each format is parsed by a precompiled regular
+expression instead of `strptime`, the format which matched last on a
+family is tried first and conversions are memoized, since the same dates
+appear on millions of videos and events.
+'''
+from __future__ import division, print_function
+
+from datetime import date
+
+from time import mktime
+from time import strptime
+
+import calendar
+import re
+
+#Families of formats, the formats of each family are tried in order
+MONTH_DAY_YEAR = 'month_day_year'
+NUMERIC_SHORT = 'numeric_short'
+NUMERIC_LONG = 'numeric_long'
+NUMERIC_EVENT = 'numeric_event'
+DAY_MONTH_YEAR = 'day_month_year'
+
+FAMILIES = {
+    MONTH_DAY_YEAR: ['%B %d, %Y', '%b %d, %Y'],
+    NUMERIC_SHORT: ['%m/%d/%y'],
+    NUMERIC_LONG: ['%m/%d/%Y'],
+    #%M (minutes) is kept as in the first parser of events of 2012
+    NUMERIC_EVENT: ['%m/%d/%y', '%M/%d/%y'],
+    DAY_MONTH_YEAR: ['%d %m %Y']
+}
+
+#Maximum number of memoized conversions
+CACHE_SIZE = 1 << 16
+
+#Month names (as in the C locale) to their numbers
+MONTHS = dict((name.lower(), i) for i, name in enumerate(calendar.month_name)
+              if name)
+MONTH_ABBRS = dict((name.lower(), i)
+                   for i, name in enumerate(calendar.month_abbr) if name)
+
+def _names_re(names):
+    #Longest names first, as done by strptime
+    return '|'.join(sorted(names, key=len, reverse=True))
+
+#Regular expressions of each directive (the same ones used by strptime)
+DIRECTIVES = {
+    'd': r'(?P<d>3[0-1]|[1-2]\d|0[1-9]|[1-9]| [1-9])',
+    'm': r'(?P<m>1[0-2]|0[1-9]|[1-9])',
+    'M': r'(?P<M>[0-5]\d|\d)',
+    'y': r'(?P<y>\d\d)',
+    'Y': r'(?P<Y>\d\d\d\d)',
+    'B': r'(?P<B>%s)' % _names_re(MONTHS),
+    'b': r'(?P<b>%s)' % _names_re(MONTH_ABBRS)
+}
+
+def compile_format(fmt):
+    '''
+    Compiles a format to a regular expression with a group per directive.
+    Returns None if the format has directives which are not supported.
+    '''
+    parts = []
+    for i, part in enumerate(fmt.split('%')):
+        if i > 0:
+            if not part or part[0] not in DIRECTIVES:
+                return None
+            parts.append(DIRECTIVES[part[0]])
+            part = part[1:]
+        parts.append(re.sub(r'\\\s+', r'\\s+', re.escape(part)))
+    return re.compile(''.join(parts) + '$', re.IGNORECASE)
+
+def _to_timestamp(groups):
+    if 'Y' in groups:
+        year = int(groups['Y'])
+    else:
+        year = int(groups['y'])
+        year += 2000 if year <= 68 else 1900
+
+    if 'B' in groups:
+        month = MONTHS[groups['B'].lower()]
+    elif 'b' in groups:
+        month = MONTH_ABBRS[groups['b'].lower()]
+    else:
+        month = int(groups.get('m', 1))
+
+    day = int(groups.get('d', 1))
+    minute = int(groups.get('M', 0))
+
+    #Invalid days (e.g. February 30) raise ValueError, as on strptime
+    date(year, month, day)
+    return mktime((year, month, day, 0, minute, 0, 0, 1, -1))
+
+class DateParser(object):
+    '''
+    Converts dates of a family of formats to timestamps.
+    '''
+
+    def __init__(self, formats):
+        self.formats = formats
+        self.matchers = [compile_format(fmt) for fmt in formats]
+        self.last = 0
+
+    def _parse(self, date_str, i):
+        matcher = self.matchers[i]
+        if matcher is None:
+            return mktime(strptime(date_str, self.formats[i]))
+
+        match = matcher.match(date_str)
+        if match is None:
+            raise ValueError('%s does not match %s' %
+                             (date_str, self.formats[i]))
+
+        groups = dict((key, value) for key, value in
+                      match.groupdict().items() if value is not None)
+        return _to_timestamp(groups)
+
+    def parse(self, date_str):
+        '''
+        Returns the timestamp of the date, or None if no format matches it.
+        '''
+        order = [self.last] + [i for i in xrange(len(self.formats))
+                               if i != self.last]
+        for i in order:
+            try:
+                timestamp = self._parse(date_str, i)
+            except ValueError:
+                continue
+
+            self.last = i
+            return timestamp
+
+_PARSERS = dict((family, DateParser(formats))
+                for family, formats in FAMILIES.items())
+_CACHE = {}
+
+def to_timestamp(date_str, family):
+    '''
+    Converts a date written on one of the formats of a family (one of
+    FAMILIES) to a timestamp. Returns None if no format matches the date.
+    '''
+    #Texts of parsed trees (e.g. NavigableString) would keep trees alive
+    if isinstance(date_str, unicode):
+        date_str = unicode(date_str)
+
+    key = (date_str, family)
+    try:
+        return _CACHE[key]
+    except KeyError:
+        pass
+
+    timestamp = _PARSERS[family].parse(date_str)
+    if len(_CACHE) >= CACHE_SIZE:
+        _CACHE.clear()
+
+    _CACHE[key] = timestamp
+    return timestamp
+
+def parse_timestamp(date_str, family):
+    '''
+    Same as `to_timestamp`, but raises ValueError if no format matches.
+    '''
+    timestamp = to_timestamp(date_str, family)
+    if timestamp is None:
+        raise ValueError('Unknown date %s' % date_str)
+    return timestamp
@@ -7,14 +7,11 @@ from stats files.
 
 from __future__ import division, print_function
 
-from BeautifulSoup import BeautifulSoup
-
-from time import mktime
-from time import strptime
-
 from youtime.common import log
+from youtime.parser import dates
 from youtime.parser import END_OF_VID_RE
 from youtime.parser import VIDEOID_RE
+from youtime.parser.backends import get_backend
 
 import re
 
@@ -91,16 +88,13 @@ def up_dates_html_en(fpath):
         Path to the file
     '''
     
-    dates = _real_extract(fpath, UPDATE_ENG_MATCHER)
+    str_dates = _real_extract(fpath, UPDATE_ENG_MATCHER)
 
     #Converting dates
     return_val = {}
-    for video_id, str_date in dates.iteritems():
+    for video_id, str_date in str_dates.iteritems():
         #For some weird reason, dates can have two formats.
-        try:
-            up_date = mktime(strptime(str_date, '%B %d, %Y'))
-        except:
-            up_date = mktime(strptime(str_date, '%b %d, %Y'))
+        up_date = dates.parse_timestamp(str_date, dates.MONTH_DAY_YEAR)
         
         return_val[video_id] = up_date
 
@@ -133,21 +127,22 @@ def up_dates_html_ptbr(fpath):
             
     
 
-    dates = _real_extract(fpath, UPDATE_PTBR_MATCHER)
+    str_dates = _real_extract(fpath, UPDATE_PTBR_MATCHER)
     return_val = {}
-    for video_id, str_date in dates.iteritems():
+    for video_id, str_date in str_dates.iteritems():
         spl = str_date.split(' de ')
         
         spl[1] = str(meses[spl[1]])
           
         day_month_year =  ' '.join(spl).lower()
-        up_date = mktime(strptime(day_month_year, '%d %m %Y'))
+        up_date = dates.parse_timestamp(day_month_year,
+                                        dates.DAY_MONTH_YEAR)
 
         return_val[video_id] = up_date
         
     return return_val
 
-def up_dates_html_new(fpath):
+def up_dates_html_new(fpath, backend=None):
     '''
     Parses an info HTML file and return the upload date and the videoid found.
     
@@ -155,23 +150,27 @@ def up_dates_html_new(fpath):
     ---------
     fpath: str
         Path to the file
+    backend: str or backend (optional)
+        The parser backend (see `youtime.parser.backends`)
     ''' 
     
-    soup = BeautifulSoup(open(fpath))
-    str_date = soup.find(id="eow-date").string
+    backend = get_backend(backend)
+    with open(fpath) as info_file:
+        soup = backend.parse(info_file)
+        str_date = backend.string(backend.find(soup, None, {'id':'eow-date'}))
 
     f = open(fpath)
     video_id = f.readline().strip().split('=')[1].split()[0]
     f.close()
     
     #converting date
-    up_date = mktime(strptime(str_date, '%b %d, %Y'))
+    up_date = dates.parse_timestamp(str_date, dates.MONTH_DAY_YEAR)
     return_val = {}
     return_val[video_id] = up_date
     
     return return_val
 
-def up_dates_html_topic(fpath):
+def up_dates_html_topic(fpath, backend=None):
     '''
     Parses an info HTML file and return the upload date and the videoid found.
     This method should be used for the topic collection of 2013.
@@ -180,17 +179,20 @@ def up_dates_html_topic(fpath):
     ---------
     fpath: str
         Path to the file
+    backend: str or backend (optional)
+        The parser backend (see `youtime.parser.backends`)
     ''' 
     
+    backend = get_backend(backend)
     with open(fpath) as info_file:
-        soup = BeautifulSoup(info_file)
-        str_date = soup.find(id="eow-date").string
+        soup = backend.parse(info_file)
+        str_date = backend.string(backend.find(soup, None, {'id':'eow-date'}))
         
     with open(fpath) as info_file:
         video_id = info_file.readline().strip().split('=')[1].split()[0][:-1]
         
     #converting date
-    up_date = mktime(strptime(str_date, '%b %d, %Y'))
+    up_date = dates.parse_timestamp(str_date, dates.MONTH_DAY_YEAR)
     return_val = {}
     return_val[video_id] = up_date
         
@@ -239,7 +241,7 @@ def _get_video_htmls(fpath):
                 
     return videos, user_names
 
-def category_tags_user_en(fpath):
+def category_tags_user_en(fpath, backend=None):
     '''
     Parses an info HTML file and returns the name of the uploader,
     the category and tags of a video as a single string per video.
@@ -248,41 +250,43 @@ def category_tags_user_en(fpath):
     ---------
     fpath: str
         Path to the file
+    backend: str or backend (optional)
+        The parser backend (see `youtime.parser.backends`)
     '''
     
+    backend = get_backend(backend)
     htmls, user_names = _get_video_htmls(fpath)
     
     return_val = {}
     for vid_id, html in htmls.iteritems():
-        html_soup = BeautifulSoup(html)
+        html_soup = backend.parse(html)
         
-        aux = html_soup.findAll('div', {'id':'watch-category'})
+        aux = backend.find_all(html_soup, 'div', {'id':'watch-category'})
         if not aux:
             continue
         
-        category_div = \
-            aux[0].find('a')
+        category_div = backend.find(aux[0], 'a')
 
-        aux = html_soup.findAll('div', {'id':'watch-tags'})
+        aux = backend.find_all(html_soup, 'div', {'id':'watch-tags'})
         if not aux:
             #        <div id="watch-video-tags" class="floatL">
-            aux = html_soup.findAll('div', {'id':'watch-video-tags'})
+            aux = backend.find_all(html_soup, 'div', 
+                                   {'id':'watch-video-tags'})
             
-        tags_divs = \
-            aux[0].findAll('a')
-        category = category_div.string.replace(' ', '')
+        tags_divs = backend.find_all(aux[0], 'a')
+        category = backend.string(category_div).replace(' ', '')
 
         tags = set()
         for tag_div in tags_divs:
-            if tag_div.string is not None:
-                tags.add(tag_div.string)
+            if backend.string(tag_div) is not None:
+                tags.add(backend.string(tag_div))
         
         return_val[vid_id] = '%s %s %s' % (user_names[vid_id], category, 
                                            ' '.join(tags))
 
     return return_val
 
-def category_tags_user_new(fpath):
+def category_tags_user_new(fpath, backend=None):
     '''
     Parses an info HTML file and returns the name of the uploader,
     the category and tags of a video as a single string per video.
@@ -291,23 +295,30 @@ def category_tags_user_new(fpath):
     ---------
     fpath: str
     Path to the file
+    backend: str or backend (optional)
+        The parser backend (see `youtime.parser.backends`)
     '''
     return_val = {}
     f = open(fpath)
     video_id = f.readline().strip().split('=')[1].split()[0]
     f.close()
     
-    soup = BeautifulSoup(open(fpath))
-    user_name = str(soup.find('span',{"class":"yt-uix-button-group"}).find('span',{"class":"yt-uix-button-content"}).string).strip()
+    backend = get_backend(backend)
+    with open(fpath) as info_file:
+        soup = backend.parse(info_file)
+    
+    group = backend.find(soup, 'span', {"class":"yt-uix-button-group"})
+    content = backend.find(group, 'span', {"class":"yt-uix-button-content"})
+    user_name = str(backend.string(content)).strip()
     
     tags = []
-    for line in soup.findAll (id="eow-tags"):
-        for l in line.findAll('a'):
-            tags.append(l.string)
+    for line in backend.find_all(soup, None, {'id':'eow-tags'}):
+        for l in backend.find_all(line, 'a'):
+            tags.append(backend.string(l))
     
-    for line in soup.findAll(id="eow-category"):
-        for l in line.findAll('a'):
-            category = l.string.strip()
+    for line in backend.find_all(soup, None, {'id':'eow-category'}):
+        for l in backend.find_all(line, 'a'):
+            category = backend.string(l).strip()
             
     return_val[video_id] = '%s %s %s' % (user_name, category, ' '.join(tags))       
 
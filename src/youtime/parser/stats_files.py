@@ -5,14 +5,14 @@ series and events). The base method to be used is `parse_stats`.
 '''
 from __future__ import division, print_function
 
-from BeautifulSoup import BeautifulSoup
 from BeautifulSoup import BeautifulStoneSoup
 
-from time import mktime
-from time import strptime
-
+from youtime.parser import dates
 from youtime.parser import END_OF_VID_RE
 from youtime.parser import VIDEOID_RE
+from youtime.parser.backends import decode
+from youtime.parser.backends import get_backend
+from youtime.parser.backends import unescape
 
 import re
 
@@ -28,11 +28,45 @@ DATA_URL_MATCHER = re.compile(DATA_URL_RE)
 
 TO_INT = lambda string: int(string.strip().replace(',',''))
 
-def _get_video_xmls(fpath, up_dates):
+#Markup of the topic format scanned by `_scan_html_topic`
+TOPIC_VIEWS_MATCHER = re.compile(r'<h3>([^<]*)</h3>')
+TOPIC_H4_MATCHER = re.compile(r'<h4>([^<]*)</h4>')
+TOPIC_CHART_CLASSES = ['stats-big-chart-expanded', 'stats-big-chart-collapsed']
+TOPIC_CHART_MATCHER = re.compile(r'<img class="(%s)" src="([^"]*)"' % 
+                                 '|'.join(TOPIC_CHART_CLASSES))
+TOPIC_IMG_MATCHER = re.compile(r'<img(?: class="stats-engagement-chart" '
+                               r'src="([^"]*)")?')
+TOPIC_ENGAGE_DIV = 'class="engagement-audience"'
+TOPIC_EVENT_MATCHER = re.compile(
+    r'<dd class="event">\s*<p>\s*'
+    r'(?:<span>([^<]+)</span>\s*'
+    r'(?:<span class="extra">\s*(?:<a [^>]*>([^<]+)</a>\s*|([^<]+))</span>'
+    r'\s*)?|([^<]+))</p>\s*<p class="sub-data">([^<]+)</p>\s*</dd>')
+DIV_MATCHER = re.compile(r'<(/?)div\b')
+
+#End of event names: a dash, an entity (&ndash;) or the decoded entities
+EVENT_NAME_END = re.compile(u'-|&|\u2013|\u2014')
+
+#Markers of the crawl format of each video (see `html_format`). Crawls of
+#2009-2010 (eng and pt-br) have the title of stats on a div, crawls of 2012
+#on a h4 and crawls after 2013 have an engagement div instead.
+STATS_TITLE_MARKER = 'class="watch-stats-title-text"'
+ENG_FORMAT = 'eng'
+NEW_FORMAT = 'new'
+TOPIC_FORMAT = 'topic'
+
+#Markers of the HTML content inside the xml of each video
+HTML_CONTENT_BEGIN = '<html_content>'
+HTML_CONTENT_END = '</html_content>'
+CDATA_BEGIN = '<![CDATA['
+CDATA_END = ']]>'
+
+def _iter_video_xmls(fpath, up_dates):
     '''
     This method filters out only the xml content of the stats file
-    for each video. It maintains this content in memory, for prior
-    parsing. Only the videos with valid ids in `up_dates` are considered.
+    for each video, yielding `(video_id, xml)` as soon as the end of 
+    the video is found. Only the content of one video is kept in memory. 
+    Only the videos with valid ids in `up_dates` are considered.
     
     Arguments
     ---------
@@ -46,9 +80,9 @@ def _get_video_xmls(fpath, up_dates):
     youtime.parser.info_files
     '''
     
-    xmls = {}
     with open(fpath) as vid_stats_file:
-        ignore_vid = False
+        video_id = None
+        lines = None
         for line in vid_stats_file:
             begin_matches = VID_BEGIN_MATCHER.match(line) 
             end_matches = VID_END_MATCHER.match(line)
@@ -56,19 +90,42 @@ def _get_video_xmls(fpath, up_dates):
             if begin_matches: #Get ID
                 video_id = begin_matches.group(1)
                 if video_id in up_dates and '</crawledvideoid>' not in line:
-                    xmls[video_id] = []
-                    ignore_vid = False
+                    lines = []
                 else:
-                    ignore_vid = True
+                    lines = None
             elif end_matches: #End file
-                if not ignore_vid:
-                    xml = ''.join(xmls[video_id])
-                    del xmls[video_id]
-                    xmls[video_id] = xml
-            elif not ignore_vid: #Append lines
-                xmls[video_id].append(line)
+                if lines is not None:
+                    yield video_id, ''.join(lines)
+                    lines = None
+            elif lines is not None: #Append lines
+                lines.append(line)
+
+def _get_video_xmls(fpath, up_dates):
+    '''
+    Same as `_iter_video_xmls`, but returns a dict with the xml content of 
+    every video.
+    '''
+    return dict(_iter_video_xmls(fpath, up_dates))
 
-    return xmls
+def _html_content(xml):
+    '''
+    Returns the HTML inside the html_content tag of a video's xml, or None
+    if there is no such tag. Crawlers store the HTML as CDATA, which is 
+    found by scanning the text. Only other contents are parsed as xml.
+    '''
+    begin = xml.find(HTML_CONTENT_BEGIN)
+    if begin == -1:
+        return None
+    
+    begin += len(HTML_CONTENT_BEGIN)
+    end = xml.find(HTML_CONTENT_END, begin)
+    if end != -1 and xml.startswith(CDATA_BEGIN, begin) and \
+            xml.endswith(CDATA_END, begin, end):
+        return xml[begin + len(CDATA_BEGIN):end - len(CDATA_END)]
+    
+    content = BeautifulStoneSoup(xml).find('html_content')
+    if content:
+        return content.string
 
 def __extract_info_from_view_graph(view_graph):
     '''
@@ -82,8 +139,9 @@ def __extract_info_from_view_graph(view_graph):
     view_data = VIEW_URL_MATCHER.match(view_graph)
     datespl = view_data.group(1).split('|')
     
-    initial_date = mktime(strptime(datespl[1], '%m/%d/%Y'))
-    final_date = mktime(strptime(datespl[len(datespl) - 1], '%m/%d/%Y'))
+    initial_date = dates.parse_timestamp(datespl[1], dates.NUMERIC_LONG)
+    final_date = dates.parse_timestamp(datespl[len(datespl) - 1],
+                                       dates.NUMERIC_LONG)
     top_y = round(float(view_data.group(3).split('|')[0].split(',')[-1]))
     
     view_data = [float(x) for x in view_data.group(4).split(',')]
@@ -102,8 +160,9 @@ def __extract_info_from_view_graph_new(view_graph):
     view_data = VIEW_URL_MATCHER.match(view_graph)
     datespl = view_data.group(1).split('|')
 
-    initial_date = mktime(strptime(datespl[1], '%m/%d/%y'))
-    final_date = mktime(strptime(datespl[len(datespl) - 1], '%m/%d/%y'))
+    initial_date = dates.parse_timestamp(datespl[1], dates.NUMERIC_SHORT)
+    final_date = dates.parse_timestamp(datespl[len(datespl) - 1],
+                                       dates.NUMERIC_SHORT)
     top_y = round(float(view_data.group(3).split('|')[0].split(',')[-1]))
     
     view_data = [float(x) for x in view_data.group(4).split(',')]
@@ -119,7 +178,14 @@ def __extract_points_for_small_graphs(graph):
     data = DATA_URL_MATCHER.match(graph)
     return  [float(x) for x in data.group(1).split(',')]
 
-def __parse_events(event_elements):
+def _event_name(text):
+    '''
+    Name of an event, the text before the dash which separates it from the
+    referrer (either as an entity or the character itself).
+    '''
+    return EVENT_NAME_END.split(text, 1)[0].strip()
+
+def __parse_events(event_elements, backend):
     '''
     Parses event elements from the HTML tree returning for each event
     a list of triples:
@@ -129,24 +195,17 @@ def __parse_events(event_elements):
     events = []
     for i in xrange(0, len(event_elements), 3):
         date_element = event_elements[i + 1]
-        ev_date_str = event_elements[i + 1].string.strip()
-        ev_views = TO_INT(event_elements[i + 2].string)
+        ev_date_str = backend.string(event_elements[i + 1]).strip()
+        ev_views = TO_INT(backend.string(event_elements[i + 2]))
         
-        try:
-            ev_date = mktime(strptime(ev_date_str, '%B %d, %Y'))
-        except:
-            try:
-                ev_date = mktime(strptime(ev_date_str, '%b %d, %Y'))
-            except:
-                ev_date = None
-        #Yes, this is really ugly.
-        ev_name = date_element.next.next.next.next.split('-')[0].strip()
+        ev_date = dates.to_timestamp(ev_date_str, dates.MONTH_DAY_YEAR)
+        ev_name = _event_name(backend.next_text(date_element))
         if ev_date:
             events.append((ev_name, ev_date, ev_views))
     
     return events
 
-def __parse_events_new(event_elements):
+def __parse_events_new(event_elements, backend):
     '''
     Parses event elements from the HTML tree returning for each event
     a list:
@@ -157,26 +216,19 @@ def __parse_events_new(event_elements):
     events = []
     for i in range(1, len(event_elements), 2):
         date_element = event_elements[i]
-        ev_date_str = event_elements[i].string.strip()
-
-        try:
-            ev_date = mktime(strptime(ev_date_str, '%m/%d/%y'))
-        except:
-            try:
-                ev_date = mktime(strptime(ev_date_str, '%M/%d/%y'))
-            except:
-                ev_date = None
-                
-        ev_name = date_element.next.next.next.next.split('-')[0].split('&')[0].strip()
+        ev_date_str = backend.string(event_elements[i]).strip()
+
+        ev_date = dates.to_timestamp(ev_date_str, dates.NUMERIC_EVENT)
+        ev_name = _event_name(backend.next_text(date_element))
         if ev_date:
             events.append((ev_name, ev_date))
     
     return events
 
-def _parse_html(video_id, html, up_dates):
+def _parse_html(video_id, html, up_dates, backend=None):
     '''
     After separating s single video's HTML content, this method does
-    the actual parsing by using beautifulsoup.
+    the actual parsing by using a parser backend.
     
     Arguments
     ---------
@@ -184,14 +236,17 @@ def _parse_html(video_id, html, up_dates):
         The path of the stats file to parse
     up_dates: dict
         The upload dates for each video (video_id to int)
+    backend: str or backend (optional)
+        The parser backend (see `youtime.parser.backends`)
     '''
     
     video_data = {}
+    backend = get_backend(backend)
     
     #Total Views, if we can't find this. The video has no stats
-    html_soup = BeautifulSoup(html)
-    total_views_str = \
-        html_soup.find('div', {'class':'watch-stats-title-text'}).string
+    html_soup = backend.parse(html)
+    total_views_str = backend.string(
+        backend.find(html_soup, 'div', {'class':'watch-stats-title-text'}))
     
     if not total_views_str:
         return None
@@ -200,19 +255,19 @@ def _parse_html(video_id, html, up_dates):
     total_views = TO_INT(total_views_str.split()[-1])
     
     #Total comments, favorites, ratings and average rating
-    base_stats = html_soup.findAll('td', 
-                                   {'class':'watch-stats-sparkline-title'})
-    total_comm_str = base_stats[0].string
-    total_favs_str = base_stats[1].string
-    total_rats_str = base_stats[2].string
-    total_avgr_str = base_stats[3].string
-    
-    graphs = html_soup.findAll('img')
-    view_graph = graphs[0]['src']
-    comm_graph = graphs[1]['src']
-    favs_graph = graphs[2]['src']
-    rats_graph = graphs[3]['src']
-    avgr_graph = graphs[4]['src']
+    base_stats = backend.find_all(html_soup, 'td', 
+                                  {'class':'watch-stats-sparkline-title'})
+    total_comm_str = backend.string(base_stats[0])
+    total_favs_str = backend.string(base_stats[1])
+    total_rats_str = backend.string(base_stats[2])
+    total_avgr_str = backend.string(base_stats[3])
+    
+    graphs = backend.find_all(html_soup, 'img')
+    view_graph = backend.attr(graphs[0], 'src')
+    comm_graph = backend.attr(graphs[1], 'src')
+    favs_graph = backend.attr(graphs[2], 'src')
+    rats_graph = backend.attr(graphs[3], 'src')
+    avgr_graph = backend.attr(graphs[4], 'src')
     
     first_date, last_date, top_y, view_data = \
         __extract_info_from_view_graph(view_graph)
@@ -223,12 +278,13 @@ def _parse_html(video_id, html, up_dates):
     avgr_data = __extract_points_for_small_graphs(avgr_graph)
     
     #Extracting Events
-    event_elements = html_soup.findAll('td', {'class':'watch-stats-cell'})
-    events = __parse_events(event_elements)
+    event_elements = backend.find_all(html_soup, 'td', 
+                                      {'class':'watch-stats-cell'})
+    events = __parse_events(event_elements, backend)
 
     #Honors
-    honors_str = \
-        html_soup.find('span', {'class':'expander-head-stat'}).string
+    honors_str = backend.string(
+        backend.find(html_soup, 'span', {'class':'expander-head-stat'}))
     honors = int(honors_str[1:-1])    
     
     #Creating return value
@@ -255,16 +311,17 @@ def _parse_html(video_id, html, up_dates):
     
     return video_data
 
-def _parse_html_new(video_id, html, up_dates):
+def _parse_html_new(video_id, html, up_dates, backend=None):
     ''' 
     Similar to _parse_html
     '''
     video_data = {}
+    backend = get_backend(backend)
     
     #Total Views, if we can't find this. The video has no stats
-    html_soup = BeautifulSoup(html)
-    total_views_str = \
-        html_soup.find('h4', {'class':'watch-stats-title-text'}).string
+    html_soup = backend.parse(html)
+    total_views_str = backend.string(
+        backend.find(html_soup, 'h4', {'class':'watch-stats-title-text'}))
      
     if not total_views_str:
         return None
@@ -273,18 +330,18 @@ def _parse_html_new(video_id, html, up_dates):
     total_views = TO_INT(total_views_str.split()[-1])
     
     #Total comments, favorites and ratings
-    base_stats = html_soup.findAll('td', 
-                                   {'class':'watch-stats-sparkline-title'})
+    base_stats = backend.find_all(html_soup, 'td', 
+                                  {'class':'watch-stats-sparkline-title'})
     
-    total_rats_str = base_stats[0].string
-    total_comm_str = base_stats[1].string
-    total_favs_str = base_stats[2].string
+    total_rats_str = backend.string(base_stats[0])
+    total_comm_str = backend.string(base_stats[1])
+    total_favs_str = backend.string(base_stats[2])
     
     
-    graphs = html_soup.findAll('img')
-    view_graph = graphs[0]['src']
-    comm_graph = graphs[1]['src']
-    favs_graph = graphs[2]['src']
+    graphs = backend.find_all(html_soup, 'img')
+    view_graph = backend.attr(graphs[0], 'src')
+    comm_graph = backend.attr(graphs[1], 'src')
+    favs_graph = backend.attr(graphs[2], 'src')
 
     first_date, last_date, top_y, view_data = \
         __extract_info_from_view_graph_new(view_graph)
@@ -293,8 +350,9 @@ def _parse_html_new(video_id, html, up_dates):
     favs_data = __extract_points_for_small_graphs(favs_graph)
     
     #Extracting Events
-    event_elements = html_soup.findAll('td', {'class':'watch-stats-cell'})
-    events = __parse_events_new(event_elements)
+    event_elements = backend.find_all(html_soup, 'td', 
+                                      {'class':'watch-stats-cell'})
+    events = __parse_events_new(event_elements, backend)
     
     #Creating return value
     video_data['VIDEO_ID'] =  video_id
@@ -317,22 +375,16 @@ def _parse_html_new(video_id, html, up_dates):
     
     return video_data
 
-def _parse_html_topic(video_id, html, up_dates):
-    ''' 
-    Similar to _parse_html but for files after 2013
+def _topic_data(video_id, up_dates, total_views_str, totals, view_graph, 
+                engage_graphs, events):
+    '''
+    Creates the dict of a video of the topic format from the texts found
+    on its HTML (see `_parse_html_topic` and `_scan_html_topic`). `totals` 
+    are the texts of the engagement totals and `engage_graphs` the urls of
+    their graphs. `events` are tuples `(name, extra, date)` of texts.
     '''
     video_data = {}
     
-    #Total Views, if we can't find this. The video has no stats
-    html_soup = BeautifulSoup(html)
-    
-    views_tag = html_soup.find('h3')
-    if views_tag is None:
-        raise Exception('Video has no stats')
-    
-    total_views_str = \
-        html_soup.find('h3').string
-    
     #Parse total views
     total_views = TO_INT(total_views_str)
     
@@ -340,9 +392,6 @@ def _parse_html_topic(video_id, html, up_dates):
         raise Exception('Video has no views')
     
     #Total comments, favorites and ratings
-    engage_stats = html_soup.find('div', 
-                                  {'class':'engagement-audience'})
-    totals = engage_stats.findAll('h4')
     if len(totals) <= 1:
         total_comm = 0
         total_favs = 0
@@ -350,76 +399,36 @@ def _parse_html_topic(video_id, html, up_dates):
         total_dislikes = 0
         has_engage = False
     else:
-        total_comm = TO_INT(totals[0].string)
-        total_favs = TO_INT(totals[1].string)
-        total_likes = TO_INT(totals[2].string)
-        total_dislikes = TO_INT(totals[3].string)
+        total_comm = TO_INT(totals[0])
+        total_favs = TO_INT(totals[1])
+        total_likes = TO_INT(totals[2])
+        total_dislikes = TO_INT(totals[3])
         has_engage = True
             
     #Graphs
-    view_stats = html_soup.find('img', 
-                                {'class':'stats-big-chart-expanded'})
-    
-    if view_stats is None:
-        view_stats = html_soup.find('img', 
-                                    {'class':'stats-big-chart-collapsed'})
-    
-    view_graph = view_stats['src']
     first_date, last_date, top_y, view_data = \
         __extract_info_from_view_graph_new(view_graph)
 
     if has_engage:   
-        engage_graphs = engage_stats.findAll('img')
-        comm_graph = engage_graphs[0]['src']
-        favs_graph = engage_graphs[1]['src']
-        like_graph = engage_graphs[2]['src']
-        disl_graph = engage_graphs[3]['src']
-        
-        comm_data = __extract_points_for_small_graphs(comm_graph)
-        favs_data = __extract_points_for_small_graphs(favs_graph)
-        like_data = __extract_points_for_small_graphs(like_graph)
-        disl_data = __extract_points_for_small_graphs(disl_graph)
+        comm_data = __extract_points_for_small_graphs(engage_graphs[0])
+        favs_data = __extract_points_for_small_graphs(engage_graphs[1])
+        like_data = __extract_points_for_small_graphs(engage_graphs[2])
+        disl_data = __extract_points_for_small_graphs(engage_graphs[3])
     else:
         comm_data = [0] * len(view_data)
         favs_data = [0] * len(view_data)
         like_data = [0] * len(view_data)
         disl_data = [0] * len(view_data)
-
-    
     
-    #Extracting Events
-    event_elements = html_soup.findAll('dd', {'class':'event'})
-    events = []
-    for element in event_elements:
-        name_tag = element.find('span')
-        if name_tag is None:
-            name_tag = element.find('p')
-        
-        name = name_tag.string.strip()
-        
-        additional = ''
-        additional_tag = element.find('span', {'class':'extra'})
-        if additional_tag:
-            link_tag = additional_tag.find('a')
-            if link_tag:
-                additional = link_tag.string
-            else:
-                additional = additional_tag.string
+    #Events
+    ev_list = []
+    for name, additional, date_text in events:
+        ev_name = ' '.join((name.strip(), additional.strip()))
         
-        date_tag = element.find('p', {'class':'sub-data'})
-        ev_name = ' '.join((name, additional.strip()))
-        
-        date_str = date_tag.string.split('-')[0].strip()
-        fmts = ['%b %d, %Y', '%B %d, %Y']
-        ev_date = None
-        for fmt in fmts:
-            try:
-                ev_date = mktime(strptime(date_str, fmt))
-            except:
-                pass
-        
-        events.append((ev_name, ev_date))
+        date_str = date_text.split('-')[0].strip()
+        ev_date = dates.to_timestamp(date_str, dates.MONTH_DAY_YEAR)
         
+        ev_list.append((ev_name, ev_date))
     
     #Creating return value
     video_data['VIDEO_ID'] =  video_id
@@ -441,14 +450,197 @@ def _parse_html_topic(video_id, html, up_dates):
     video_data['LIKE_DATA'] = like_data
     video_data['DISL_DATA'] = disl_data
     
-    video_data['EVENTS'] = events
+    video_data['EVENTS'] = ev_list
     
     return video_data
 
-def parse_stats(fpath, up_dates):
+def _parse_html_topic(video_id, html, up_dates, backend=None):
+    ''' 
+    Similar to _parse_html but for files after 2013
     '''
-    Parses a stats file returning a list of dictionaries each
-    with the information for every video found.
+    backend = get_backend(backend)
+    
+    #Total Views, if we can't find this. The video has no stats
+    html_soup = backend.parse(html)
+    
+    views_tag = backend.find(html_soup, 'h3')
+    if views_tag is None:
+        raise Exception('Video has no stats')
+    
+    total_views_str = backend.string(views_tag)
+    
+    #Total comments, favorites and ratings
+    engage_stats = backend.find(html_soup, 'div', 
+                                {'class':'engagement-audience'})
+    totals = [backend.string(tag) 
+              for tag in backend.find_all(engage_stats, 'h4')]
+    
+    #Graphs
+    view_stats = backend.find(html_soup, 'img', 
+                              {'class':'stats-big-chart-expanded'})
+    
+    if view_stats is None:
+        view_stats = backend.find(html_soup, 'img', 
+                                  {'class':'stats-big-chart-collapsed'})
+    
+    view_graph = backend.attr(view_stats, 'src')
+    
+    engage_graphs = []
+    if len(totals) > 1:
+        engage_graphs = [backend.attr(tag, 'src') for tag in 
+                         backend.find_all(engage_stats, 'img')[:4]]
+    
+    #Extracting Events
+    event_elements = backend.find_all(html_soup, 'dd', {'class':'event'})
+    events = []
+    for element in event_elements:
+        name_tag = backend.find(element, 'span')
+        if name_tag is None:
+            name_tag = backend.find(element, 'p')
+        
+        name = backend.string(name_tag)
+        
+        additional = ''
+        additional_tag = backend.find(element, 'span', {'class':'extra'})
+        if additional_tag is not None:
+            link_tag = backend.find(additional_tag, 'a')
+            if link_tag is not None:
+                additional = backend.string(link_tag)
+            else:
+                additional = backend.string(additional_tag)
+        
+        date_tag = backend.find(element, 'p', {'class':'sub-data'})
+        events.append((name, additional, backend.string(date_tag)))
+    
+    return _topic_data(video_id, up_dates, total_views_str, totals, 
+                       view_graph, engage_graphs, events)
+
+def _div_end(html, start):
+    '''
+    Returns the position where the div starting at `start` is closed, or
+    None if it is not.
+    '''
+    depth = 0
+    for match in DIV_MATCHER.finditer(html, start):
+        if match.group(1):
+            depth -= 1
+            if depth == 0:
+                return match.start()
+        else:
+            depth += 1
+
+def _scan_html_topic(video_id, html, up_dates):
+    '''
+    Same as `_parse_html_topic`, but finds the totals, chart urls and events
+    with regular expressions instead of building a DOM. Returns None when 
+    the HTML does not have the exact markup expected, so that the DOM 
+    parser can be used.
+    '''
+    html = decode(html)
+    
+    #Total views
+    start = html.find('<h3')
+    if start == -1:
+        return None
+    
+    views_match = TOPIC_VIEWS_MATCHER.match(html, start)
+    if views_match is None or TO_INT(views_match.group(1)) == 0:
+        return None
+    
+    #Graph of views
+    charts = {}
+    for css_class, src in TOPIC_CHART_MATCHER.findall(html):
+        charts.setdefault(css_class, []).append(src)
+    
+    for css_class in TOPIC_CHART_CLASSES:
+        if html.count(css_class) != len(charts.get(css_class, [])):
+            return None
+    
+    view_graphs = charts.get(TOPIC_CHART_CLASSES[0]) or \
+        charts.get(TOPIC_CHART_CLASSES[1])
+    if not view_graphs:
+        return None
+    
+    #Totals and graphs of engagement
+    start = html.find(TOPIC_ENGAGE_DIV)
+    if start == -1 or html.find(TOPIC_ENGAGE_DIV, start + 1) != -1:
+        return None
+    
+    start = html.rfind('<div', 0, start)
+    end = _div_end(html, start)
+    if end is None:
+        return None
+    
+    engage_html = html[start:end]
+    totals = TOPIC_H4_MATCHER.findall(engage_html)
+    if len(totals) != engage_html.count('<h4'):
+        return None
+    
+    engage_graphs = []
+    if len(totals) > 1:
+        images = TOPIC_IMG_MATCHER.findall(engage_html)[:4]
+        if len(images) < 4 or not all(images):
+            return None
+        engage_graphs = [unescape(src) for src in images]
+    
+    #Events
+    events = []
+    for span_name, link, extra, p_name, date_text in \
+            TOPIC_EVENT_MATCHER.findall(html):
+        if span_name:
+            events.append((span_name, link or extra, date_text))
+        else:
+            events.append((p_name, '', date_text))
+    
+    if len(events) != html.count('class="event"'):
+        return None
+    
+    return _topic_data(video_id, up_dates, views_match.group(1), totals, 
+                       unescape(view_graphs[0]), engage_graphs, events)
+
+def _parse_topic(video_id, html, up_dates, backend=None):
+    '''
+    Parses a video of the topic format, scanning the HTML when possible and
+    falling back to the DOM parser.
+    '''
+    video_data = _scan_html_topic(video_id, html, up_dates)
+    if video_data is None:
+        video_data = _parse_html_topic(video_id, html, up_dates, backend)
+    return video_data
+
+#Parsing function of each format
+PARSERS = {
+    ENG_FORMAT: _parse_html,
+    NEW_FORMAT: _parse_html_new,
+    TOPIC_FORMAT: _parse_topic
+}
+
+def html_format(html):
+    '''
+    Sniffs the crawl format (one of PARSERS) of a video's HTML from marker
+    strings, without parsing it. Returns None if no marker is found, i.e.,
+    the video has no stats.
+    '''
+    start = html.find(STATS_TITLE_MARKER)
+    if start != -1:
+        tag_start = html.rfind('<', 0, start)
+        if html.startswith('<div', tag_start):
+            return ENG_FORMAT
+        elif html.startswith('<h4', tag_start):
+            return NEW_FORMAT
+        else:
+            return None
+    
+    if html.find(TOPIC_ENGAGE_DIV) != -1:
+        return TOPIC_FORMAT
+
+def parse_stats(fpath, up_dates, backend=None):
+    '''
+    Parses a stats file yielding a dictionary with the information for 
+    every video found. Videos are parsed as they are read from the file.
+    The format of each video is sniffed (see `html_format`), so files of 
+    different crawls can be parsed together. Videos without stats are 
+    skipped.
     
     Arguments
     ---------
@@ -456,22 +648,19 @@ def parse_stats(fpath, up_dates):
         The path of the stats file to parse
     up_dates: dict
         The upload dates for each video (video_id to int)
-    del_dates: dict (optional)
-        The deletion dates of each video, this is useful for Youtomb.
+    backend: str or backend (optional)
+        The parser backend (see `youtime.parser.backends`)
     '''
-    video_xmls = _get_video_xmls(fpath, up_dates)
-    
-    return_val = []
-    for video_id, xml in video_xmls.iteritems():
+    backend = get_backend(backend)
+    for video_id, xml in _iter_video_xmls(fpath, up_dates):
         #The XML has only the one tag with and HTML inside
-        xml_soup = BeautifulStoneSoup(xml)
-        content = xml_soup.find('html_content')
-        if content:
-            html = content.string
-        
+        html = _html_content(xml)
+        if html:
+            fmt = html_format(html)
+            if fmt is None:
+                continue
+            
             #We can now parse the HTML inside
-            video_data = _parse_html_topic(video_id, html, up_dates)
+            video_data = PARSERS[fmt](video_id, html, up_dates, backend)
             if video_data:
-                return_val.append(video_data)
-    
-    return return_val
\ No newline at end of file
+                yield video_data
\ No newline at end of file
@@ -0,0 +1,114 @@
+# -*- coding: utf8
+'''
+Tests that every parser backend extracts the same information from the
+stats and info files.
+'''
+
+from __future__ import division, print_function
+
+from youtime.parser import backends
+from youtime.parser import info_files
+from youtime.parser import stats_files
+
+from youtime.parser.test import ENG_INFO_FILE
+from youtime.parser.test import ENG_INFO_FILE2
+from youtime.parser.test import ENG_STATS_FILE
+
+from youtime.parser.test import PTBR_INFO_FILE
+from youtime.parser.test import PTBR_STATS_FILE
+
+from youtime.parser.test import NEW_INFO_FILE
+from youtime.parser.test import NEW_INFO_FILE2
+from youtime.parser.test import NEW_STATS_FILE
+from youtime.parser.test import NEW_STATS_FILE2
+
+from youtime.parser.test import TOPIC_INFO_FILE
+from youtime.parser.test import TOPIC_STATS_FILE
+from youtime.parser.test import TOPIC_STATS_FILE2
+from youtime.parser.test import TOPIC_STATS_FILE3
+from youtime.parser.test import TOPIC_STATS_FILE4
+from youtime.parser.test import TOPIC_STATS_FILE5
+from youtime.parser.test import TOPIC_STATS_FILE6
+
+import os
+import unittest
+
+TOPIC_STATS_FILES = [TOPIC_STATS_FILE, TOPIC_STATS_FILE2, TOPIC_STATS_FILE3,
+                     TOPIC_STATS_FILE4, TOPIC_STATS_FILE5, TOPIC_STATS_FILE6]
+
+def _topic_id(fpath):
+    return os.path.basename(fpath).split('-', 1)[1].rsplit('-', 1)[0]
+
+def _parse(parse, video_id, html, up_dates, backend):
+    #Errors must also be the same
+    try:
+        return parse(video_id, html, up_dates, backend)
+    except Exception as e:
+        return type(e), str(e)
+
+@unittest.skipIf(backends.lxml is None, 'lxml is not installed')
+class TestBackends(unittest.TestCase):
+
+    def assertSameStats(self, fpath, up_dates, parse):
+        xmls = stats_files._get_video_xmls(fpath, up_dates)
+        self.assertTrue(xmls)
+        for video_id, xml in xmls.items():
+            html = stats_files._html_content(xml)
+            self.assertEqual(_parse(parse, video_id, html, up_dates, 'soup'),
+                             _parse(parse, video_id, html, up_dates, 'lxml'))
+
+    def test_get_backend(self):
+        self.assertEqual('lxml', backends.get_backend().name)
+        self.assertEqual('soup', backends.get_backend('soup').name)
+
+        backend = backends.SoupBackend()
+        self.assertTrue(backends.get_backend(backend) is backend)
+        self.assertRaises(Exception, backends.get_backend, 'html5')
+
+    def test_stats_eng(self):
+        self.assertSameStats(ENG_STATS_FILE,
+                             info_files.up_dates_html_en(ENG_INFO_FILE),
+                             stats_files._parse_html)
+
+    def test_stats_ptbr(self):
+        self.assertSameStats(PTBR_STATS_FILE,
+                             info_files.up_dates_html_ptbr(PTBR_INFO_FILE),
+                             stats_files._parse_html)
+
+    def test_stats_new(self):
+        for stats_file, info_file in [(NEW_STATS_FILE, NEW_INFO_FILE),
+                                      (NEW_STATS_FILE2, NEW_INFO_FILE2)]:
+            self.assertSameStats(stats_file,
+                                 info_files.up_dates_html_new(info_file),
+                                 stats_files._parse_html_new)
+
+    def test_stats_topic(self):
+        for fpath in TOPIC_STATS_FILES:
+            self.assertSameStats(fpath, {_topic_id(fpath):0},
+                                 stats_files._parse_html_topic)
+
+    def test_parse_stats(self):
+        up_dates = {_topic_id(TOPIC_STATS_FILE4):0}
+        self.assertEqual(
+                list(stats_files.parse_stats(TOPIC_STATS_FILE4, up_dates,
+                                             'soup')),
+                list(stats_files.parse_stats(TOPIC_STATS_FILE4, up_dates,
+                                             'lxml')))
+
+    def test_info(self):
+        for parse, fpath in [(info_files.up_dates_html_new, NEW_INFO_FILE),
+                             (info_files.up_dates_html_new, NEW_INFO_FILE2),
+                             (info_files.up_dates_html_topic,
+                              TOPIC_INFO_FILE),
+                             (info_files.category_tags_user_en,
+                              ENG_INFO_FILE),
+                             (info_files.category_tags_user_en,
+                              ENG_INFO_FILE2),
+                             (info_files.category_tags_user_new,
+                              NEW_INFO_FILE),
+                             (info_files.category_tags_user_new,
+                              NEW_INFO_FILE2)]:
+            self.assertEqual(parse(fpath, 'soup'), parse(fpath, 'lxml'))
+
+if __name__ == "__main__":
+    unittest.main()
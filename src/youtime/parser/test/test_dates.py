@@ -0,0 +1,81 @@
+# -*- coding: utf8
+'''
+Tests for the dates module.
+'''
+
+from __future__ import division, print_function
+
+from time import mktime
+from time import strptime
+
+from youtime.parser import dates
+
+import unittest
+
+def _strptime(date_str, formats):
+    for fmt in formats:
+        try:
+            return mktime(strptime(date_str, fmt))
+        except ValueError:
+            pass
+
+class TestDates(unittest.TestCase):
+
+    def assertSameAsStrptime(self, date_strs, family):
+        for date_str in date_strs:
+            self.assertEqual(_strptime(date_str, dates.FAMILIES[family]),
+                             dates.to_timestamp(date_str, family))
+
+    def test_month_day_year(self):
+        self.assertSameAsStrptime(['March 3, 2010', 'Mar 3, 2010',
+                                   'Sep 30, 2009', 'september 1, 2011',
+                                   'May 03, 2008', 'Feb 29, 2008',
+                                   'Feb 29, 2009', 'Feb 30, 2008',
+                                   'Marc 3, 2010', '3 Mar, 2010', ''],
+                                  dates.MONTH_DAY_YEAR)
+
+    def test_numeric(self):
+        self.assertSameAsStrptime(['11/15/2008', '1/2/2009', '13/1/2009',
+                                   '11/15/08'], dates.NUMERIC_LONG)
+        self.assertSameAsStrptime(['11/15/08', '1/2/09', '3/31/70',
+                                   '02/29/09', '11/15/2008'],
+                                  dates.NUMERIC_SHORT)
+        self.assertSameAsStrptime(['11/15/08', '45/15/08', '61/15/08'],
+                                  dates.NUMERIC_EVENT)
+        self.assertSameAsStrptime(['15 11 2008', '1 2 2009', '15 13 2008'],
+                                  dates.DAY_MONTH_YEAR)
+
+    def test_last_format_first(self):
+        parser = dates.DateParser(['%B %d, %Y', '%b %d, %Y'])
+        self.assertEqual(0, parser.last)
+
+        parser.parse('Mar 3, 2010')
+        self.assertEqual(1, parser.last)
+        self.assertEqual(mktime(strptime('March 3, 2010', '%B %d, %Y')),
+                         parser.parse('March 3, 2010'))
+        self.assertEqual(0, parser.last)
+
+        self.assertEqual(None, parser.parse('3/3/10'))
+        self.assertEqual(0, parser.last)
+
+    def test_parse_timestamp(self):
+        self.assertEqual(mktime(strptime('March 3, 2010', '%B %d, %Y')),
+                         dates.parse_timestamp(u'March 3, 2010',
+                                               dates.MONTH_DAY_YEAR))
+        self.assertRaises(ValueError, dates.parse_timestamp, 'Marc 3, 2010',
+                          dates.MONTH_DAY_YEAR)
+
+    def test_cache(self):
+        old_size = dates.CACHE_SIZE
+        try:
+            dates.CACHE_SIZE = 2
+            dates._CACHE.clear()
+            for day in xrange(1, 10):
+                dates.to_timestamp('Mar %d, 2010' % day, dates.MONTH_DAY_YEAR)
+                self.assertTrue(len(dates._CACHE) <= 2)
+        finally:
+            dates.CACHE_SIZE = old_size
+            dates._CACHE.clear()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -34,6 +34,9 @@ from youtime.parser.test import TOPIC_STATS_FILE4
 from youtime.parser.test import TOPIC_STATS_FILE5
 from youtime.parser.test import TOPIC_STATS_FILE6
 
+import os
+import shutil
+import tempfile
 import unittest
 
 class TestStatsFile(unittest.TestCase):
@@ -92,6 +95,139 @@ class TestStatsFile(unittest.TestCase):
         lines = xml_for_vid.split('\n')
         self.assertEqual(222, len(lines))
 
+    def test_iter_xmls(self):
+        up_dates = info_files.up_dates_html_ptbr(PTBR_INFO_FILE)
+        
+        xmls = stats_files._iter_video_xmls(PTBR_STATS_FILE, up_dates)
+        self.assertFalse(isinstance(xmls, dict))
+        
+        video_id, xml = xmls.next()
+        self.assertTrue(video_id in up_dates)
+        self.assertTrue('crawledvideoid' not in xml)
+        
+        expected = stats_files._get_video_xmls(PTBR_STATS_FILE, up_dates)
+        xmls = list(stats_files._iter_video_xmls(PTBR_STATS_FILE, up_dates))
+        self.assertEqual(len(expected), len(xmls))
+        self.assertEqual(expected, dict(xmls))
+    
+    def test_parse_stats(self):
+        up_dates = info_files.up_dates_html_topic(TOPIC_INFO_FILE)
+        
+        videos = stats_files.parse_stats(TOPIC_STATS_FILE, up_dates)
+        self.assertFalse(isinstance(videos, list))
+        
+        videos = list(videos)
+        self.assertEqual(1, len(videos))
+        self.assertEqual('zgY-cR0kv5Y', videos[0]['VIDEO_ID'])
+        self.assertEqual(13236, videos[0]['TOTAL_VIEW'])
+    
+    def test_html_content(self):
+        parse = stats_files._parse_html
+        files = [(ENG_STATS_FILE, info_files.up_dates_html_en(ENG_INFO_FILE),
+                  parse),
+                 (PTBR_STATS_FILE, 
+                  info_files.up_dates_html_ptbr(PTBR_INFO_FILE), parse),
+                 (NEW_STATS_FILE, info_files.up_dates_html_new(NEW_INFO_FILE),
+                  stats_files._parse_html_new),
+                 (TOPIC_STATS_FILE, 
+                  info_files.up_dates_html_topic(TOPIC_INFO_FILE),
+                  stats_files._parse_html_topic)]
+        
+        for fpath, up_dates, parse in files:
+            xmls = stats_files._get_video_xmls(fpath, up_dates)
+            for video_id, xml in xmls.items():
+                expected = BeautifulStoneSoup(xml).find('html_content').string
+                html = stats_files._html_content(xml)
+                self.assertEqual(parse(video_id, expected, up_dates),
+                                 parse(video_id, html, up_dates))
+        
+        self.assertTrue(stats_files._html_content('<a>b</a>') is None)
+        xml = '<html_content>&lt;div&gt;</html_content>'
+        self.assertEqual('&lt;div&gt;', stats_files._html_content(xml))
+    
+    def test_scan_topic(self):
+        for fpath in [TOPIC_STATS_FILE, TOPIC_STATS_FILE3, TOPIC_STATS_FILE4,
+                      TOPIC_STATS_FILE5]:
+            fname = os.path.basename(fpath)
+            video_id = fname.split('-', 1)[1].rsplit('-', 1)[0]
+            up_dates = {video_id:0}
+            xmls = stats_files._get_video_xmls(fpath, up_dates)
+            html = stats_files._html_content(xmls[video_id])
+            
+            expected = stats_files._parse_html_topic(video_id, html, up_dates,
+                                                     'soup')
+            self.assertEqual(expected, 
+                             stats_files._scan_html_topic(video_id, html, 
+                                                          up_dates))
+            
+            #Unexpected markup is left to the DOM parser
+            changed = html.replace('<dd class="event">', 
+                                   '<dd id="ev" class="event">')
+            self.assertTrue(stats_files._scan_html_topic(video_id, changed,
+                                                         up_dates) is None)
+            self.assertEqual(expected, 
+                             list(stats_files.parse_stats(fpath, up_dates))[0])
+        
+        #Videos without stats are also left to the DOM parser
+        video_id = 'G-zjxv6hL1o'
+        xmls = stats_files._get_video_xmls(TOPIC_STATS_FILE2, {video_id:0})
+        html = stats_files._html_content(xmls[video_id])
+        self.assertTrue(stats_files._scan_html_topic(video_id, html, 
+                                                     {video_id:0}) is None)
+    
+    def test_html_format(self):
+        files = [(ENG_STATS_FILE, info_files.up_dates_html_en(ENG_INFO_FILE),
+                  stats_files.ENG_FORMAT),
+                 (PTBR_STATS_FILE, 
+                  info_files.up_dates_html_ptbr(PTBR_INFO_FILE),
+                  stats_files.ENG_FORMAT),
+                 (NEW_STATS_FILE, info_files.up_dates_html_new(NEW_INFO_FILE),
+                  stats_files.NEW_FORMAT),
+                 (TOPIC_STATS_FILE, 
+                  info_files.up_dates_html_topic(TOPIC_INFO_FILE),
+                  stats_files.TOPIC_FORMAT),
+                 (TOPIC_STATS_FILE6, {'X2B6-44q91Y':0}, None)]
+        
+        for fpath, up_dates, expected in files:
+            xmls = stats_files._get_video_xmls(fpath, up_dates)
+            self.assertTrue(xmls)
+            for xml in xmls.values():
+                html = stats_files._html_content(xml)
+                self.assertEqual(expected, stats_files.html_format(html))
+    
+    def test_parse_stats_mixed(self):
+        up_dates = {'X2B6-44q91Y':0, '9Rp33PvBSns':0}
+        up_dates.update(info_files.up_dates_html_en(ENG_INFO_FILE))
+        up_dates.update(info_files.up_dates_html_new(NEW_INFO_FILE))
+        
+        expected = []
+        for fpath, parse in [(ENG_STATS_FILE, stats_files._parse_html),
+                             (NEW_STATS_FILE, stats_files._parse_html_new),
+                             (TOPIC_STATS_FILE4, 
+                              stats_files._parse_html_topic)]:
+            for video_id, xml in stats_files._iter_video_xmls(fpath, 
+                                                              up_dates):
+                html = stats_files._html_content(xml)
+                expected.append(parse(video_id, html, up_dates))
+        
+        #Files of every crawl (and a video without stats) on a single file
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            fpath = os.path.join(tmp_dir, 'mixed-stats')
+            with open(fpath, 'w') as mixed_file:
+                for part in [ENG_STATS_FILE, TOPIC_STATS_FILE6, 
+                             NEW_STATS_FILE, TOPIC_STATS_FILE4]:
+                    with open(part) as part_file:
+                        mixed_file.write(part_file.read())
+                        mixed_file.write('\n')
+            
+            videos = list(stats_files.parse_stats(fpath, up_dates))
+        finally:
+            shutil.rmtree(tmp_dir)
+        
+        self.assertEqual(3, len(videos))
+        self.assertEqual(expected, videos)
+    
     def test_parse_html_eng(self):
         
         video_id = 'fhGb6qPiluE'
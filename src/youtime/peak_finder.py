@@ -17,11 +17,25 @@ from vodstats.plot.plot2d import xy_plot, XYPoints
 
 from youtime import YoutimeH5Runner
 from youtime.common.dao import VideoDAO
-from youtime.mapred.ig import PyTablesDaoIterator
 
+import numpy as np
 import os
 import sys
 
+def window_sums(statistics, size):
+    '''
+    Sums of the windows of `size` days ending at the days multiple of 
+    `size`, i.e., day 0 alone and then days `[1, size]`, `[size + 1, 
+    2 * size]` and so on. The last window is dropped if incomplete.
+    
+    These windows are shifted by one day from the levels computed by 
+    `youtime.derive` (which start at day 0 and keep the last window), thus 
+    they are summed here.
+    '''
+    cumulative = np.cumsum(np.asarray(statistics, dtype='float64'))
+    ends = cumulative[::size]
+    return np.diff(np.concatenate(([0.0], ends)))
+
 class PeakFinderMapper(BaseMapper):
     
     def __init__(self, cname):
@@ -44,37 +58,9 @@ class PeakFinderMapper(BaseMapper):
         if total == 0.0:
             return None
         
-        days = 0
-        weeks = 0
-        months = 0
-        
-        data_day = {}
-        data_week = {}
-        data_month = {}
-        
-        sum_week = 0.0
-        sum_month = 0.0
-        
-        for i in xrange(len(statistics)):
-            stat = statistics[i]
-            days = i
-            
-            sum_week += stat
-            sum_month += stat
-            
-            data_day[days] = stat
-            if days % 7 == 0:
-                data_week[weeks] = sum_week
-                weeks += 1
-                sum_week = 0.0
-            if days % 30 == 0:
-                data_month[months] = sum_month
-                months += 1
-                sum_month = 0.0
-        
-        daily_top = nlargest(3, data_day.values())
-        weekly_top = nlargest(3, data_week.values())
-        monthly_top = nlargest(3, data_month.values())
+        daily_top = nlargest(3, statistics)
+        weekly_top = nlargest(3, window_sums(statistics, 7))
+        monthly_top = nlargest(3, window_sums(statistics, 30))
         
         daily_frac = None
         if len(daily_top) >= 3:
@@ -207,9 +193,13 @@ class PeakFinder(YoutimeH5Runner):
                             help='Column Name')
         
     def setup(self, arg_vals):
-        self.igen = PyTablesDaoIterator(arg_vals.in_file, arg_vals.table)
         self.mapper_obj = PeakFinderMapper(arg_vals.cname)
         self.reducer_obj = PeakFinderReducer(arg_vals.outf, arg_vals.cname)
+        
+        columns = [self.mapper_obj.dname, self.mapper_obj.tname]
+        #Videos without any views/comments/favorites are ignored by the mapper
+        where = '%s > 0' % self.mapper_obj.tname
+        self.igen = self.dao_iterator(arg_vals, columns, where)
     
     def finalize(self):
         self.reducer_obj.close()
@@ -17,7 +17,6 @@ from vodstats.plot.plot2d import xy_plot, XYPoints
 
 from youtime import YoutimeH5Runner
 from youtime.common.dao import VideoDAO
-from youtime.mapred.ig import PyTablesDaoIterator
 
 import os
 import sys
@@ -158,9 +157,13 @@ class PercentualLife(YoutimeH5Runner):
         parser.add_argument('cname', type=str, help='Column Name')
         
     def setup(self, arg_vals):
-        self.igen = PyTablesDaoIterator(arg_vals.in_file, arg_vals.table)
         self.mapper_obj = PercentualLifeMapper(arg_vals.cname)
         self.reducer_obj = PecentualLifeReducer(arg_vals.outf, arg_vals.cname)
+        
+        columns = [self.mapper_obj.dname, self.mapper_obj.tname]
+        #Videos without any views/comments/favorites are ignored by the mapper
+        where = '%s > 0' % self.mapper_obj.tname
+        self.igen = self.dao_iterator(arg_vals, columns, where)
     
     def finalize(self):
         self.reducer_obj.close()
@@ -15,7 +15,7 @@ from vodstats.plot.plot2d import Bars, barplot
 from youtime import YoutimeH5Runner
 from youtime.common.constants import SIGNIFICANCE
 from youtime.common.dao import VideoDAO
-from youtime.mapred.ig import PyTablesDaoIterator
+from youtime.common.derived import window_col
 
 import numpy as np
 import os
@@ -73,13 +73,20 @@ def get_class(data_array, threshold):
 
 class PNASMapper(BaseMapper):
 
-    def __init__(self, days): 
+    def __init__(self, days, derived=False): 
         self.days = days
+        
+        #Windows computed by `youtime.derive` are read instead of summed
+        self.column = VideoDAO.VIEW_DATA_INTERP
+        if derived:
+            self.column = window_col(VideoDAO.VIEW_DATA_INTERP, days)
 
     def _map(self, key, item):
-        views = item[VideoDAO.VIEW_DATA_INTERP]
+        if self.column == VideoDAO.VIEW_DATA_INTERP:
+            to_test = group_array(item[self.column], self.days)
+        else:
+            to_test = item[self.column]
         
-        to_test = group_array(views, self.days)
         threshold_vals = np.arange(0.05, 0.55, 0.05)
         return_val = np.zeros(threshold_vals.shape[0])
         
@@ -205,14 +212,17 @@ class PNAS(YoutimeH5Runner):
         super(PNAS, self).add_custom_aguments(parser)
         parser.add_argument("days", type=int,
                             help="How many days in each window")
+        parser.add_argument("--derived", action='store_true', default=False,
+                            help="Read the windows computed by "
+                                 "youtime.derive (see --windows)")
     
     def finalize(self):
         self.reducer_obj.close()
     
     def setup(self, arg_vals):
-        self.igen = PyTablesDaoIterator(arg_vals.in_file, arg_vals.table)
         append = str(arg_vals.days)
-        self.mapper_obj = PNASMapper(arg_vals.days)
+        self.mapper_obj = PNASMapper(arg_vals.days, arg_vals.derived)
+        self.igen = self.dao_iterator(arg_vals, [self.mapper_obj.column])
         self.reducer_obj = PNASReducer(arg_vals.outf, append)
         
 if __name__ == '__main__':
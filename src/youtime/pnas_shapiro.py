@@ -18,7 +18,7 @@ from youtime.pnas import group_array
 from youtime.pnas import is_poisson
 from youtime.common.constants import SIGNIFICANCE
 from youtime.common.dao import VideoDAO
-from youtime.mapred.ig import PyTablesDaoIterator
+from youtime.common.derived import window_col
 
 import numpy as np
 import os
@@ -45,16 +45,33 @@ def crane_sornet(ypts):
 
 class PNASShapiroMapper(BaseMapper):
 
-    def __init__(self, days): 
+    def __init__(self, days, derived=False): 
         self.days = days
+        
+        #Windows computed by `youtime.derive` are read instead of summed.
+        #The length of the daily series is not read with them, so videos 
+        #are selected by their DAYS
+        self.columns = [VideoDAO.VIEW_DATA_INTERP]
+        if derived:
+            self.columns = [window_col(VideoDAO.VIEW_DATA_INTERP, days),
+                            VideoDAO.DAYS]
 
     def _map(self, key, item):
-        views = item[VideoDAO.VIEW_DATA_INTERP]
-        if len(views) < 100 or len(views) > 200:
+        derived = self.columns[0] != VideoDAO.VIEW_DATA_INTERP
+        if derived:
+            num_days = item[VideoDAO.DAYS]
+        else:
+            views = item[VideoDAO.VIEW_DATA_INTERP]
+            num_days = len(views)
+        
+        if num_days < 100 or num_days > 200:
             return None
 
-        total = np.sum(views)
-        poiss_test = group_array(views, self.days)
+        if derived:
+            poiss_test = item[self.columns[0]]
+        else:
+            poiss_test = group_array(views, self.days)
+        total = np.sum(poiss_test)
         is_poiss = is_poisson(poiss_test)[1] or len(poiss_test) < 4
         unknown_or_poiss = (-1, 0)
         if is_poiss: #Poisson
@@ -116,6 +133,9 @@ class PNASShapiro(YoutimeH5Runner):
         super(PNASShapiro, self).add_custom_aguments(parser)
         parser.add_argument("days", type=int,
                             help="How many days in each window")
+        parser.add_argument("--derived", action='store_true', default=False,
+                            help="Read the windows computed by "
+                                 "youtime.derive (see --windows)")
     
     def finalize(self):
         self.reducer_obj.close()
@@ -123,8 +143,13 @@ class PNASShapiro(YoutimeH5Runner):
     def setup(self, arg_vals):
         append = str(arg_vals.days)
         
-        self.igen = PyTablesDaoIterator(arg_vals.in_file, arg_vals.table)
-        self.mapper_obj = PNASShapiroMapper(arg_vals.days)
+        self.mapper_obj = PNASShapiroMapper(arg_vals.days, arg_vals.derived)
+        
+        where = None
+        if arg_vals.derived:
+            where = '(DAYS >= 100) & (DAYS <= 200)'
+        self.igen = self.dao_iterator(arg_vals, self.mapper_obj.columns, 
+                                      where)
         self.reducer_obj = PNASShapiroReducer(arg_vals.outf, append)
         
 if __name__ == '__main__':
@@ -0,0 +1,46 @@
+# -*- coding: utf8
+
+from __future__ import division, print_function
+
+from StringIO import StringIO
+
+from youtime import bench_read
+from youtime.mapred.test import create_h5
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+class TestBenchRead(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.in_fpath = os.path.join(self.tmp_dir, 'videos.h5')
+        create_h5(self.in_fpath, [3, 10, 40, 90])
+        
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+    
+    def test_main(self):
+        out_folder = os.path.join(self.tmp_dir, 'out')
+        os.mkdir(out_folder)
+        
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            bench_read.main(self.in_fpath, out_folder)
+            lines = sys.stdout.getvalue().splitlines()
+        finally:
+            sys.stdout = stdout
+        
+        #One line per setting and reader, besides the header
+        self.assertEqual(len(bench_read.SETTINGS) * len(bench_read.READERS),
+                         len(lines) - 1)
+        for name, _, _ in bench_read.SETTINGS:
+            self.assertTrue(os.path.exists(os.path.join(out_folder, 
+                                                        '%s.h5' % name)))
+
+if __name__ == "__main__":
+    unittest.main()
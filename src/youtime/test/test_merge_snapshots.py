@@ -0,0 +1,162 @@
+# -*- coding: utf8
+
+from __future__ import division, print_function
+
+from youtime.common.constants import DAY
+from youtime.common.datasets import write_dataset
+from youtime.common.dao import _pc
+from youtime.common.dao import VideoDAO
+from youtime.create_dao import DaoReducer
+from youtime.mapred.ig import PyTablesDaoIterator
+from youtime.mapred.test import create_h5
+from youtime.mapred.test import fake_video_data
+from youtime.merge_snapshots import merge_snapshots
+from youtime.parser import dao_creator
+
+import numpy as np
+import os
+import shutil
+import tempfile
+import unittest
+
+class TestMergeSnapshots(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        
+        #First crawl, 40 days of every video
+        self.old_fpath = os.path.join(self.tmp_dir, 'old.h5')
+        create_h5(self.old_fpath, [40] * 4, block_size=2)
+        
+        #Second crawl, of two of the videos (plus a new one) starting 10
+        #days later. Views of the new crawl are larger.
+        daos = []
+        for i in [1, 3, 4]:
+            video_data = fake_video_data('video%05d' % i, 50, 1000)
+            for key in ['UPLOAD_DATE', 'FIRST_DATE', 'LAST_DATE']:
+                video_data[key] += 10 * DAY
+            daos.append(dao_creator.create(video_data))
+        
+        self.new_fpath = os.path.join(self.tmp_dir, 'new.h5')
+        reducer = DaoReducer(self.new_fpath, ragged=True, block_size=2)
+        reducer._reduce(None, daos)
+        reducer.close()
+        
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+    
+    def test_merge(self):
+        dataset_path = os.path.join(self.tmp_dir, 'crawls.dataset')
+        write_dataset(dataset_path, [('old', self.old_fpath), 
+                                     ('new', self.new_fpath)])
+        
+        out_fpath = os.path.join(self.tmp_dir, 'merged.h5')
+        reducer = DaoReducer(out_fpath, ragged=True)
+        merge_snapshots([dataset_path], reducer, block_size=3)
+        reducer.close()
+        
+        old = dict(PyTablesDaoIterator(self.old_fpath))
+        new = dict(PyTablesDaoIterator(self.new_fpath))
+        merged = dict(PyTablesDaoIterator(out_fpath))
+        self.assertEqual(['video%05d' % i for i in xrange(5)], sorted(merged))
+        
+        #Only on one crawl
+        for video_id, crawl in [('video00000', old), ('video00004', new)]:
+            for field in [VideoDAO.VIEW_DATA_INTERP, 
+                          VideoDAO.DATE_POINTS_INTERP]:
+                self.assertEqual(list(crawl[video_id][field]), 
+                                 list(merged[video_id][field]))
+        
+        dao = merged['video00001']
+        old_views = old['video00001'][VideoDAO.VIEW_DATA_INTERP]
+        new_views = new['video00001'][VideoDAO.VIEW_DATA_INTERP]
+        self.assertEqual(60, len(dao[VideoDAO.VIEW_DATA_INTERP]))
+        self.assertEqual(60, dao[VideoDAO.DAYS])
+        self.assertEqual(list(old_views[:11]) + list(new_views[1:]),
+                         list(dao[VideoDAO.VIEW_DATA_INTERP]))
+        
+        dates = dao[VideoDAO.DATE_POINTS_INTERP]
+        self.assertTrue((np.diff(dates) == DAY).all())
+        self.assertEqual(old['video00001'][VideoDAO.FIRST_DATE], dates[0])
+        self.assertEqual(new['video00001'][VideoDAO.TOTAL_VIEW], 
+                         dao[VideoDAO.TOTAL_VIEW])
+        self.assertEqual(list(new['video00001'][VideoDAO.EVENT_TYPES]), 
+                         list(dao[VideoDAO.EVENT_TYPES]))
+
+    def test_merge_same_file(self):
+        #Two snapshots of a video on the same table, the newest one first
+        daos = []
+        for i, shift in [(1, 10), (1, 0), (2, 0), (3, 0), (0, 0)]:
+            video_data = fake_video_data('video%05d' % i, 40 + shift, 
+                                         1000 + 10 * shift)
+            for key in ['UPLOAD_DATE', 'FIRST_DATE', 'LAST_DATE']:
+                video_data[key] += shift * DAY
+            daos.append(dao_creator.create(video_data))
+        
+        fpath = os.path.join(self.tmp_dir, 'same.h5')
+        reducer = DaoReducer(fpath, ragged=True, block_size=2)
+        reducer._reduce(None, daos)
+        reducer.close()
+        
+        out_fpath = os.path.join(self.tmp_dir, 'merged.h5')
+        reducer = DaoReducer(out_fpath, ragged=True)
+        merge_snapshots([fpath], reducer, block_size=2)
+        reducer.close()
+        
+        merged = dict(PyTablesDaoIterator(out_fpath))
+        self.assertEqual(['video%05d' % i for i in xrange(4)], sorted(merged))
+        
+        newest, oldest = daos[0], daos[1]
+        dao = merged['video00001']
+        self.assertEqual(60, dao[VideoDAO.DAYS])
+        self.assertEqual(newest[VideoDAO.COLLECT_DATE], 
+                         dao[VideoDAO.COLLECT_DATE])
+        self.assertEqual(newest[VideoDAO.TOTAL_VIEW], dao[VideoDAO.TOTAL_VIEW])
+        self.assertNotEqual(oldest[VideoDAO.TOTAL_VIEW], 
+                            dao[VideoDAO.TOTAL_VIEW])
+        self.assertEqual(list(_pc(newest[VideoDAO.VIEW_DATA_INTERP])[1:]),
+                         list(dao[VideoDAO.VIEW_DATA_INTERP][11:]))
+
+    def test_merge_disjoint(self):
+        #Snapshots of days [0, 19] and [30, 49] are not merged, the ones 
+        #of days [0, 19] and [19, 38] are
+        daos = []
+        for i, shift in [(1, 0), (1, 30), (2, 0), (2, 19)]:
+            video_data = fake_video_data('video%05d' % i, 20, 1000)
+            for key in ['UPLOAD_DATE', 'FIRST_DATE', 'LAST_DATE']:
+                video_data[key] += shift * DAY
+            daos.append(dao_creator.create(video_data))
+        
+        fpath = os.path.join(self.tmp_dir, 'disjoint.h5')
+        reducer = DaoReducer(fpath, ragged=True)
+        reducer._reduce(None, daos)
+        reducer.close()
+        
+        out_fpath = os.path.join(self.tmp_dir, 'merged.h5')
+        reducer = DaoReducer(out_fpath, ragged=True)
+        merge_snapshots([fpath], reducer)
+        reducer.close()
+        
+        merged = list(PyTablesDaoIterator(out_fpath))
+        self.assertEqual(['video00001', 'video00001', 'video00002'], 
+                         sorted(video_id for video_id, _ in merged))
+        
+        for video_id, dao in merged:
+            views = dao[VideoDAO.VIEW_DATA_INTERP]
+            dates = dao[VideoDAO.DATE_POINTS_INTERP]
+            self.assertEqual(dao[VideoDAO.DAYS], len(views))
+            self.assertTrue((np.diff(dates) == DAY).all())
+            
+            if video_id == 'video00002':
+                self.assertEqual(39, dao[VideoDAO.DAYS])
+            else:
+                self.assertEqual(20, dao[VideoDAO.DAYS])
+                self.assertEqual(dao[VideoDAO.TOTAL_VIEW], views.sum())
+        
+        starts = sorted(dao[VideoDAO.FIRST_DATE] for video_id, dao in merged
+                        if video_id == 'video00001')
+        self.assertEqual([daos[0][VideoDAO.FIRST_DATE], 
+                          daos[1][VideoDAO.FIRST_DATE]], starts)
+    
+if __name__ == "__main__":
+    unittest.main()
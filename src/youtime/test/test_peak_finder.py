@@ -0,0 +1,43 @@
+# -*- coding: utf8
+
+from __future__ import division, print_function
+
+from youtime import peak_finder
+from youtime.common.dao import VideoDAO
+
+import numpy as np
+import unittest
+
+def _loop_sums(statistics, size):
+    sums = []
+    window = 0.0
+    for day, stat in enumerate(statistics):
+        window += stat
+        if day % size == 0:
+            sums.append(window)
+            window = 0.0
+    return sums
+
+class TestPeakFinder(unittest.TestCase):
+    
+    def test_window_sums(self):
+        for length in [0, 1, 7, 8, 15, 31, 100]:
+            statistics = np.arange(length) % 5
+            for size in [7, 30]:
+                self.assertEqual(_loop_sums(statistics, size),
+                                 list(peak_finder.window_sums(statistics, 
+                                                              size)))
+    
+    def test_map(self):
+        statistics = np.array([0, 1, 5, 2, 0, 0, 0, 3, 1, 1, 0, 4, 2, 0, 9])
+        item = {VideoDAO.VIEW_DATA_INTERP:statistics, 
+                VideoDAO.TOTAL_VIEW:statistics.sum()}
+        daily, weekly, monthly = \
+            peak_finder.PeakFinderMapper('view')._map(None, item)
+        
+        self.assertEqual((9 / 28, 5 / 28, 4 / 28), daily)
+        self.assertEqual((17 / 28, 11 / 28, 0), weekly)
+        self.assertEqual(None, monthly)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,7 @@
 from __future__ import division, print_function
 
 from youtime import pnas
+from youtime.common.dao import VideoDAO
 
 import numpy as np
 import unittest
@@ -17,4 +18,10 @@ class TestCommonFunctions(unittest.TestCase):
         
         expected = [6, 15, 7]
         result = pnas.group_array(np.array([1, 2, 3, 4, 5, 6, 7]), 3)
-        self.assertEqual(expected, [i for i in result])
\ No newline at end of file
+        self.assertEqual(expected, [i for i in result])
+    
+    def test_derived_column(self):
+        self.assertEqual(VideoDAO.VIEW_DATA_INTERP, 
+                         pnas.PNASMapper(7).column)
+        self.assertEqual('VIEW_DATA_INTERP_30D', 
+                         pnas.PNASMapper(30, derived=True).column)
\ No newline at end of file
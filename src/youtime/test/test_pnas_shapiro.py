@@ -0,0 +1,31 @@
+# -*- coding: utf8
+
+from __future__ import division, print_function
+
+from youtime import pnas_shapiro
+from youtime.common.dao import VideoDAO
+
+import numpy as np
+import unittest
+
+class TestPNASShapiro(unittest.TestCase):
+    
+    def test_derived_columns(self):
+        self.assertEqual([VideoDAO.VIEW_DATA_INTERP],
+                         pnas_shapiro.PNASShapiroMapper(7).columns)
+        self.assertEqual(['VIEW_DATA_INTERP_7D', VideoDAO.DAYS],
+                         pnas_shapiro.PNASShapiroMapper(7, True).columns)
+    
+    def test_days(self):
+        daily = pnas_shapiro.PNASShapiroMapper(7)
+        derived = pnas_shapiro.PNASShapiroMapper(7, True)
+        
+        views = np.ones(50, dtype='int32')
+        self.assertEqual(None, daily._map(None, 
+                                          {VideoDAO.VIEW_DATA_INTERP:views}))
+        self.assertEqual(None, derived._map(None, 
+                                            {'VIEW_DATA_INTERP_7D':views[:8],
+                                             VideoDAO.DAYS:50}))
+
+if __name__ == "__main__":
+    unittest.main()
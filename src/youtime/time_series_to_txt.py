@@ -11,7 +11,6 @@ from vod.mapreducescript import BaseReducer
 from youtime import YoutimeH5Runner
 from youtime.common.constants import TSERIES_SIZE
 from youtime.common.dao import VideoDAO
-from youtime.mapred.ig import PyTablesDaoIterator
 
 import sys
 import os
@@ -94,7 +93,9 @@ class TimeSeriesRunner(YoutimeH5Runner):
         self.mapper_obj = TimeSeriesMapper(arg_vals.interpolate)
         self.reducer_obj = TimeSeriesReducer(arg_vals.outf, 
                                              arg_vals.interpolate)
-        self.igen = PyTablesDaoIterator(arg_vals.in_file, arg_vals.table)
+        columns = [VideoDAO.VIEW_DATA_ORIG, VideoDAO.VIEW_DATA_INTERP,
+                   VideoDAO.DATE_POINTS_ORIG, VideoDAO.DATE_POINTS_INTERP]
+        self.igen = self.dao_iterator(arg_vals, columns)
     
     def add_custom_aguments(self, parser):
         super(TimeSeriesRunner, self).add_custom_aguments(parser)
@@ -13,7 +13,6 @@ from vodstats.plot.plot2d import xy_plot, XYPoints
 
 from youtime import YoutimeH5Runner
 from youtime.common.dao import VideoDAO
-from youtime.mapred.ig import PyTablesDaoIterator
 from youtime.mapred.mappers import Noop
 
 import os
@@ -56,7 +55,8 @@ class ViewsXTime(YoutimeH5Runner):
         return self.reducer_obj
     
     def setup(self, arg_vals):
-        self.igen = PyTablesDaoIterator(arg_vals.in_file, arg_vals.table)
+        columns = [VideoDAO.TOTAL_VIEW, VideoDAO.DATE_POINTS_INTERP]
+        self.igen = self.dao_iterator(arg_vals, columns)
         self.mapper_obj = Noop()
         self.reducer_obj = ViewsXTimeReducer(arg_vals.outf)
         